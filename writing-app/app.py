@@ -1,6 +1,11 @@
+import hashlib
+import json
+import logging
 import os
 from pathlib import Path
 import random
+import threading
+import time
 
 import cv2
 import mediapipe as mp
@@ -10,6 +15,30 @@ import numpy as np
 import streamlit as st
 from streamlit_drawable_canvas import st_canvas
 
+from recognition import EmbeddingBank, TemplateEmbeddingCache
+from recognition.atlas import GlyphAtlas, TemplatePack
+from recognition.catalog import CatalogCache
+from recognition.index import (
+    build_index,
+    load_index,
+    map_vectors,
+    matrix_fingerprint,
+    save_index,
+)
+from recognition.result_cache import ResultCache, image_digest, perceptual_hash
+from recognition.scheduler import EmbeddingScheduler
+from recognition.streaming import StreamRecognizer
+from recognition.template_cache import file_sha256
+from recognition.template_watch import (
+    TemplateWatcher,
+    diff_snapshots,
+    find_template_files,
+    stat_snapshot,
+)
+from recognition.worker import InferenceService, input_key
+
+logger = logging.getLogger(__name__)
+
 
 # Input mode constants
 class InputMode:
@@ -32,6 +61,8 @@ class SessionKey:
     WHITE_GLYPHS = "white_glyphs"
     STROKE_THICKNESS = "stroke_thickness"
     SHOW_REFERENCE_DEFAULT = "show_reference_default"
+    CHECK_TICKET = "check_ticket"
+    STREAM = "stream"
 
 
 # UI element keys
@@ -44,6 +75,8 @@ class UIKey:
     CHECK_IMAGE_BUTTON = "check_image_button"
     CHECK_PICTURE_BUTTON = "check_picture_button"
     CAMERA_INPUT = "camera_input"
+    LIVE_WEBCAM = "live_webcam"
+    WEBRTC_STREAMER = "webrtc_streamer"
     DEBUG_EXPANDER = "debug_expander"
 
 
@@ -73,24 +106,153 @@ class SpecialChar:
     """
 
 
+# Recognizer defaults
+class RecognizerConfig:
+    TEMPLATES_DIR = "templates"
+    MODEL_PATH = "models/mobilenet_v3_small.tflite"
+    TARGET_SIZE = (224, 224)  # MobileNet default size
+    # How variant scores are combined per character: "max", "mean" or "centroid"
+    AGGREGATION = "max"
+    # Nearest-neighbour search over the bank: "flat" (exact), "ivf" (approximate,
+    # for banks with many thousands of variants) or "quantized" (reduced-precision
+    # storage with a float32 re-rank)
+    INDEX = os.environ.get("SITELEN_INDEX", "flat")
+    # Storage for the "quantized" index: "int8" or "float16"
+    PRECISION = os.environ.get("SITELEN_PRECISION", "int8")
+    # Bump whenever preprocess_image() output changes so cached embeddings are rebuilt
+    PREPROCESSING_VERSION = 1
+    CACHE_DIR = os.environ.get("SITELEN_CACHE_DIR", ".cache/template_embeddings")
+    # Background inference threads shared by all sessions, and how many checks
+    # may be queued or running before new ones are turned away
+    WORKERS = int(os.environ.get("SITELEN_WORKERS", "2"))
+    MAX_PENDING = int(os.environ.get("SITELEN_MAX_PENDING", "32"))
+    # Embedding threads with one MediaPipe embedder each (0 shares a single
+    # embedder behind a lock), and how they batch queued requests
+    EMBED_WORKERS = int(os.environ.get("SITELEN_EMBED_WORKERS", "0"))
+    EMBED_WINDOW_MS = float(os.environ.get("SITELEN_EMBED_WINDOW_MS", "2"))
+    EMBED_MAX_BATCH = int(os.environ.get("SITELEN_EMBED_MAX_BATCH", "16"))
+    # Recent results kept per recognizer for repeated submissions (0 disables),
+    # and how many seconds each is kept
+    RESULT_CACHE_SIZE = int(os.environ.get("SITELEN_RESULT_CACHE_SIZE", "1024"))
+    RESULT_CACHE_TTL = float(os.environ.get("SITELEN_RESULT_CACHE_TTL", "600"))
+    # How cached results are matched to a drawing: "exact" (identical
+    # preprocessed pixels) or "perceptual" (also near-identical ones, which
+    # may merge drawings that differ by a small mark)
+    RESULT_CACHE_MATCH = os.environ.get("SITELEN_RESULT_CACHE_MATCH", "exact")
+    # Seconds between checks of the templates directory for added, edited or
+    # removed PNGs, which are then re-embedded in place (0 disables)
+    TEMPLATE_WATCH_INTERVAL = float(os.environ.get("SITELEN_TEMPLATE_WATCH", "0"))
+    # Packed template images and Learn tab glyph atlas built by
+    # scripts/build_atlas.py; the individual files are read when they are absent
+    TEMPLATE_PACK = os.environ.get("SITELEN_TEMPLATE_PACK", "assets/templates")
+    GLYPH_ATLAS = os.environ.get("SITELEN_GLYPH_ATLAS", "assets/glyphs")
+    # Live webcam recognition: frames scored per second at most, how many
+    # recognized frames are averaged, and the mean grey-level difference
+    # (0-255) below which a frame counts as unchanged and is skipped
+    STREAM_FPS = float(os.environ.get("SITELEN_STREAM_FPS", "5"))
+    STREAM_WINDOW = int(os.environ.get("SITELEN_STREAM_WINDOW", "5"))
+    STREAM_CHANGE_THRESHOLD = float(os.environ.get("SITELEN_STREAM_CHANGE", "4"))
+    # Seconds between refreshes of the live feedback
+    STREAM_REFRESH = 0.5
+    # Learn tab glyph SVGs, light and dark (named <name>_dark.svg)
+    SVG_DIR = "sitelen_pona_svgs"
+    DARK_SVG_DIR = "sitelen_pona_svgs_dark"
+
+
 class MobileNetSitelenPonaRecognizer:
     def __init__(
-        self, templates_dir="templates", model_path="models/mobilenet_v3_small.tflite"
+        self,
+        templates_dir=RecognizerConfig.TEMPLATES_DIR,
+        model_path=RecognizerConfig.MODEL_PATH,
+        target_size=RecognizerConfig.TARGET_SIZE,
+        cache_dir=RecognizerConfig.CACHE_DIR,
+        aggregation=RecognizerConfig.AGGREGATION,
+        index=RecognizerConfig.INDEX,
+        index_params=None,
+        template_pack=RecognizerConfig.TEMPLATE_PACK,
     ):
         """Initialize with a directory of template images and download model"""
         self.templates_dir = templates_dir
+        self.model_path = model_path
+        self.target_size = tuple(target_size)
+        self.cache_dir = cache_dir
+        self.aggregation = aggregation
+        self.index_kind = index
+        self.index_params = dict(index_params or {})
+        if index == "quantized":
+            self.index_params.setdefault("precision", RecognizerConfig.PRECISION)
         self.templates = {}
         self.embeddings = {}
+        # Which template row each character's display images came from, the
+        # embedding of every row and the file stats they were computed from,
+        # so reload_templates() only redoes what changed
+        self._template_sources = {}
+        self._row_embeddings = {}
+        self._mapped_vectors = None
+        self._template_snapshot = {}
+        self._reload_lock = threading.Lock()
+        self.reload_count = 0
+        self.last_reload = None
+        # Set by start_watching() to reload templates as they change on disk
+        self.watcher = None
+        self.template_pack = self.open_template_pack(template_pack)
+
+        # The instance is shared by every session, and the MediaPipe embedder
+        # is not safe to call from several script threads at once
+        self._embed_lock = threading.Lock()
+
+        self.embedder = self.create_embedder()
+        # Set by start_scheduler() to spread embedding over several embedders
+        self.scheduler = None
+        self.result_cache = ResultCache(
+            RecognizerConfig.RESULT_CACHE_SIZE, RecognizerConfig.RESULT_CACHE_TTL
+        )
+        self.result_cache_match = RecognizerConfig.RESULT_CACHE_MATCH
+        self.model_version = None
 
-        # Initialize MediaPipe Image Embedder with proper options
-        base_options = mp.tasks.BaseOptions(model_asset_path=model_path)
+        self.load_templates()
+
+    def create_embedder(self):
+        """Initialize a MediaPipe Image Embedder with proper options"""
+        base_options = mp.tasks.BaseOptions(model_asset_path=self.model_path)
         options = mp.tasks.vision.ImageEmbedderOptions(
             base_options=base_options,
             l2_normalize=True,  # Enable L2 normalization for better similarity comparison
         )
-        self.embedder = mp.tasks.vision.ImageEmbedder.create_from_options(options)
+        return mp.tasks.vision.ImageEmbedder.create_from_options(options)
+
+    def create_warm_embedder(self):
+        embedder = self.create_embedder()
+        width, height = self.target_size
+        self.embed_with(embedder, np.full((height, width, 3), 255, dtype=np.uint8))
+        return embedder
+
+    def start_scheduler(
+        self,
+        workers=RecognizerConfig.EMBED_WORKERS,
+        window_ms=RecognizerConfig.EMBED_WINDOW_MS,
+        max_batch=RecognizerConfig.EMBED_MAX_BATCH,
+    ):
+        """Embed on ``workers`` threads, each with its own warmed-up embedder.
+
+        Requests from every caller are queued and micro-batched per worker
+        instead of taking turns on the single shared embedder.
+        """
+        self.stop_scheduler()
+        self.scheduler = EmbeddingScheduler(
+            self.create_warm_embedder,
+            self.embed_with,
+            workers=workers,
+            window=window_ms / 1000,
+            max_batch=max_batch,
+        )
+        return self.scheduler
 
-        self.load_templates()
+    def stop_scheduler(self):
+        """Go back to the shared embedder once queued requests are done"""
+        scheduler, self.scheduler = self.scheduler, None
+        if scheduler is not None:
+            scheduler.close()
 
     def download_and_load_model(self, model_path):
         """Download and load the MobileNetV3 TFLite model using MediaPipe"""
@@ -113,101 +275,417 @@ class MobileNetSitelenPonaRecognizer:
             st.error(f"Failed to load model: {str(e)}")
             raise
 
-    def preprocess_image(self, image):
-        """Preprocess image for MediaPipe"""
-        debug_steps = {}
-        debug_steps["original"] = image.copy()
-
-        # Convert to RGB if needed
-        if len(image.shape) == 3:
-            if image.shape[2] == 4:  # RGBA
-                # For canvas input, properly handle alpha channel
-                mask = image[:, :, 3] > 0  # Get mask of non-transparent pixels
-                rgb = image[:, :, :3]
-                # Set transparent pixels to white (background color)
-                white_bg = np.ones_like(rgb) * 255
-                rgb = np.where(mask[:, :, None], rgb, white_bg)
-                image = rgb
-                debug_steps["alpha_handled"] = image.copy()
-            elif image.shape[2] == 3:  # BGR
-                image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-                debug_steps["rgb_converted"] = image.copy()
-        elif len(image.shape) == 2:  # Grayscale
-            image = cv2.cvtColor(image, cv2.COLOR_GRAY2RGB)
-            debug_steps["rgb_converted"] = image.copy()
+    def preprocess_into(self, image, out=None, debug_steps=None):
+        """Letterbox an image onto a white uint8 RGB canvas of ``target_size``.
+
+        The result is written into ``out`` when given (e.g. one row of a batch
+        buffer), so the only allocations are the resized glyph and, for canvas
+        input, the alpha-composited copy. Intermediate images are copied into
+        ``debug_steps`` only when a dict is passed.
+        """
+        width, height = self.target_size
+        if out is None:
+            out = np.empty((height, width, 3), dtype=np.uint8)
+        if debug_steps is not None:
+            debug_steps["original"] = image.copy()
+
+        # Work out the channel order without converting the full-size image; the
+        # channel swap for BGR input happens while copying the resized glyph
+        reverse_channels = False
+        if image.ndim == 3 and image.shape[2] == 4:  # RGBA
+            # For canvas input, set transparent pixels to white (background color)
+            rgb = image[:, :, :3].copy()
+            rgb[image[:, :, 3] == 0] = 255
+            image = rgb
+            if debug_steps is not None:
+                debug_steps["alpha_handled"] = rgb
+        elif image.ndim == 3 and image.shape[2] == 3:  # BGR
+            reverse_channels = True
+            if debug_steps is not None:
+                debug_steps["rgb_converted"] = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        elif image.ndim == 2 and debug_steps is not None:  # Grayscale
+            debug_steps["rgb_converted"] = cv2.cvtColor(image, cv2.COLOR_GRAY2RGB)
 
         # Resize while maintaining aspect ratio
-        target_size = (224, 224)  # MobileNet default size
         h, w = image.shape[:2]
         aspect = w / h
 
         if aspect > 1:
-            new_w = target_size[0]
-            new_h = int(new_w / aspect)
+            new_w = width
+            new_h = max(1, int(new_w / aspect))
         else:
-            new_h = target_size[1]
-            new_w = int(new_h * aspect)
+            new_h = height
+            new_w = max(1, int(new_h * aspect))
 
         resized = cv2.resize(image, (new_w, new_h))
-        debug_steps["aspect_preserved"] = resized.copy()
 
-        # Create white canvas of target size (since we're dealing with black text)
-        canvas = np.ones((target_size[1], target_size[0], 3), dtype=np.uint8) * 255
+        # Center the glyph on a white canvas (since we're dealing with black text)
+        out.fill(255)
+        y_offset = (height - new_h) // 2
+        x_offset = (width - new_w) // 2
+        roi = out[y_offset : y_offset + new_h, x_offset : x_offset + new_w]
+        if resized.ndim == 2:
+            roi[...] = resized[:, :, np.newaxis]
+        elif reverse_channels:
+            roi[...] = resized[:, :, ::-1]
+        else:
+            roi[...] = resized
 
-        # Center the image on the canvas
-        y_offset = (target_size[1] - new_h) // 2
-        x_offset = (target_size[0] - new_w) // 2
-        canvas[y_offset : y_offset + new_h, x_offset : x_offset + new_w] = resized
-        debug_steps["centered"] = canvas.copy()
+        if debug_steps is not None:
+            debug_steps["aspect_preserved"] = roi.copy()
+            debug_steps["centered"] = out.copy()
+
+        return out
+
+    def preprocess_image(self, image):
+        """Preprocess image for MediaPipe, returning pixel values in [0, 1]
+        together with every intermediate step"""
+        debug_steps = {}
+        canvas = self.preprocess_into(image, debug_steps=debug_steps)
 
         # Normalize pixel values to [0, 1]
         processed = canvas.astype(np.float32) / 255.0
 
         return processed, debug_steps
 
-    def get_embedding(self, image):
-        """Get embedding from preprocessed image using MediaPipe"""
+    @staticmethod
+    def embed_with(embedder, processed_uint8):
+        """Embed a preprocessed uint8 RGB image with the given MediaPipe embedder"""
+        mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=processed_uint8)
+        # Already a numpy array
+        return embedder.embed(mp_image).embeddings[0].embedding
+
+    def embed_processed(self, processed_uint8):
+        """Embed an already preprocessed uint8 RGB image of ``target_size``"""
+        scheduler = self.scheduler
+        if scheduler is not None:
+            return scheduler.embed(processed_uint8)
+        with self._embed_lock:
+            return self.embed_with(self.embedder, processed_uint8)
+
+    def get_embedding(self, image, debug=True):
+        """Get embedding from preprocessed image using MediaPipe.
+
+        Intermediate preprocessing images are only collected when ``debug`` is
+        set; otherwise the returned debug steps are empty.
+        """
         try:
-            # Preprocess and create MediaPipe image
-            processed, debug_steps = self.preprocess_image(image)
-
-            # Convert to uint8 for MediaPipe (it doesn't like float input)
-            mp_input = (processed * 255).astype(np.uint8)
-            mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=mp_input)
-
-            # Get embedding
-            embedding_result = self.embedder.embed(mp_image)
-
-            # Return the embedding values (already a numpy array) and debug image
-            return embedding_result.embeddings[0].embedding, debug_steps
+            return self.preprocess_and_embed(image, debug=debug)
         except Exception as e:
             st.error(f"Failed to get embedding: {str(e)}")
             raise
 
-    def load_templates(self):
-        """Load and process all template images"""
-        template_path = Path(self.templates_dir)
-        for template_file in template_path.glob("*.png"):
-            char_name = template_file.stem
+    def preprocess_and_embed(self, image, debug=False):
+        """``get_embedding`` without the Streamlit error report, safe to call
+        from background threads"""
+        # Preprocess straight to the uint8 input MediaPipe expects
+        debug_steps = {} if debug else None
+        processed = self.preprocess_into(image, debug_steps=debug_steps)
+
+        # Return the embedding values and debug image
+        return self.embed_processed(processed), debug_steps or {}
+
+    def embed_batch(self, images):
+        """Embed a list of images and return an ``(N, D)`` float32 matrix.
+
+        Every image is preprocessed into one preallocated uint8 batch buffer and
+        each row of that buffer is handed to MediaPipe directly, so no per-image
+        input arrays are allocated beyond the preprocessing itself.
+        """
+        width, height = self.target_size
+        batch = np.empty((len(images), height, width, 3), dtype=np.uint8)
+        for i, image in enumerate(images):
+            self.preprocess_into(image, out=batch[i])
+
+        scheduler = self.scheduler
+        if scheduler is not None:
+            # Queue the whole batch at once so every worker can take a share
+            embeddings = scheduler.embed_many(list(batch))
+        else:
+            embeddings = [self.embed_processed(row) for row in batch]
+        if not embeddings:
+            return np.empty((0, self.bank.matrix.shape[1]), dtype=np.float32)
+        return np.stack([np.asarray(e, dtype=np.float32) for e in embeddings])
+
+    def preprocessing_config(self):
+        """Parameters that affect template embeddings, used to key the disk cache"""
+        return {
+            "version": RecognizerConfig.PREPROCESSING_VERSION,
+            "target_size": list(self.target_size),
+            "l2_normalize": True,
+        }
+
+    def open_embedding_cache(self):
+        """Return the on-disk embedding cache, or None when caching is disabled
+        or there is no model file to key it on"""
+        if self.cache_dir is None or not Path(self.model_path).is_file():
+            return None
+        return TemplateEmbeddingCache(
+            self.cache_dir, self.model_path, self.preprocessing_config()
+        )
 
-            # Load and preprocess the image
+    def open_template_pack(self, path):
+        """Memory-map the packed template images written by
+        ``scripts/build_atlas.py``, or return None to read every PNG"""
+        if path is None:
+            return None
+        try:
+            return TemplatePack.load(path)
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def find_template_files(self):
+        """Return ``({row_name: path}, {row_name: char_name})`` for all templates,
+        see ``recognition.template_watch.find_template_files``"""
+        return find_template_files(self.templates_dir)
+
+    def read_template(self, template_file, row_name=None, stat=None):
+        """Return ``(original RGB, preprocessed)`` images for one template file.
+
+        The image comes from the template pack when it holds ``row_name`` for a
+        file that still has ``stat``, without opening the file.
+        """
+        packed = None
+        if self.template_pack is not None and row_name is not None:
+            packed = self.template_pack.get(row_name, stat)
+        if packed is not None:
+            original = cv2.cvtColor(packed, cv2.COLOR_GRAY2RGB)
+        else:
             original = cv2.imread(str(template_file))
+            if original is None:
+                # Missing, or caught half-written by the template watcher
+                raise ValueError(f"Could not read template image {template_file}")
             original = cv2.cvtColor(original, cv2.COLOR_BGR2RGB)
-            processed = self.preprocess_image(original)[0]
+        return original, self.preprocess_into(original)
 
-            # Store images for display
-            self.templates[char_name] = {
-                "original": original,
-                "processed": (processed * 255).astype(np.uint8),
+    def load_templates(self):
+        """Load and process all template images and their variants"""
+        template_files, variant_labels = self.find_template_files()
+        snapshot = stat_snapshot(template_files)
+
+        # Reuse embeddings from previous runs for templates that have not changed
+        cache = self.open_embedding_cache()
+        cached_embeddings = cache.load(template_files) if cache else {}
+
+        row_embeddings = {}
+        templates = dict(self.templates)
+        sources = dict(self._template_sources)
+        for row_name, template_file in template_files.items():
+            char_name = variant_labels.get(row_name, row_name)
+            if row_name in cached_embeddings and char_name in templates:
+                row_embeddings[row_name] = cached_embeddings[row_name]
+                continue
+
+            # Load and preprocess the image
+            original, processed = self.read_template(
+                template_file, row_name, snapshot.get(row_name)
+            )
+
+            # Store images for display; canonical templates come first, so a
+            # variant is only shown for characters without one
+            if char_name not in templates:
+                templates[char_name] = {
+                    "original": original,
+                    "processed": processed,
+                }
+                sources[char_name] = row_name
+
+            if row_name in cached_embeddings:
+                row_embeddings[row_name] = cached_embeddings[row_name]
+            else:
+                # Get and store embedding values
+                row_embeddings[row_name] = self.embed_processed(processed)
+
+        if cache is not None and cache.stale:
+            self.save_embedding_cache(cache, template_files, row_embeddings)
+
+        self.install_templates(
+            templates, sources, row_embeddings, variant_labels, snapshot
+        )
+
+    def reload_templates(self):
+        """Bring the bank up to date with the template files on disk.
+
+        Only templates that were added or whose file changed since the last load
+        are read and embedded again; removed ones are dropped. The new bank is
+        built on the side and swapped in at the end, so requests that are being
+        answered meanwhile keep using the complete old bank. Returns the
+        ``TemplateChanges`` that were applied (falsy when nothing changed).
+        """
+        with self._reload_lock:
+            template_files, variant_labels = self.find_template_files()
+            snapshot = stat_snapshot(template_files)
+            changes = diff_snapshots(self._template_snapshot, snapshot)
+            if not changes:
+                return changes
+
+            affected = set(changes.affected())
+            row_embeddings = {
+                row_name: self._row_embeddings[row_name]
+                for row_name in template_files
+                if row_name in self._row_embeddings and row_name not in affected
             }
 
-            # Convert to uint8 for MediaPipe (it doesn't like float input)
-            mp_input = (processed * 255).astype(np.uint8)
-            mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=mp_input)
+            # Each character shows its first template row, so a removed or
+            # edited row, or a new canonical PNG, can change its display image
+            display_rows = {}
+            for row_name in template_files:
+                display_rows.setdefault(
+                    variant_labels.get(row_name, row_name), row_name
+                )
+            templates, sources = {}, {}
+            for char_name, row_name in display_rows.items():
+                if (
+                    self._template_sources.get(char_name) == row_name
+                    and row_name not in affected
+                ):
+                    templates[char_name] = self.templates[char_name]
+                    sources[char_name] = row_name
+
+            for row_name, template_file in template_files.items():
+                char_name = variant_labels.get(row_name, row_name)
+                shown = (
+                    char_name not in templates and display_rows[char_name] == row_name
+                )
+                if row_name in row_embeddings and not shown:
+                    continue
+                original, processed = self.read_template(
+                    template_file, row_name, snapshot.get(row_name)
+                )
+                if shown:
+                    templates[char_name] = {
+                        "original": original,
+                        "processed": processed,
+                    }
+                    sources[char_name] = row_name
+                if row_name not in row_embeddings:
+                    row_embeddings[row_name] = self.embed_processed(processed)
+
+            cache = self.open_embedding_cache()
+            if cache is not None:
+                self.save_embedding_cache(cache, template_files, row_embeddings)
+
+            self.install_templates(
+                templates, sources, row_embeddings, variant_labels, snapshot
+            )
+            self.reload_count += 1
+            self.last_reload = {"time": time.time(), **changes._asdict()}
+            return changes
+
+    def save_embedding_cache(self, cache, template_files, row_embeddings):
+        try:
+            cache.save(template_files, row_embeddings)
+        except OSError as e:
+            # A read-only deployment still works, it just re-embeds next time
+            logger.warning("Could not write template embedding cache: %s", e)
 
-            # Get and store embedding values
-            embedding_result = self.embedder.embed(mp_image)
-            self.embeddings[char_name] = embedding_result.embeddings[0].embedding
+    def install_templates(
+        self, templates, sources, row_embeddings, variant_labels, snapshot
+    ):
+        """Build the bank for ``row_embeddings`` and make it the live one"""
+        # Stack every variant into one contiguous matrix for vectorized matching
+        # and keep one representative embedding per character for display
+        bank = EmbeddingBank.from_dict(
+            row_embeddings, labels=variant_labels, aggregation=self.aggregation
+        )
+        self.build_search_index(bank)
+
+        # Readers take self.bank once per request, so each sees either the old
+        # or the new bank. The bank goes first and the version last: a request
+        # keyed with the old version may store a new-bank result, which is
+        # harmless, but never the other way round.
+        self.templates = templates
+        self.bank = bank
+        self.embeddings = bank.as_dict()
+        self._template_sources = sources
+        self._row_embeddings = row_embeddings
+        self._template_snapshot = snapshot
+        # Results computed against the previous model or templates no longer apply
+        self.model_version = self.compute_model_version()
+        self.result_cache.clear()
+
+    def start_watching(self, interval=RecognizerConfig.TEMPLATE_WATCH_INTERVAL):
+        """Check ``templates_dir`` for changes every ``interval`` seconds and
+        reload the templates that changed"""
+        self.stop_watching()
+        self.watcher = TemplateWatcher(self.reload_templates, interval)
+        return self.watcher
+
+    def stop_watching(self):
+        watcher, self.watcher = self.watcher, None
+        if watcher is not None:
+            watcher.close()
+
+    def compute_model_version(self):
+        """Short digest of the model file, preprocessing and template bank"""
+        model_path = Path(self.model_path)
+        model = file_sha256(model_path) if model_path.exists() else str(model_path)
+        preprocessing = json.dumps(self.preprocessing_config(), sort_keys=True)
+        digest = hashlib.sha256(f"{model}|{preprocessing}|".encode())
+        digest.update(matrix_fingerprint(self.bank.matrix).encode())
+        return digest.hexdigest()[:16]
+
+    def result_key(self, processed, *params):
+        """Result cache key for a preprocessed image and the request parameters"""
+        if self.result_cache_match == "perceptual":
+            image_key = perceptual_hash(processed)
+        else:
+            image_key = image_digest(processed)
+        return (image_key, self.model_version, *params)
+
+    def build_search_index(self, bank):
+        """Attach an approximate index to the bank unless exact search is configured.
+
+        Exact ("flat") search is the bank's own matrix product. Other indexes are
+        saved next to the embedding cache and reused while the bank is unchanged.
+        For the "quantized" index the bank's float32 vectors are memory-mapped
+        from the cache directory too, so each process only keeps the codes in
+        memory of its own.
+        """
+        if self.index_kind == "flat":
+            return
+
+        vectors = bank.search_vectors()
+        fingerprint = matrix_fingerprint(vectors)
+        index_path = None
+        index = None
+        if self.cache_dir is not None and self.index_kind == "quantized":
+            vectors_path = Path(self.cache_dir) / f"vectors-{fingerprint[:16]}.npy"
+            try:
+                vectors = map_vectors(vectors, vectors_path)
+            except OSError as e:
+                logger.warning("Could not memory-map the search vectors: %s", e)
+            else:
+                bank.map_search_vectors(vectors)
+                # The previous bank's file; processes still mapping it keep
+                # their open handle
+                previous, self._mapped_vectors = self._mapped_vectors, vectors_path
+                if previous is not None and previous != vectors_path:
+                    previous.unlink(missing_ok=True)
+        if self.cache_dir is not None:
+            index_path = Path(self.cache_dir) / f"index-{self.index_kind}.npz"
+            index = load_index(
+                index_path, self.index_kind, fingerprint, self.index_params, vectors
+            )
+        if index is None:
+            index = build_index(self.index_kind, vectors, **self.index_params)
+            if index_path is not None:
+                try:
+                    save_index(index, index_path, fingerprint)
+                except OSError as e:
+                    logger.warning("Could not write search index: %s", e)
+        bank.attach_index(index)
+
+    def score_char(self, embedding, char_name):
+        """Similarity of an input embedding to one character, aggregated over all
+        of its reference variants"""
+        return self.bank.score_for(embedding, char_name)
+
+    def warm_up(self):
+        """Run one blank image through the embedder so the first learner request
+        does not pay for MediaPipe's lazy graph initialization"""
+        blank = np.full((*self.target_size[::-1], 3), 255, dtype=np.uint8)
+        self.embed_processed(blank)
 
     def cosine_similarity(self, a, b):
         """Compute cosine similarity between two embeddings"""
@@ -218,39 +696,335 @@ class MobileNetSitelenPonaRecognizer:
         # Return raw similarity score
         return similarity
 
-    def recognize(self, drawn_image, threshold=0.7):
-        """Recognize drawn character by comparing embeddings"""
-        # Get embedding for drawn image
-        input_embedding, debug_steps = self.get_embedding(drawn_image)
+    def recognize_topk(self, drawn_image, k=5):
+        """Return the ``k`` best matching characters for a drawing, best first.
 
-        if input_embedding is None:
-            return None, 0
+        Each candidate is a ``Candidate(name, score, margin)`` tuple, where the
+        margin is the score gap to the next-ranked character.
+        """
+        processed = self.preprocess_into(drawn_image)
+        candidates = self.result_cache.get_or_compute(
+            self.result_key(processed, "topk", k),
+            lambda: self.bank.top_k(self.embed_processed(processed), k),
+        )
+        return list(candidates)
+
+    def recognize_batch(self, images, k=5):
+        """Recognize many drawings at once.
+
+        All inputs are embedded into one matrix and compared against the template
+        bank with a single matrix-matrix product. Returns one ranked list of
+        ``Candidate(name, score, margin)`` tuples per input image.
+        """
+        return self.bank.top_k_batch(self.embed_batch(images), k)
+
+    def score_image(self, image, char_name):
+        """Embed an image and score it against one character.
 
-        # Compare with all templates
-        best_match = None
-        best_score = 0
-        all_scores = {}
+        Returns ``(embedding, score)``. Repeated submissions of the same image
+        are answered from the result cache.
+        """
+        processed = self.preprocess_into(image)
 
-        for char_name, template_embedding in self.embeddings.items():
-            # Calculate similarity score
-            score = self.cosine_similarity(input_embedding, template_embedding)
-            all_scores[char_name] = float(score)
+        def compute():
+            embedding = self.embed_processed(processed)
+            return embedding, self.score_char(embedding, char_name)
 
-            if score > best_score:
-                best_score = score
-                best_match = char_name
+        return self.result_cache.get_or_compute(
+            self.result_key(processed, "score", char_name), compute
+        )
+
+    def score_frame(self, frame):
+        """Score a video frame against every character.
 
-        # Store scores for debug display
-        self.all_scores = all_scores
+        Returns ``(names, scores)`` from one bank, so a reload in between cannot
+        misalign them. Frames bypass the result cache: the stream already skips
+        unchanged ones and would otherwise fill it with near-duplicates.
+        """
+        bank = self.bank
+        embedding = self.embed_processed(self.preprocess_into(frame))
+        return bank.names, bank.scores(embedding)
 
+    def recognize(self, drawn_image, threshold=0.7):
+        """Recognize drawn character by comparing embeddings.
+
+        Repeated submissions of the same drawing are answered from the result
+        cache without embedding it again.
+        """
+        processed = self.preprocess_into(drawn_image)
+        return self.result_cache.get_or_compute(
+            self.result_key(processed, "recognize", threshold),
+            lambda: self.match(self.embed_processed(processed), threshold),
+        )
+
+    def match(self, input_embedding, threshold=0.7):
+        """Best character for an embedding, or None when it scores below the
+        threshold"""
+        if input_embedding is None:
+            return None, 0
+
+        # Compare with all templates through the bank's search index
+        best = self.bank.top_k(input_embedding, k=1)
+        if not best or best[0].score <= 0:
+            return None, 0
+
+        best_match, best_score = best[0].name, best[0].score
         if best_score >= threshold:
             return best_match, best_score
         return None, best_score
 
 
+@st.cache_resource(show_spinner="Loading glyph templates...")
+def get_recognizer(
+    templates_dir=RecognizerConfig.TEMPLATES_DIR,
+    model_path=RecognizerConfig.MODEL_PATH,
+    target_size=RecognizerConfig.TARGET_SIZE,
+    aggregation=RecognizerConfig.AGGREGATION,
+    index=RecognizerConfig.INDEX,
+):
+    """Return the process-wide recognizer for the given model, templates,
+    preprocessing size, variant aggregation and search index.
+
+    Streamlit keeps one instance per argument combination for the lifetime of the
+    server process, so reruns and concurrent sessions share the loaded embedder and
+    template embeddings instead of rebuilding them on every interaction. The cache
+    holds a lock while building, so concurrent first requests wait for a single
+    build rather than racing each other.
+    """
+    recognizer = MobileNetSitelenPonaRecognizer(
+        templates_dir=templates_dir,
+        model_path=model_path,
+        target_size=target_size,
+        aggregation=aggregation,
+        index=index,
+    )
+    recognizer.warm_up()
+    if RecognizerConfig.EMBED_WORKERS > 0:
+        recognizer.start_scheduler()
+    if RecognizerConfig.TEMPLATE_WATCH_INTERVAL > 0:
+        recognizer.start_watching()
+    return recognizer
+
+
+def rebuild_recognizer():
+    """Drop every cached recognizer and build the default one again, e.g. after
+    the model file changed on disk. Template edits alone only need
+    ``reload_templates()``, or ``SITELEN_TEMPLATE_WATCH`` to pick them up."""
+    get_recognizer().stop_scheduler()
+    get_recognizer().stop_watching()
+    get_recognizer.clear()
+    return get_recognizer()
+
+
 def create_recognizer():
     """Create and return a MobileNetSitelenPonaRecognizer instance."""
-    return MobileNetSitelenPonaRecognizer()
+    return get_recognizer()
+
+
+@st.cache_resource
+def load_glyph_atlas(path=RecognizerConfig.GLYPH_ATLAS):
+    """Return the packed Learn tab glyph renders, or None if they were not built.
+
+    The atlas is read once per server process and every glyph is a slice of it,
+    instead of one file read per glyph per rerun.
+    """
+    try:
+        return GlyphAtlas.load(path)
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+@st.cache_resource
+def get_catalog_cache(
+    svg_dir=RecognizerConfig.SVG_DIR, dark_svg_dir=RecognizerConfig.DARK_SVG_DIR
+):
+    """Return the process-wide holder of the glyph catalog"""
+    return CatalogCache(svg_dir, dark_svg_dir)
+
+
+def get_glyph_catalog():
+    """Return the glyph names, paths and SVG markup, rescanning the SVG
+    directories only when a glyph was added, removed or renamed"""
+    return get_catalog_cache().get()
+
+
+@st.fragment
+def render_glyph_grid(cols_per_row=8):
+    """Show every glyph in a grid, from the atlas when it has been built and
+    from the catalog's in-memory SVG markup otherwise.
+
+    As a fragment, flipping the glyph colour only reruns the grid.
+    """
+    # Add glyph color toggle
+    use_white_glyphs = st.toggle(
+        "Use white glyphs",
+        value=st.session_state[SessionKey.WHITE_GLYPHS],
+        key=SessionKey.WHITE_GLYPHS,
+        help="Switch between black and white glyphs",
+    )
+    st.write("")  # Add some spacing
+
+    catalog = get_glyph_catalog()
+    glyph_atlas = load_glyph_atlas()
+    theme = "dark" if use_white_glyphs else "light"
+    glyph_boxes = glyph_atlas.boxes.get(theme, {}) if glyph_atlas else {}
+
+    # Create a grid layout
+    for i in range(0, len(catalog.names), cols_per_row):
+        row = catalog.names[i : i + cols_per_row]
+        cols = st.columns(cols_per_row)
+        for j, glyph_name in enumerate(row):
+            with cols[j]:
+                # Create a container for each glyph
+                with st.container():
+                    if glyph_name in glyph_boxes:
+                        glyph = glyph_atlas.glyph(glyph_name, theme)
+                    else:
+                        glyph = catalog.svg(glyph_name, theme)
+                    st.image(glyph, width=60)
+                    st.caption(glyph_name)
+
+
+@st.cache_resource
+def get_inference_service(
+    workers=RecognizerConfig.WORKERS, max_pending=RecognizerConfig.MAX_PENDING
+):
+    """Return the process-wide background inference service.
+
+    Every session submits its checks to the same pool, so inference capacity is
+    shared and bounded no matter how many users are connected.
+    """
+    return InferenceService(workers=workers, max_pending=max_pending)
+
+
+def check_image(recognizer, image, char_name, debug):
+    """Embed an image and score it against one character.
+
+    Runs on an inference worker thread, so it must not call Streamlit. Without
+    debug output, repeated checks of the same drawing come from the recognizer's
+    result cache.
+    """
+    if not debug:
+        embedding, confidence = recognizer.score_image(image, char_name)
+        return embedding, {}, confidence
+    embedding, debug_steps = recognizer.preprocess_and_embed(image, debug=debug)
+    return embedding, debug_steps, recognizer.score_char(embedding, char_name)
+
+
+def check_in_background(recognizer, image, char_name, debug):
+    """Run ``check_image`` on the inference service and wait for the result.
+
+    The session's previous ticket is passed along, so clicking again on the same
+    input joins the check already in flight and a check for an input that has
+    since changed is cancelled. While waiting the script keeps updating a
+    status line, which lets Streamlit stop this run as soon as the user
+    interacts again instead of blocking until inference finishes.
+    """
+    service = get_inference_service()
+    ticket = service.submit(
+        input_key(id(recognizer), image, char_name, debug),
+        check_image,
+        recognizer,
+        image,
+        char_name,
+        debug,
+        previous=st.session_state.get(SessionKey.CHECK_TICKET),
+    )
+    st.session_state[SessionKey.CHECK_TICKET] = ticket
+
+    status = st.empty()
+    start = time.monotonic()
+    while not ticket.wait(timeout=0.1):
+        status.caption(f"Checking... {time.monotonic() - start:.1f}s")
+    status.empty()
+    return ticket.result()
+
+
+def get_stream_recognizer(recognizer):
+    """Return this session's live webcam stream, created on first use.
+
+    Each session smooths its own frames, while the embedding work goes to the
+    recognizer shared by every session.
+    """
+    stream = st.session_state.get(SessionKey.STREAM)
+    if stream is None or stream.score != recognizer.score_frame:
+        stream = StreamRecognizer(
+            recognizer.score_frame,
+            target_fps=RecognizerConfig.STREAM_FPS,
+            window=RecognizerConfig.STREAM_WINDOW,
+            change_threshold=RecognizerConfig.STREAM_CHANGE_THRESHOLD,
+        )
+        st.session_state[SessionKey.STREAM] = stream
+    return stream
+
+
+@st.fragment(run_every=RecognizerConfig.STREAM_REFRESH)
+def render_live_feedback(stream, char_name):
+    """Show the smoothed score of the live stream, refreshing on a timer
+    without rerunning the rest of the page"""
+    if char_name == SpecialChar.JAKI:
+        st.info(SpecialChar.JAKI_DESCRIPTION)
+        return
+
+    confidence = stream.score_for(char_name)
+    threshold = st.session_state[SessionKey.THRESHOLD]
+    if confidence is None:
+        st.caption("Hold your drawing up to the camera...")
+    elif confidence >= threshold:
+        st.success(f"Great job! Similarity score: {confidence:.4f}")
+    elif confidence >= threshold * 0.7:
+        st.warning(f"Getting there! Similarity score: {confidence:.4f}")
+    else:
+        st.error(f"Keep practicing! Similarity score: {confidence:.4f}")
+
+    candidates = stream.candidates(k=1)
+    if candidates and candidates[0].name != char_name:
+        st.caption(f"Looks most like: {candidates[0].name}")
+    if st.session_state[SessionKey.DEBUG_MODE]:
+        stats = stream.stats()
+        latency = stats["latency"]
+        st.caption(
+            f"Frames: {stats['frames']}, recognized {stats['processed']}, "
+            f"skipped {stats['unchanged']} unchanged and "
+            f"{stats['rate_limited']} over the frame rate"
+            + (f", last took {latency * 1000:.0f} ms" if latency is not None else "")
+        )
+
+
+def render_live_webcam(recognizer, char_name):
+    """Recognize the webcam stream continuously.
+
+    Needs the ``webcam`` extra (streamlit-webrtc); returns False without it so
+    the caller can fall back to single pictures.
+    """
+    try:
+        from streamlit_webrtc import webrtc_streamer
+    except ImportError:
+        st.info(
+            "Live recognition needs streamlit-webrtc; install the `webcam` "
+            "extra to enable it. Take a picture instead:"
+        )
+        return False
+
+    stream = get_stream_recognizer(recognizer)
+
+    def on_frame(frame):
+        # Runs on streamlit-webrtc's thread, which drops frames that arrive
+        # while this one is still being processed
+        stream.process(frame.to_ndarray(format="bgr24"))
+        return frame
+
+    ctx = webrtc_streamer(
+        key=UIKey.WEBRTC_STREAMER,
+        video_frame_callback=on_frame,
+        media_stream_constraints={"video": True, "audio": False},
+        async_processing=True,
+    )
+    if ctx.state.playing:
+        render_live_feedback(stream, char_name)
+    else:
+        stream.reset()
+    return True
 
 
 def main():
@@ -272,11 +1046,9 @@ def main():
         st.session_state[SessionKey.REFERENCE_BUTTON_KEY] = 0
     if SessionKey.SELECTED_CHAR not in st.session_state:
         # Initialize with a random character
-        available_chars = sorted(os.listdir("sitelen_pona_svgs"))
-        available_chars = [
-            f[:-4] for f in available_chars if f.endswith(".svg")
-        ]  # remove .svg
-        st.session_state[SessionKey.SELECTED_CHAR] = random.choice(available_chars)
+        st.session_state[SessionKey.SELECTED_CHAR] = random.choice(
+            get_glyph_catalog().names
+        )
     if SessionKey.WHITE_GLYPHS not in st.session_state:
         st.session_state[SessionKey.WHITE_GLYPHS] = False
     if SessionKey.STROKE_THICKNESS not in st.session_state:
@@ -297,50 +1069,23 @@ def main():
     # Main app
     recognizer = create_recognizer()
 
-    # Get all SVG files (strip _dark suffix for naming)
-    svg_files = []
-    for f in os.listdir("sitelen_pona_svgs"):
-        if f.endswith(".svg"):
-            name = f[:-4]  # remove .svg
-            svg_files.append(name)
-    svg_files.sort()
-
     # Create tabs for main content
     tab_practice, tab_learn = st.tabs(["Practice", "Learn"])
 
     with tab_learn:
         st.header("Sitelen Pona Glyphs")
-
-        # Add glyph color toggle
-        use_white_glyphs = st.toggle(
-            "Use white glyphs",
-            value=st.session_state[SessionKey.WHITE_GLYPHS],
-            key=SessionKey.WHITE_GLYPHS,
-            help="Switch between black and white glyphs",
-        )
-        st.write("")  # Add some spacing
-
-        # Create a grid layout
-        cols_per_row = 8
-        for i in range(0, len(svg_files), cols_per_row):
-            row = svg_files[i : i + cols_per_row]
-            cols = st.columns(cols_per_row)
-            for j, glyph_name in enumerate(row):
-                with cols[j]:
-                    # Create a container for each glyph
-                    with st.container():
-                        # Construct SVG path with _dark suffix if needed
-                        if use_white_glyphs:
-                            svg_path = f"sitelen_pona_svgs_dark/{glyph_name}_dark.svg"
-                        else:
-                            svg_path = f"sitelen_pona_svgs/{glyph_name}.svg"
-
-                        st.image(svg_path, width=60)
-                        st.caption(glyph_name)
+        render_glyph_grid()
 
     with tab_practice:
         # Character selection in main area
         available_chars = sorted(recognizer.templates.keys())
+        if st.session_state[SessionKey.SELECTED_CHAR] not in recognizer.templates:
+            # The template was removed by a reload: pick another character and
+            # drop the selector state and check result kept for the old one
+            st.session_state[SessionKey.SELECTED_CHAR] = random.choice(available_chars)
+            st.session_state.pop(UIKey.CHAR_SELECTOR, None)
+            st.session_state.pop(SessionKey.CHECK_TICKET, None)
+            on_char_selection()
 
         # Create two columns with 2:1 ratio
         col1, col2 = st.columns([2, 1])
@@ -418,6 +1163,13 @@ def main():
                 value=st.session_state[SessionKey.DEBUG_MODE],
                 help="Show detailed information about image processing and recognition",
             )
+            if st.session_state[SessionKey.DEBUG_MODE]:
+                cache_stats = recognizer.result_cache.stats()
+                st.caption(
+                    f"Result cache: {cache_stats['hits']} hits, "
+                    f"{cache_stats['misses']} misses"
+                )
+                st.caption(f"Template reloads: {recognizer.reload_count}")
 
             st.divider()
 
@@ -476,9 +1228,14 @@ def main():
                                 st.balloons()
                                 return
 
-                            # Get embedding and debug image for uploaded image
-                            uploaded_embedding, uploaded_debug_steps = (
-                                recognizer.get_embedding(image)
+                            # Get embedding, debug image and score for uploaded image
+                            uploaded_embedding, uploaded_debug_steps, confidence = (
+                                check_in_background(
+                                    recognizer,
+                                    image,
+                                    selected_char,
+                                    st.session_state[SessionKey.DEBUG_MODE],
+                                )
                             )
 
                             # Get template info
@@ -487,11 +1244,6 @@ def main():
                             ]
                             template_embedding = recognizer.embeddings[selected_char]
 
-                            # Compare embeddings
-                            confidence = recognizer.cosine_similarity(
-                                uploaded_embedding, template_embedding
-                            )
-
                             # Show recognition result first
                             st.subheader("Recognition Result")
                             if confidence >= st.session_state[SessionKey.THRESHOLD]:
@@ -561,9 +1313,7 @@ def main():
                                     with debug_col2:
                                         st.write("Uploaded Image:")
                                         st.image(
-                                            (
-                                                uploaded_debug_steps["centered"] * 255
-                                            ).astype(np.uint8),
+                                            uploaded_debug_steps["centered"],
                                             width=150,
                                         )
 
@@ -603,9 +1353,18 @@ def main():
                             st.error(f"Error processing image: {str(e)}")
             else:  # Webcam mode
                 st.subheader("Capture Area:")
-                picture = st.camera_input(
-                    "Take a picture of your drawing", key=UIKey.CAMERA_INPUT
+                live = st.toggle(
+                    "Live recognition",
+                    key=UIKey.LIVE_WEBCAM,
+                    help="Check the webcam stream continuously instead of "
+                    "taking a picture",
                 )
+                if live and render_live_webcam(recognizer, selected_char):
+                    picture = None
+                else:
+                    picture = st.camera_input(
+                        "Take a picture of your drawing", key=UIKey.CAMERA_INPUT
+                    )
                 if picture is not None:
                     # Display captured image preview
                     image = cv2.imdecode(
@@ -624,9 +1383,14 @@ def main():
                                 st.balloons()
                                 return
 
-                            # Get embedding and debug image for captured image
-                            captured_embedding, captured_debug_steps = (
-                                recognizer.get_embedding(image)
+                            # Get embedding, debug image and score for captured image
+                            captured_embedding, captured_debug_steps, confidence = (
+                                check_in_background(
+                                    recognizer,
+                                    image,
+                                    selected_char,
+                                    st.session_state[SessionKey.DEBUG_MODE],
+                                )
                             )
 
                             # Get template info
@@ -635,11 +1399,6 @@ def main():
                             ]
                             template_embedding = recognizer.embeddings[selected_char]
 
-                            # Compare embeddings
-                            confidence = recognizer.cosine_similarity(
-                                captured_embedding, template_embedding
-                            )
-
                             # Show recognition result first
                             st.subheader("Recognition Result")
                             if confidence >= st.session_state[SessionKey.THRESHOLD]:
@@ -709,9 +1468,7 @@ def main():
                                     with debug_col2:
                                         st.write("Captured Image:")
                                         st.image(
-                                            (
-                                                captured_debug_steps["centered"] * 255
-                                            ).astype(np.uint8),
+                                            captured_debug_steps["centered"],
                                             width=150,
                                         )
 
@@ -788,15 +1545,17 @@ def main():
                         st.balloons()
                         return
 
-                    # Get embedding and debug image
-                    drawn_embedding, drawn_debug_steps = recognizer.get_embedding(
-                        canvas_result.image_data
+                    # Get embedding, debug image and score
+                    drawn_embedding, drawn_debug_steps, confidence = (
+                        check_in_background(
+                            recognizer,
+                            canvas_result.image_data,
+                            selected_char,
+                            st.session_state[SessionKey.DEBUG_MODE],
+                        )
                     )
                     template_debug = recognizer.templates[selected_char]["processed"]
                     template_embedding = recognizer.embeddings[selected_char]
-                    confidence = recognizer.cosine_similarity(
-                        drawn_embedding, template_embedding
-                    )
 
                     # Show recognition result first
                     st.subheader("Recognition Result")
@@ -848,12 +1607,7 @@ def main():
                             debug_col1, debug_col2 = st.columns(2)
                             with debug_col1:
                                 st.write("Drawing:")
-                                st.image(
-                                    (drawn_debug_steps["centered"] * 255).astype(
-                                        np.uint8
-                                    ),
-                                    width=150,
-                                )
+                                st.image(drawn_debug_steps["centered"], width=150)
                             with debug_col2:
                                 st.write("Template:")
                                 st.image(template_debug, width=150)
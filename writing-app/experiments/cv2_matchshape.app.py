@@ -1,14 +1,134 @@
 import cv2
 import numpy as np
 from pathlib import Path
+import sys
 import streamlit as st
 from streamlit_drawable_canvas import st_canvas
 
+# Allow importing the recognition package when run from experiments/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-class SitelenPonaTeacher:
-    def __init__(self, templates_dir="../templates"):
+from recognition.engine import Observer, ScoringEngine  # noqa: E402
+from recognition.shapes import ShapeIndex, main_contour  # noqa: E402
+
+
+def draw_debug_visualization(image, contour, centroid=None):
+    """Draw contour and centroid on image for visualization"""
+    # Convert grayscale to RGB for colored visualization
+    vis_image = cv2.cvtColor(image, cv2.COLOR_GRAY2RGB)
+
+    # Draw contour in red
+    cv2.drawContours(vis_image, [contour], -1, (255, 0, 0), 2)
+
+    # Draw centroid in green if provided
+    if centroid is not None:
+        cx, cy = centroid
+        cv2.circle(vis_image, (int(cx), int(cy)), 5, (0, 255, 0), -1)
+
+    return vis_image
+
+
+def contour_centroid(contour):
+    moments = cv2.moments(contour)
+    if moments["m00"] == 0:
+        return None
+    return moments["m10"] / moments["m00"], moments["m01"] / moments["m00"]
+
+
+def shape_score(similarity):
+    """Map a matchShapes distance, or an array of them, to a 0-1 score"""
+    # Based on empirical testing with Sitelen Pona glyphs:
+    # similarity < 1.0 = very good match (>80%)
+    # similarity 1.0-3.0 = decent match (40-80%)
+    # similarity > 3.0 = poor match (<40%)
+    similarity = np.asarray(similarity, dtype=np.float64)
+
+    # Use a piece-wise function for more intuitive scoring
+    return np.select(
+        [similarity < 1.0, similarity < 3.0],
+        [
+            # Very good matches: map [0, 1] to [80%, 100%]
+            0.8 + (0.2 * (1 - similarity)),
+            # Decent matches: map [1, 3] to [40%, 80%]
+            0.4 + (0.4 * (3 - similarity) / 2),
+        ],
+        # Poor matches: exponential decay for scores below 40%
+        0.4 * np.exp(-0.3 * (similarity - 3)),
+    )
+
+
+class StreamlitDebugObserver(Observer):
+    """Renders the teacher's debug events with Streamlit"""
+
+    def on_input(self, image, template):
+        with st.expander("Debug: Input Images", expanded=True):
+            col1, col2 = st.columns(2)
+            with col1:
+                st.write("Drawn Image:")
+                st.image(image, caption="Raw Input", width=200)
+            with col2:
+                st.write("Target Template:")
+                st.image(template, caption="Template", width=200)
+
+    def on_preprocessed(self, image, template):
+        with st.expander("Debug: Preprocessed Images", expanded=True):
+            col1, col2 = st.columns(2)
+            with col1:
+                st.write("Processed Drawing:")
+                st.image(image, caption="Processed Input", width=200)
+            with col2:
+                st.write("Target Template:")
+                st.image(template, caption="Template", width=200)
+
+    def on_contours(self, drawing_count, template_count):
+        with st.expander("Debug: Contour Analysis", expanded=True):
+            st.write(f"Number of contours in drawing: {drawing_count}")
+            st.write(f"Number of contours in template: {template_count}")
+
+    def on_main_contours(
+        self, image, contour, centroid, template, template_contour, template_centroid
+    ):
+        with st.expander("Debug: Contour Visualization", expanded=True):
+            col1, col2 = st.columns(2)
+            with col1:
+                st.write("Drawing Contours and Centroid:")
+                vis_drawing = draw_debug_visualization(image, contour, centroid)
+                st.image(vis_drawing, caption="Drawing Analysis", width=200)
+            with col2:
+                st.write("Template Contours and Centroid:")
+                vis_template = draw_debug_visualization(
+                    template, template_contour, template_centroid
+                )
+                st.image(vis_template, caption="Template Analysis", width=200)
+
+        with st.expander("Debug: Contour Measurements", expanded=True):
+            st.write(f"Drawing contour area: {cv2.contourArea(contour):.2f}")
+            st.write(f"Template contour area: {cv2.contourArea(template_contour):.2f}")
+
+    def on_shape(self, similarity, score):
+        with st.expander("Debug: Shape Analysis", expanded=True):
+            st.write(f"Raw matchShapes similarity score: {similarity:.6f}")
+
+        with st.expander("Debug: Score Conversion", expanded=True):
+            st.write(f"Raw similarity: {similarity:.6f}")
+            st.write(
+                f"Score category: {'Very good' if similarity < 1.0 else 'Decent' if similarity < 3.0 else 'Poor'}"
+            )
+            st.write(f"Final score: {score:.2%}")
+
+
+class SitelenPonaTeacher(ScoringEngine):
+    def __init__(self, templates_dir="../templates", observers=(), shortlist=None):
+        """Load the templates and index their contour shape descriptors.
+
+        With ``shortlist``, ranking first compares the leading Hu moments and
+        computes the full shape distance for that many templates only.
+        """
+        super().__init__(observers)
         self.templates_dir = templates_dir
+        self.shortlist = shortlist
         self.templates = self.load_templates()
+        self.shape_index = ShapeIndex.from_images(self.templates)
 
     def load_templates(self):
         """Load all template images"""
@@ -67,150 +187,61 @@ class SitelenPonaTeacher:
 
         return binary
 
-    def draw_debug_visualization(self, image, contour, centroid=None):
-        """Draw contour and centroid on image for visualization"""
-        # Convert grayscale to RGB for colored visualization
-        vis_image = cv2.cvtColor(image, cv2.COLOR_GRAY2RGB)
-
-        # Draw contour in red
-        cv2.drawContours(vis_image, [contour], -1, (255, 0, 0), 2)
-
-        # Draw centroid in green if provided
-        if centroid is not None:
-            cx, cy = centroid
-            cv2.circle(vis_image, (int(cx), int(cy)), 5, (0, 255, 0), -1)
-
-        return vis_image
-
     def analyze_drawing(self, drawn_image, target_char):
         """Analyze drawing compared to target character"""
         if target_char not in self.templates:
             return None
 
-        # Debug: Show input images
-        with st.expander("Debug: Input Images", expanded=True):
-            col1, col2 = st.columns(2)
-            with col1:
-                st.write("Drawn Image:")
-                st.image(drawn_image, caption="Raw Input", width=200)
-            with col2:
-                st.write("Target Template:")
-                st.image(self.templates[target_char], caption="Template", width=200)
+        target_template = self.templates[target_char]
+        self.emit("input", image=drawn_image, template=target_template)
 
         # Preprocess drawn image
         processed_drawing = self.preprocess_image(drawn_image)
-        target_template = self.templates[target_char]
-
-        # Debug: Show preprocessed images
-        with st.expander("Debug: Preprocessed Images", expanded=True):
-            col1, col2 = st.columns(2)
-            with col1:
-                st.write("Processed Drawing:")
-                st.image(processed_drawing, caption="Processed Input", width=200)
-            with col2:
-                st.write("Target Template:")
-                st.image(target_template, caption="Template", width=200)
+        self.emit("preprocessed", image=processed_drawing, template=target_template)
 
         # Calculate various similarity metrics
         feedback = {}
 
-        # Find contours
+        # Find contours; the template's come from the shape index
         contours_drawing, _ = cv2.findContours(
             processed_drawing, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
         )
-        contours_target, _ = cv2.findContours(
-            target_template, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
+        template_count = 0
+        if target_char in self.shape_index:
+            main_contour_target, template_count, area_target, target_centroid = (
+                self.shape_index.entry(target_char)
+            )
+        self.emit(
+            "contours",
+            drawing_count=len(contours_drawing),
+            template_count=template_count,
         )
 
-        # Debug: Show contour information
-        with st.expander("Debug: Contour Analysis", expanded=True):
-            st.write(f"Number of contours in drawing: {len(contours_drawing)}")
-            st.write(f"Number of contours in template: {len(contours_target)}")
-
-        if contours_drawing and contours_target:
+        if contours_drawing and template_count:
             # Compare main contours
             main_contour_drawing = max(contours_drawing, key=cv2.contourArea)
-            main_contour_target = max(contours_target, key=cv2.contourArea)
-
-            # Calculate centroids
-            moments_drawing = cv2.moments(main_contour_drawing)
-            moments_target = cv2.moments(main_contour_target)
-
-            drawing_centroid = None
-            target_centroid = None
-
-            if moments_drawing["m00"] != 0:
-                cx_drawing = moments_drawing["m10"] / moments_drawing["m00"]
-                cy_drawing = moments_drawing["m01"] / moments_drawing["m00"]
-                drawing_centroid = (cx_drawing, cy_drawing)
-
-            if moments_target["m00"] != 0:
-                cx_target = moments_target["m10"] / moments_target["m00"]
-                cy_target = moments_target["m01"] / moments_target["m00"]
-                target_centroid = (cx_target, cy_target)
-
-            # Debug: Show contour visualization
-            with st.expander("Debug: Contour Visualization", expanded=True):
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.write("Drawing Contours and Centroid:")
-                    vis_drawing = self.draw_debug_visualization(
-                        processed_drawing, main_contour_drawing, drawing_centroid
-                    )
-                    st.image(vis_drawing, caption="Drawing Analysis", width=200)
-                with col2:
-                    st.write("Template Contours and Centroid:")
-                    vis_template = self.draw_debug_visualization(
-                        target_template, main_contour_target, target_centroid
-                    )
-                    st.image(vis_template, caption="Template Analysis", width=200)
-
-            # Debug: Show contour areas
-            with st.expander("Debug: Contour Measurements", expanded=True):
-                st.write(
-                    f"Drawing contour area: {cv2.contourArea(main_contour_drawing):.2f}"
-                )
-                st.write(
-                    f"Template contour area: {cv2.contourArea(main_contour_target):.2f}"
-                )
+            drawing_centroid = contour_centroid(main_contour_drawing)
+            self.emit(
+                "main_contours",
+                image=processed_drawing,
+                contour=main_contour_drawing,
+                centroid=drawing_centroid,
+                template=target_template,
+                template_contour=main_contour_target,
+                template_centroid=target_centroid,
+            )
 
             # Shape similarity using contours and Hu moments
             similarity = cv2.matchShapes(
                 main_contour_drawing, main_contour_target, cv2.CONTOURS_MATCH_I2, 0
             )
-            # Debug: Show raw similarity score
-            with st.expander("Debug: Shape Analysis", expanded=True):
-                st.write(f"Raw matchShapes similarity score: {similarity:.6f}")
-
-            # Based on empirical testing with Sitelen Pona glyphs:
-            # similarity < 1.0 = very good match (>80%)
-            # similarity 1.0-3.0 = decent match (40-80%)
-            # similarity > 3.0 = poor match (<40%)
-
-            # Use a piece-wise function for more intuitive scoring
-            if similarity < 1.0:
-                # Very good matches: map [0, 1] to [80%, 100%]
-                shape_score = 0.8 + (0.2 * (1 - similarity))
-            elif similarity < 3.0:
-                # Decent matches: map [1, 3] to [40%, 80%]
-                shape_score = 0.4 + (0.4 * (3 - similarity) / 2)
-            else:
-                # Poor matches: exponential decay for scores below 40%
-                shape_score = 0.4 * np.exp(-0.3 * (similarity - 3))
-
-            # Add more debug info about score conversion
-            with st.expander("Debug: Score Conversion", expanded=True):
-                st.write(f"Raw similarity: {similarity:.6f}")
-                st.write(
-                    f"Score category: {'Very good' if similarity < 1.0 else 'Decent' if similarity < 3.0 else 'Poor'}"
-                )
-                st.write(f"Final score: {shape_score:.2%}")
-
-            feedback["shape_similarity"] = shape_score
+            feedback["shape_similarity"] = float(shape_score(similarity))
+            self.emit(
+                "shape", similarity=similarity, score=feedback["shape_similarity"]
+            )
 
             # Size comparison with stricter scoring
             area_drawing = cv2.contourArea(main_contour_drawing)
-            area_target = cv2.contourArea(main_contour_target)
             area_ratio = min(area_drawing, area_target) / max(area_drawing, area_target)
             # Make size scoring more lenient
             size_ratio = np.sqrt(
@@ -219,14 +250,9 @@ class SitelenPonaTeacher:
             feedback["size_accuracy"] = size_ratio
 
             # Position analysis with normalized distance
-            moments_drawing = cv2.moments(main_contour_drawing)
-            moments_target = cv2.moments(main_contour_target)
-
-            if moments_drawing["m00"] != 0 and moments_target["m00"] != 0:
-                cx_drawing = moments_drawing["m10"] / moments_drawing["m00"]
-                cy_drawing = moments_drawing["m01"] / moments_drawing["m00"]
-                cx_target = moments_target["m10"] / moments_target["m00"]
-                cy_target = moments_target["m01"] / moments_target["m00"]
+            if drawing_centroid is not None and target_centroid is not None:
+                cx_drawing, cy_drawing = drawing_centroid
+                cx_target, cy_target = target_centroid
 
                 # Calculate normalized distance (as a fraction of image size)
                 img_diagonal = np.sqrt(100 * 100 + 100 * 100)  # Image is 100x100
@@ -241,11 +267,23 @@ class SitelenPonaTeacher:
 
         return feedback
 
+    def score_all(self, drawn_image):
+        """Shape score of a drawing against every (or every short-listed)
+        template"""
+        contour = main_contour(self.preprocess_image(drawn_image))
+        if contour is None:
+            return {}
+        indices, distances = self.shape_index.search(contour, self.shortlist)
+        scores = shape_score(distances)
+        return {
+            self.shape_index.names[i]: float(score) for i, score in zip(indices, scores)
+        }
+
 
 def main():
     st.title("Sitelen Pona Learning App")
 
-    teacher = SitelenPonaTeacher()
+    teacher = SitelenPonaTeacher(observers=[StreamlitDebugObserver()])
 
     # Character selection
     available_chars = list(teacher.templates.keys())
@@ -1,4 +1,5 @@
 from pathlib import Path
+import sys
 
 import cv2
 import numpy as np
@@ -6,10 +7,52 @@ from PIL import Image
 import streamlit as st
 from streamlit_drawable_canvas import st_canvas
 
+# Allow importing the recognition package when run from experiments/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-class SitelenPonaRecognizer:
-    def __init__(self, templates_dir="../templates"):
-        """Initialize with a directory of template images"""
+from recognition.correlation import TemplateStack  # noqa: E402
+from recognition.engine import Observer, ScoringEngine  # noqa: E402
+from recognition.shapes import main_contour  # noqa: E402
+
+# "fft" correlates the input with all templates in one batched pass (see
+# recognition/correlation.py); "direct" calls cv2.matchTemplate per template
+MODES = ("fft", "direct")
+
+
+class StreamlitDebugObserver(Observer):
+    """Renders the recognizer's debug events with Streamlit"""
+
+    def on_template_error(self, path):
+        st.error(f"Failed to load template: {path}")
+
+    def on_input(self, image):
+        st.write("Raw input:")
+        st.image(image, caption="Input Image", width=100)
+
+    def on_preprocessed(self, image):
+        st.write("After preprocessing:")
+        st.image(image, caption="Processed Image", width=100)
+
+    def on_scores(self, scores):
+        with st.expander("View all template scores", expanded=False):
+            st.write(scores)
+
+
+class SitelenPonaRecognizer(ScoringEngine):
+    def __init__(
+        self, templates_dir="../templates", observers=(), mode="fft", scales=(1.0,)
+    ):
+        """Initialize with a directory of template images.
+
+        In ``fft`` mode the input is also correlated at each of ``scales`` (in
+        (0, 1], relative to the template size); ``direct`` mode only compares
+        at full size.
+        """
+        super().__init__(observers)
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {MODES}, got {mode!r}")
+        self.mode = mode
+        self.scales = tuple(scales)
         self.templates = {}
         self.load_templates(templates_dir)
 
@@ -20,12 +63,27 @@ class SitelenPonaRecognizer:
             char_name = template_file.stem
             template = cv2.imread(str(template_file), cv2.IMREAD_GRAYSCALE)
             if template is None:
-                st.error(f"Failed to load template: {template_file}")
+                self.emit("template_error", path=template_file)
                 continue
 
             # Store preprocessed template
             processed = self.preprocess_image(template)
             self.templates[char_name] = processed
+        self.build_stack()
+
+    def build_stack(self):
+        """Precompute the template spectra and main contours for ``fft`` mode"""
+        self.stack = None
+        self.template_contours = {}
+        if self.mode != "fft" or not self.templates:
+            return
+        names = list(self.templates)
+        self.stack = TemplateStack(
+            names, [self.templates[name] for name in names], self.scales
+        )
+        self.template_contours = {
+            name: main_contour(template) for name, template in self.templates.items()
+        }
 
     def preprocess_image(self, image):
         """Preprocess image for comparison"""
@@ -39,14 +97,10 @@ class SitelenPonaRecognizer:
         standard_size = (100, 100)
         resized = cv2.resize(binary, standard_size)
 
-        # Find contours and center the character
-        contours, _ = cv2.findContours(
-            resized, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
-        )
-        if contours:
-            # Find the main contour (largest area)
-            main_contour = max(contours, key=cv2.contourArea)
-            x, y, w, h = cv2.boundingRect(main_contour)
+        # Center the character on its main contour (largest area)
+        contour = main_contour(resized)
+        if contour is not None:
+            x, y, w, h = cv2.boundingRect(contour)
 
             # Center the character
             center_x = standard_size[0] // 2
@@ -91,43 +145,54 @@ class SitelenPonaRecognizer:
 
         return final_score
 
-    def recognize(self, drawn_image, threshold=0.5):
-        """Recognize drawn character by comparing with templates"""
-        # Debug: Show the raw input image
-        st.write("Raw input:")
-        st.image(drawn_image, caption="Input Image", width=100)
-
+    def score_all(self, drawn_image):
+        """Score a drawing against every template"""
+        self.emit("input", image=drawn_image)
         processed_input = self.preprocess_image(drawn_image)
-
-        # Debug: Show the processed image
-        st.write("After preprocessing:")
-        st.image(processed_input, caption="Processed Image", width=100)
-
-        best_match = None
-        best_score = 0
-        all_scores = {}
-
-        # Compare with each template
-        for char_name, template in self.templates.items():
-            score = self.compare_images(processed_input, template)
-            all_scores[char_name] = score
-            if score > best_score:
-                best_score = score
-                best_match = char_name
-
-        # Debug: Show all template scores
-        with st.expander("View all template scores", expanded=False):
-            st.write(all_scores)
-
-        if best_score >= threshold:
-            return best_match, best_score
-        return None, best_score
+        self.emit("preprocessed", image=processed_input)
+
+        if self.stack is not None:
+            return self.score_stack(processed_input)
+        return {
+            char_name: self.compare_images(processed_input, template)
+            for char_name, template in self.templates.items()
+        }
+
+    def score_stack(self, processed_input):
+        """``compare_images`` against every template, with the template matching
+        scores from one batched correlation"""
+        contour = main_contour(processed_input)
+        if contour is None:
+            return dict.fromkeys(self.stack.names, 0)
+
+        scores = {}
+        template_scores = self.stack.correlate(processed_input)
+        for char_name, template_score in zip(self.stack.names, template_scores):
+            template_contour = self.template_contours[char_name]
+            if template_contour is None:
+                scores[char_name] = 0
+                continue
+            match_score = cv2.matchShapes(
+                contour, template_contour, cv2.CONTOURS_MATCH_I2, 0
+            )
+            contour_score = 1 / (1 + match_score)
+            scores[char_name] = float((template_score + contour_score) / 2)
+        return scores
 
 
 def main():
     st.title("Sitelen Pona Learning App")
 
-    recognizer = SitelenPonaRecognizer()
+    match_mode = st.sidebar.selectbox("Matching", MODES)
+    scales = st.sidebar.multiselect(
+        "Input scales",
+        [1.0, 0.9, 0.8, 0.7],
+        default=[1.0],
+        disabled=match_mode != "fft",
+    )
+    recognizer = SitelenPonaRecognizer(
+        observers=[StreamlitDebugObserver()], mode=match_mode, scales=scales or [1.0]
+    )
 
     # Sidebar for app navigation
     mode = st.sidebar.selectbox(
@@ -1,4 +1,5 @@
 from pathlib import Path
+import sys
 
 import cv2
 import numpy as np
@@ -6,6 +7,16 @@ from PIL import Image
 import streamlit as st
 from streamlit_drawable_canvas import st_canvas
 
+# Allow importing the recognition package when run from experiments/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from recognition.engine import Observer, ScoringEngine  # noqa: E402
+from recognition.orb_bank import DescriptorBank, templates_fingerprint  # noqa: E402
+
+# "bruteforce" matches against each template in turn; the others query the
+# stacked descriptor bank once (see recognition/orb_bank.py)
+MATCHERS = ("hamming", "flann", "bruteforce")
+
 
 def draw_matches(img1, kp1, img2, kp2, matches, good_match_ratio=0.75):
     """Draw matching features between two images"""
@@ -43,18 +54,96 @@ def draw_matches(img1, kp1, img2, kp2, matches, good_match_ratio=0.75):
         return None, 0
 
 
-class ORBSitelenPonaRecognizer:
-    def __init__(self, templates_dir="../templates", feature_count=100):
-        """Initialize with a directory of template images"""
+class StreamlitDebugObserver(Observer):
+    """Renders the recognizer's debug events with Streamlit"""
+
+    def on_template_error(self, path):
+        st.error(f"Failed to load template: {path}")
+
+    def on_template_loaded(self, name, image):
+        with st.expander(f"Loaded template: {name}", expanded=False):
+            st.image(image, caption="Template Image", width=100)
+
+    def on_input(self, image):
+        st.write("Raw input:")
+        st.image(image, caption="Input Image", width=100)
+
+    def on_preprocessed(self, image):
+        st.write("After preprocessing:")
+        st.image(image, caption="Processed Image", width=100)
+
+    def on_features(self, keypoints, descriptors):
+        st.write(f"Number of keypoints in input image: {len(keypoints)}")
+        st.write(f"Input descriptor shape: {descriptors.shape}")
+
+    def on_scores(self, scores):
+        with st.expander("View all template scores", expanded=False):
+            st.write(scores)
+
+    def on_best_match(
+        self, name, image, keypoints, template, matches, good_match_ratio
+    ):
+        best_viz, _ = draw_matches(
+            image,
+            keypoints,
+            template["image"],
+            template["keypoints"],
+            matches,
+            good_match_ratio,
+        )
+        if best_viz is None:
+            return
+        with st.expander("View feature matches", expanded=True):
+            try:
+                # Debug information
+                st.write(f"Visualization shape: {best_viz.shape}")
+                st.write(f"Visualization dtype: {best_viz.dtype}")
+
+                # Ensure the image is in the correct format for Streamlit
+                if best_viz.dtype != np.uint8:
+                    best_viz = (best_viz * 255).astype(np.uint8)
+
+                st.image(
+                    best_viz,
+                    caption=f"Feature matches with {name}",
+                    use_container_width=True,
+                )
+            except Exception as e:
+                st.error(f"Error displaying matches: {str(e)}")
+
+
+class ORBSitelenPonaRecognizer(ScoringEngine):
+    def __init__(
+        self,
+        templates_dir="../templates",
+        feature_count=100,
+        observers=(),
+        matcher="hamming",
+        cache_dir=None,
+    ):
+        """Initialize with a directory of template images.
+
+        The descriptor bank is cached in ``cache_dir``, by default ``.cache/orb``
+        next to the templates directory.
+        """
+        super().__init__(observers)
+        if matcher not in MATCHERS:
+            raise ValueError(f"matcher must be one of {MATCHERS}, got {matcher!r}")
         self.templates_dir = templates_dir  # Store directory path
+        self.matcher = matcher
+        if cache_dir is None:
+            cache_dir = Path(templates_dir).resolve().parent / ".cache" / "orb"
+        self.cache_dir = Path(cache_dir)
         self.raw_templates = {}  # Store raw template images
+        self.template_files = {}
         self.processed_templates = {}  # Store processed template data
+        self.bank = None
         self.initialize_orb(feature_count)
         self.load_templates()
 
     def initialize_orb(self, feature_count):
         """Initialize or reinitialize ORB detector with given feature count"""
-        self.orb = cv2.ORB_create(
+        self.orb_params = dict(
             nfeatures=feature_count,
             scaleFactor=1.2,
             nlevels=8,
@@ -65,43 +154,70 @@ class ORBSitelenPonaRecognizer:
             patchSize=31,
             fastThreshold=20,
         )
+        self.orb = cv2.ORB_create(**self.orb_params)
         self.bf = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=True)
 
     def load_templates(self):
         """Load template images and compute features"""
         template_path = Path(self.templates_dir)
         self.raw_templates = {}  # Clear existing templates
+        self.template_files = {}
 
         # First load all raw templates
         for template_file in template_path.glob("*.png"):
             char_name = template_file.stem
             template = cv2.imread(str(template_file), cv2.IMREAD_GRAYSCALE)
             if template is None:
-                st.error(f"Failed to load template: {template_file}")
+                self.emit("template_error", path=template_file)
                 continue
-            # Debug: Show the loaded template
-            with st.expander(f"Loaded template: {char_name}", expanded=False):
-                st.image(template, caption="Template Image", width=100)
+            self.emit("template_loaded", name=char_name, image=template)
             self.raw_templates[char_name] = template
+            self.template_files[char_name] = template_file
 
         # Then process all templates
         self.process_all_templates()
 
     def process_all_templates(self):
-        """Process all templates with current ORB settings"""
+        """Process all templates with current ORB settings.
+
+        Features come from the cached descriptor bank when it was built from
+        the same template files and ORB settings.
+        """
+        fingerprint = templates_fingerprint(self.template_files, self.orb_params)
+        bank_path = self.cache_dir / "bank.npz"
+        bank = DescriptorBank.load(bank_path, fingerprint, **self.bank_options())
+
+        features = {}
         self.processed_templates = {}
         for char_name, template in self.raw_templates.items():
             # Preprocess template
             processed = self.preprocess_image(template)
-
-            # Compute ORB features
-            kp, des = self.orb.detectAndCompute(processed, None)
-            if des is not None:
-                self.processed_templates[char_name] = {
-                    "image": processed,
-                    "keypoints": kp,
-                    "descriptors": des,
-                }
+            self.processed_templates[char_name] = {"image": processed}
+            if bank is None:
+                # Compute ORB features
+                features[char_name] = self.orb.detectAndCompute(processed, None)
+
+        if bank is None:
+            bank = DescriptorBank.from_features(features, **self.bank_options())
+            try:
+                bank.save(bank_path, fingerprint)
+            except OSError:
+                pass  # A read-only checkout just rebuilds the bank next time
+
+        # Templates without any features can never match
+        for char_name in set(self.processed_templates) - set(bank.names):
+            del self.processed_templates[char_name]
+        for char_name in bank.names:
+            self.processed_templates[char_name].update(
+                keypoints=bank.keypoints_for(char_name),
+                descriptors=bank.descriptors_for(char_name),
+            )
+        self.bank = bank
+
+    def bank_options(self):
+        if self.matcher == "bruteforce":
+            return {}
+        return {"matcher": self.matcher}
 
     def update_feature_count(self, new_count):
         """Update feature count and recompute all templates"""
@@ -127,104 +243,89 @@ class ORBSitelenPonaRecognizer:
 
         return binary
 
-    def recognize(self, drawn_image, threshold=0.3, good_match_ratio=0.75):
-        """Recognize drawn character by comparing with templates"""
-        # Debug: Show the raw input image
-        st.write("Raw input:")
-        st.image(drawn_image, caption="Input Image", width=100)
+    def score_all(self, drawn_image, good_match_ratio=0.75):
+        """Score a drawing against every template.
 
+        With the descriptor bank each input descriptor votes for the glyph of
+        its nearest template descriptor and the score is the share of votes.
+        Brute-force matching scores the share of good matches per template.
+        """
+        self.emit("input", image=drawn_image)
         processed_input = self.preprocess_image(drawn_image)
-
-        # Debug: Show the processed image
-        st.write("After preprocessing:")
-        st.image(processed_input, caption="Processed Image", width=100)
+        self.emit("preprocessed", image=processed_input)
 
         # Compute ORB features for input image
         kp1, des1 = self.orb.detectAndCompute(processed_input, None)
-
         if des1 is None:
-            return None, 0
-
-        # Debug feature detection
-        st.write(f"Number of keypoints in input image: {len(kp1) if kp1 else 0}")
-        st.write(
-            f"Input descriptor shape: {des1.shape if des1 is not None else 'None'}"
-        )
+            return {}
+        self.emit("features", keypoints=kp1, descriptors=des1)
+
+        if self.matcher != "bruteforce":
+            all_scores = self.bank.vote(des1)
+            if self.observed and all_scores:
+                char_name = max(all_scores, key=all_scores.get)
+                template_data = self.processed_templates[char_name]
+                self.emit(
+                    "best_match",
+                    name=char_name,
+                    image=processed_input,
+                    keypoints=kp1,
+                    template=template_data,
+                    matches=self.bf.match(des1, template_data["descriptors"]),
+                    good_match_ratio=good_match_ratio,
+                )
+            return all_scores
 
-        best_match = None
-        best_score = 0
-        best_viz = None
+        best = None
         all_scores = {}
-
         for char_name, template_data in self.processed_templates.items():
-            des2 = template_data["descriptors"]
-            kp2 = template_data["keypoints"]
-
             # Match descriptors
-            matches = self.bf.match(des1, des2)
-
-            if len(matches) > 0:
-                # Calculate matching score
-                min_dist = min(m.distance for m in matches)
-                max_dist = max(m.distance for m in matches)
-
-                if max_dist == min_dist:
-                    score = 0
-                else:
-                    # Normalize score between 0 and 1
-                    good_matches = [
-                        m for m in matches if m.distance < good_match_ratio * max_dist
-                    ]
-                    score = len(good_matches) / len(matches)
-
-                all_scores[char_name] = score
-
-                if score > best_score:
-                    best_score = score
-                    best_match = char_name
-                    # Generate visualization for best match
-                    best_viz, num_good_matches = draw_matches(
-                        processed_input,
-                        kp1,
-                        template_data["image"],
-                        kp2,
-                        matches,
-                        good_match_ratio,
-                    )
-
-        # Debug: Show all template scores
-        with st.expander("View all template scores", expanded=False):
-            st.write(all_scores)
-
-        # Show feature matches for best match if found
-        if best_match and best_viz is not None:
-            with st.expander("View feature matches", expanded=True):
-                try:
-                    # Debug information
-                    st.write(f"Visualization shape: {best_viz.shape}")
-                    st.write(f"Visualization dtype: {best_viz.dtype}")
-
-                    # Ensure the image is in the correct format for Streamlit
-                    if best_viz.dtype != np.uint8:
-                        best_viz = (best_viz * 255).astype(np.uint8)
+            matches = self.bf.match(des1, template_data["descriptors"])
+            if not matches:
+                continue
 
-                    st.image(
-                        best_viz,
-                        caption=f"Feature matches with {best_match}",
-                        use_container_width=True,
-                    )
-                except Exception as e:
-                    st.error(f"Error displaying matches: {str(e)}")
+            # Calculate matching score
+            distances = [m.distance for m in matches]
+            max_dist = max(distances)
+            if max_dist == min(distances):
+                score = 0
+            else:
+                # Normalize score between 0 and 1
+                good = sum(d < good_match_ratio * max_dist for d in distances)
+                score = good / len(matches)
+            all_scores[char_name] = score
+
+            # Keep the best match's features for the visualization
+            if self.observed and score > (best[0] if best else 0):
+                best = (score, char_name, matches)
+
+        if best is not None:
+            _, char_name, matches = best
+            self.emit(
+                "best_match",
+                name=char_name,
+                image=processed_input,
+                keypoints=kp1,
+                template=self.processed_templates[char_name],
+                matches=matches,
+                good_match_ratio=good_match_ratio,
+            )
+        return all_scores
 
-        if best_score >= threshold:
-            return best_match, best_score
-        return None, best_score
+    def recognize(self, drawn_image, threshold=0.3, good_match_ratio=0.75):
+        """Recognize drawn character by comparing with templates"""
+        return super().recognize(
+            drawn_image, threshold, good_match_ratio=good_match_ratio
+        )
 
 
 def main():
     st.title("Sitelen Pona Learning App")
 
-    recognizer = ORBSitelenPonaRecognizer()
+    matcher = st.sidebar.selectbox("Matcher", MATCHERS)
+    recognizer = ORBSitelenPonaRecognizer(
+        matcher=matcher, observers=[StreamlitDebugObserver()]
+    )
 
     # Sidebar for app navigation
     mode = st.sidebar.selectbox(
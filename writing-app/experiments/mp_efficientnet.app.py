@@ -6,11 +6,20 @@ import numpy as np
 from streamlit_drawable_canvas import st_canvas
 import cv2
 from pathlib import Path
+import sys
 
+# Allow importing the recognition package when run from experiments/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-class SitelenPonaRecognizer:
-    def __init__(self, model_path="../models/efficientnet_lite0_fp32.tflite"):
+from recognition.engine import ScoringEngine  # noqa: E402
+
+
+class SitelenPonaRecognizer(ScoringEngine):
+    def __init__(
+        self, model_path="../models/efficientnet_lite0_fp32.tflite", observers=()
+    ):
         """Initialize the recognizer with MediaPipe"""
+        super().__init__(observers)
         # Create options for the MediaPipe Image Embedder
         base_options = python.BaseOptions(model_asset_path=model_path)
         options = vision.ImageEmbedderOptions(
@@ -67,8 +76,8 @@ class SitelenPonaRecognizer:
             / (np.linalg.norm(embedding1) * np.linalg.norm(embedding2))
         )
 
-    def recognize(self, drawn_image, threshold=0.7):
-        """Recognize drawn character using MediaPipe embeddings"""
+    def score_all(self, drawn_image):
+        """Cosine similarity of a drawing with every template"""
         # Preprocess drawn image
         processed_image = self.preprocess_image(drawn_image)
 
@@ -77,21 +86,15 @@ class SitelenPonaRecognizer:
         drawn_embedding = embedding_result.embeddings[0].embedding
 
         # Compare with all templates
-        best_match = None
-        best_score = 0
-        self.all_scores = {}
+        self.all_scores = {
+            char_name: self.compute_similarity(drawn_embedding, template_embedding)
+            for char_name, template_embedding in self.template_embeddings.items()
+        }
+        return self.all_scores
 
-        for char_name, template_embedding in self.template_embeddings.items():
-            similarity = self.compute_similarity(drawn_embedding, template_embedding)
-            self.all_scores[char_name] = similarity
-
-            if similarity > best_score:
-                best_score = similarity
-                best_match = char_name
-
-        if best_score >= threshold:
-            return best_match, best_score
-        return None, best_score
+    def recognize(self, drawn_image, threshold=0.7):
+        """Recognize drawn character using MediaPipe embeddings"""
+        return super().recognize(drawn_image, threshold)
 
 
 def main():
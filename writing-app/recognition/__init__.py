@@ -0,0 +1,48 @@
+"""Support code for the Sitelen Pona recognizers that does not depend on Streamlit."""
+
+from .cascade import CascadeRecognizer, evaluate_cascade
+from .correlation import TemplateStack
+from .engine import Observer, RecognitionEngine, ScoringEngine, rank_scores
+from .grading import grade, iter_images
+from .index import (
+    FlatIndex,
+    IVFIndex,
+    QuantizedIndex,
+    build_index,
+    load_index,
+    quantize,
+    recall_at_k,
+    save_index,
+)
+from .matching import Candidate, EmbeddingBank, top_k_indices
+from .orb_bank import DescriptorBank
+from .shapes import ShapeIndex
+from .streaming import StreamRecognizer
+from .template_cache import TemplateEmbeddingCache
+
+__all__ = [
+    "Candidate",
+    "CascadeRecognizer",
+    "DescriptorBank",
+    "EmbeddingBank",
+    "FlatIndex",
+    "IVFIndex",
+    "Observer",
+    "QuantizedIndex",
+    "RecognitionEngine",
+    "ScoringEngine",
+    "ShapeIndex",
+    "StreamRecognizer",
+    "build_index",
+    "evaluate_cascade",
+    "grade",
+    "iter_images",
+    "load_index",
+    "quantize",
+    "rank_scores",
+    "recall_at_k",
+    "save_index",
+    "top_k_indices",
+    "TemplateEmbeddingCache",
+    "TemplateStack",
+]
@@ -0,0 +1,189 @@
+"""Glyph images packed into single files that are read once and sliced in memory.
+
+A ``GlyphAtlas`` holds the Learn tab's glyph renders, light and dark, on one
+RGBA grid image with a JSON index of every glyph's box. A ``TemplatePack``
+stacks the template PNGs into one ``(N, H, W)`` uint8 ``.npy`` file that is
+memory-mapped; its index records each source file's ``(mtime_ns, size)`` and a
+row is only used while its file is unchanged, so edited templates are still
+read from disk.
+
+Both are written by ``scripts/build_atlas.py`` and are optional: without them
+the app reads the individual files as before.
+"""
+
+import json
+import math
+import os
+from pathlib import Path
+import uuid
+
+import cv2
+import numpy as np
+
+
+def pack_grid(images, columns=None):
+    """Place ``{key: image}`` on a grid of equal cells, row by row.
+
+    All images need the same number of channels. Cells are as large as the
+    largest image and each image sits in the top-left corner of its cell.
+    Returns ``(atlas, {key: (x, y, width, height)})``.
+    """
+    if not images:
+        raise ValueError("Nothing to pack")
+    cell_height = max(image.shape[0] for image in images.values())
+    cell_width = max(image.shape[1] for image in images.values())
+    columns = columns or math.ceil(math.sqrt(len(images)))
+    rows = math.ceil(len(images) / columns)
+    first = next(iter(images.values()))
+    atlas = np.zeros(
+        (rows * cell_height, columns * cell_width, *first.shape[2:]), dtype=np.uint8
+    )
+    boxes = {}
+    for i, (key, image) in enumerate(images.items()):
+        y, x = divmod(i, columns)
+        y, x = y * cell_height, x * cell_width
+        height, width = image.shape[:2]
+        atlas[y : y + height, x : x + width] = image
+        boxes[key] = (x, y, width, height)
+    return atlas, boxes
+
+
+def _replace(path, write):
+    """Write a file through a temporary name so readers never see it partial"""
+    tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+class GlyphAtlas:
+    """RGBA glyph renders per theme, sliced out of one atlas image.
+
+    ``boxes`` maps ``theme -> name -> (x, y, width, height)``.
+    """
+
+    def __init__(self, image, boxes):
+        self.image = image
+        self.boxes = boxes
+
+    @classmethod
+    def build(cls, glyphs, columns=None):
+        """Pack ``{theme: {name: RGBA image}}`` into one atlas"""
+        atlas, boxes = pack_grid(
+            {
+                (theme, name): image
+                for theme, images in glyphs.items()
+                for name, image in images.items()
+            },
+            columns,
+        )
+        nested = {theme: {} for theme in glyphs}
+        for (theme, name), box in boxes.items():
+            nested[theme][name] = box
+        return cls(atlas, nested)
+
+    def glyph(self, name, theme="light"):
+        """View of one glyph's RGBA pixels"""
+        x, y, width, height = self.boxes[theme][name]
+        return self.image[y : y + height, x : x + width]
+
+    def save(self, path):
+        """Write ``<path>.png`` and ``<path>.json``"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        bgra = cv2.cvtColor(self.image, cv2.COLOR_RGBA2BGRA)
+        _replace(
+            path.with_suffix(".png"),
+            lambda tmp: cv2.imencode(".png", bgra)[1].tofile(tmp),
+        )
+        index = {"boxes": self.boxes}
+        _replace(
+            path.with_suffix(".json"),
+            lambda tmp: tmp.write_text(json.dumps(index, indent=1)),
+        )
+
+    @classmethod
+    def load(cls, path):
+        """Read an atlas written by ``save``; raises ``FileNotFoundError`` if
+        either file is missing"""
+        path = Path(path)
+        index = json.loads(path.with_suffix(".json").read_text())
+        image = cv2.imread(str(path.with_suffix(".png")), cv2.IMREAD_UNCHANGED)
+        if image is None:
+            raise FileNotFoundError(f"No atlas image at {path.with_suffix('.png')}")
+        boxes = {
+            theme: {name: tuple(box) for name, box in glyphs.items()}
+            for theme, glyphs in index["boxes"].items()
+        }
+        return cls(cv2.cvtColor(image, cv2.COLOR_BGRA2RGBA), boxes)
+
+
+class TemplatePack:
+    """Grayscale template images stacked into one array.
+
+    ``rows`` maps a template row name to its index in ``images`` and the
+    ``(mtime_ns, size)`` its source file had when it was packed.
+    """
+
+    def __init__(self, images, rows):
+        self.images = images
+        self.rows = rows
+
+    @classmethod
+    def build(cls, template_files):
+        """Pack ``{row_name: path}``.
+
+        Only 8-bit grayscale images with the shape of the first one are
+        packed; anything else keeps being read from its file.
+        """
+        images, rows = [], {}
+        for row_name, path in template_files.items():
+            image = cv2.imread(str(path), cv2.IMREAD_UNCHANGED)
+            if image is None or image.ndim != 2 or image.dtype != np.uint8:
+                continue
+            if images and image.shape != images[0].shape:
+                continue
+            stat = os.stat(path)
+            rows[row_name] = {
+                "index": len(images),
+                "mtime_ns": stat.st_mtime_ns,
+                "size": stat.st_size,
+            }
+            images.append(image)
+        if not images:
+            raise ValueError("No grayscale templates to pack")
+        return cls(np.stack(images), rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def get(self, row_name, stat):
+        """The packed image of ``row_name`` if its source file still has
+        ``stat == (mtime_ns, size)``, else None"""
+        entry = self.rows.get(row_name)
+        if entry is None or stat != (entry["mtime_ns"], entry["size"]):
+            return None
+        return self.images[entry["index"]]
+
+    def save(self, path):
+        """Write ``<path>.npy`` and ``<path>.json``"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _replace(path.with_suffix(".npy"), self._write_images)
+        _replace(
+            path.with_suffix(".json"),
+            lambda tmp: tmp.write_text(json.dumps({"rows": self.rows}, indent=1)),
+        )
+
+    def _write_images(self, path):
+        # np.save appends ".npy" to names without it, so hand it a file
+        with open(path, "wb") as f:
+            np.save(f, self.images)
+
+    @classmethod
+    def load(cls, path):
+        """Memory-map a pack written by ``save``; raises ``FileNotFoundError``
+        if either file is missing"""
+        path = Path(path)
+        rows = json.loads(path.with_suffix(".json").read_text())["rows"]
+        images = np.load(path.with_suffix(".npy"), mmap_mode="r")
+        return cls(images, rows)
@@ -0,0 +1,61 @@
+"""Image augmentations that imitate handwritten variation of black-on-white glyphs."""
+
+import cv2
+import numpy as np
+
+
+def stroke_variant(image, delta):
+    """Thicken (positive ``delta``) or thin (negative) the black strokes of a
+    black-on-white glyph by ``abs(delta)`` pixels"""
+    if delta == 0:
+        return image.copy()
+    size = 2 * abs(delta) + 1
+    kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (size, size))
+    # The background is white, so eroding the image grows the ink
+    if delta > 0:
+        return cv2.erode(image, kernel)
+    return cv2.dilate(image, kernel)
+
+
+def rotate(image, degrees, scale=1.0, shift=(0, 0)):
+    """Rotate and scale around the centre, then shift, filling with white"""
+    height, width = image.shape[:2]
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), degrees, scale)
+    matrix[:, 2] += shift
+    border = (255,) * (image.shape[2] if image.ndim == 3 else 1)
+    return cv2.warpAffine(
+        image,
+        matrix,
+        (width, height),
+        flags=cv2.INTER_LINEAR,
+        borderMode=cv2.BORDER_CONSTANT,
+        borderValue=border,
+    )
+
+
+def add_noise(image, sigma, rng):
+    """Add Gaussian pixel noise with standard deviation ``sigma``"""
+    if sigma <= 0:
+        return image.copy()
+    noisy = image.astype(np.float32) + rng.normal(0, sigma, image.shape)
+    return np.clip(noisy, 0, 255).astype(np.uint8)
+
+
+def random_augmentation(
+    rng, max_rotation=15, stroke_deltas=(-1, 0, 1, 2), noise_sigmas=(0, 8, 16)
+):
+    """Draw augmentation parameters for one sample"""
+    return {
+        "rotation": float(rng.uniform(-max_rotation, max_rotation)),
+        "scale": float(rng.uniform(0.85, 1.1)),
+        "shift": [float(v) for v in rng.uniform(-4, 4, 2)],
+        "stroke": int(rng.choice(stroke_deltas)),
+        "noise": float(rng.choice(noise_sigmas)),
+    }
+
+
+def apply_augmentation(image, params, rng):
+    """Apply parameters from ``random_augmentation`` to a grayscale glyph"""
+    image = stroke_variant(image, params["stroke"])
+    image = rotate(image, params["rotation"], params["scale"], params["shift"])
+    return add_noise(image, params["noise"], rng)
@@ -0,0 +1,114 @@
+"""Server-side micro-batching of concurrent recognition requests.
+
+Requests that arrive within a short window are handed to one ``run_batch``
+call, so one embed-and-match pass serves many clients. Batches run on an
+executor to keep the event loop free, with a bounded number in flight.
+"""
+
+import asyncio
+from collections import Counter
+
+
+class MicroBatcher:
+    """Collect items submitted from coroutines into batches.
+
+    A batch is dispatched when ``max_batch`` items are waiting or ``window``
+    seconds after its first item arrived, whichever comes first.
+    ``run_batch(items)`` is called on ``executor`` (the loop's default when
+    None) and must return one result per item, in order; an exception
+    returned in place of a result is raised to that item's caller only, while
+    one raised by ``run_batch`` fails the whole batch. At most
+    ``max_concurrent`` batches run at once; later ones queue behind them.
+    """
+
+    def __init__(
+        self, run_batch, max_batch=32, window=0.005, executor=None, max_concurrent=1
+    ):
+        self.run_batch = run_batch
+        self.max_batch = max_batch
+        self.window = window
+        self.executor = executor
+        self.max_concurrent = max_concurrent
+        self.stats = Counter()
+        self._queue = None
+        self._collector = None
+        self._slots = None
+        self._running = set()
+
+    def start(self):
+        """Start collecting on the running event loop"""
+        if self._collector is None:
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.max_concurrent)
+            self._collector = asyncio.create_task(self._collect())
+
+    async def stop(self):
+        """Stop collecting and wait for batches already dispatched"""
+        if self._collector is not None:
+            self._collector.cancel()
+            await asyncio.gather(self._collector, return_exceptions=True)
+            self._collector = None
+        await asyncio.gather(*self._running, return_exceptions=True)
+
+    async def submit(self, item):
+        """Queue one item and wait for its result"""
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def submit_many(self, items, return_exceptions=False):
+        """Queue several items at once; they may share batches with other
+        callers. With ``return_exceptions`` a failed item's exception is
+        returned in its place instead of raised."""
+        return await asyncio.gather(
+            *(self.submit(item) for item in items), return_exceptions=return_exceptions
+        )
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                # Sleep until the next item or the deadline, whichever is first
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except TimeoutError:
+                    break
+
+            await self._slots.acquire()
+            task = asyncio.create_task(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch):
+        items = [item for item, _ in batch]
+        futures = [future for _, future in batch]
+        self.stats["batches"] += 1
+        self.stats["items"] += len(items)
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(
+                self.executor, self.run_batch, items
+            )
+        except Exception as e:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for future, result in zip(futures, results):
+                # The caller may have gone away (client disconnected)
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+        finally:
+            self._slots.release()
@@ -0,0 +1,97 @@
+"""Accuracy and performance measurements shared by the engine benchmark.
+
+Engines follow ``recognition.engine.RecognitionEngine``: ``recognize_topk(image,
+k)`` returns their ``k`` best ``Candidate`` tuples, best first. ``build_dataset``
+derives a labeled, reproducible test set from the template glyphs and
+``evaluate`` runs an engine over it.
+"""
+
+import json
+from pathlib import Path
+import platform
+import resource
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from .augment import apply_augmentation, random_augmentation
+
+
+def build_dataset(templates_dir, per_template=5, seed=0, characters=None):
+    """Return ``[(label, image, params), ...]`` augmented from ``templates/*.png``.
+
+    Each template yields ``per_template`` samples with random rotation, scale,
+    shift, stroke width and noise. Images are 3-channel BGR like uploads, and the
+    same seed always produces the same set.
+    """
+    rng = np.random.default_rng(seed)
+    samples = []
+    for template_file in sorted(Path(templates_dir).glob("*.png")):
+        label = template_file.stem
+        if characters is not None and label not in characters:
+            continue
+        glyph = cv2.imread(str(template_file), cv2.IMREAD_GRAYSCALE)
+        if glyph is None:
+            continue
+        for _ in range(per_template):
+            params = random_augmentation(rng)
+            image = apply_augmentation(glyph, params, rng)
+            samples.append((label, cv2.cvtColor(image, cv2.COLOR_GRAY2BGR), params))
+    return samples
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MiB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (2**20 if sys.platform == "darwin" else 2**10)
+
+
+def evaluate(engine, dataset, k=5, warm_up=1):
+    """Run ``engine.recognize_topk`` over ``dataset`` and return accuracy and timing.
+
+    The first ``warm_up`` samples are run once untimed so lazy initialization
+    does not count towards latency.
+    """
+    for _, image, _ in dataset[:warm_up]:
+        engine.recognize_topk(image, k)
+
+    latencies = np.empty(len(dataset))
+    top1 = topk = 0
+    start = time.perf_counter()
+    for i, (label, image, _) in enumerate(dataset):
+        sample_start = time.perf_counter()
+        names = [candidate.name for candidate in engine.recognize_topk(image, k)]
+        latencies[i] = time.perf_counter() - sample_start
+        top1 += bool(names) and names[0] == label
+        topk += label in names[:k]
+    elapsed = time.perf_counter() - start
+
+    n = len(dataset)
+    latencies_ms = latencies * 1000
+    return {
+        "samples": n,
+        "top1_accuracy": top1 / n if n else 0.0,
+        f"top{k}_accuracy": topk / n if n else 0.0,
+        "latency_ms_p50": float(np.percentile(latencies_ms, 50)) if n else 0.0,
+        "latency_ms_p95": float(np.percentile(latencies_ms, 95)) if n else 0.0,
+        "throughput_per_s": n / elapsed if elapsed else 0.0,
+    }
+
+
+def environment():
+    """Versions that affect results, recorded with every report"""
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+    }
+
+
+def write_report(path, report):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2) + "\n")
@@ -0,0 +1,258 @@
+"""Cascade recognizer that runs cheap shape checks before the embedder.
+
+Embedding a drawing is by far the most expensive step of recognition, yet some
+inputs can be answered without it. The cascade runs these stages in order and
+stops at the first one that can answer:
+
+1. ``blank``: too few ink pixels, so there is nothing to recognize.
+2. ``ink_box``: the ink's bounding box is too small to be a glyph.
+3. ``shape``: Hu-moment distances to every template give a short-list. When
+   ``accept_distance`` is set and the best template is close enough and clearly
+   ahead of the runner-up, it is the answer.
+4. ``embed``: the embedding recognizer ranks every template (``mode="full"``)
+   or re-ranks only the short-list (``mode="rerank"``).
+
+Each stage's time and exits are recorded, and ``evaluate_cascade`` reports
+per-stage accuracy on a labeled set.
+"""
+
+from collections import Counter
+import threading
+import time
+from typing import NamedTuple
+
+import numpy as np
+
+from .engine import ScoringEngine, rank_scores
+from .shapes import ShapeIndex, ink_mask, main_contour, normalize_ink
+
+STAGES = ("blank", "ink_box", "shape", "embed")
+MODES = ("full", "rerank")
+
+
+class CascadeResult(NamedTuple):
+    """Ranked candidates plus how the cascade got there.
+
+    ``stage`` is the stage that answered, ``shortlist`` the template names the
+    shape stage kept (empty if it did not run) and ``timings`` the seconds
+    spent in each stage that ran.
+    """
+
+    candidates: list
+    stage: str
+    shortlist: list
+    timings: dict
+
+
+def shape_index_from_templates(templates):
+    """Build a ``ShapeIndex`` from ``{name: image}`` template drawings"""
+    return ShapeIndex.from_images(
+        {name: normalize_ink(ink_mask(image)) for name, image in templates.items()}
+    )
+
+
+class CascadeRecognizer(ScoringEngine):
+    """Wraps an embedding recognizer with cheap checks that run first.
+
+    ``recognizer`` is the MobileNet recognizer, or anything else with
+    ``recognize_topk(image, k)``, ``preprocess_into(image)``,
+    ``embed_processed(processed)`` and a ``bank`` of template embeddings.
+    ``shape_index`` holds the templates' contour descriptors (see
+    ``shape_index_from_templates``).
+    """
+
+    def __init__(
+        self,
+        recognizer,
+        shape_index,
+        mode="full",
+        min_ink=30,
+        min_box=12,
+        shortlist=20,
+        accept_distance=None,
+        accept_margin=0.5,
+        observers=(),
+    ):
+        super().__init__(observers)
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {MODES}, got {mode!r}")
+        self.recognizer = recognizer
+        self.shape_index = shape_index
+        self.mode = mode
+        self.min_ink = min_ink
+        self.min_box = min_box
+        self.shortlist = shortlist
+        self.accept_distance = accept_distance
+        self.accept_margin = accept_margin
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self._lock:
+            self._calls = Counter()
+            self._exits = Counter()
+            self._seconds = Counter()
+
+    def run(self, image, k=5):
+        """Recognize ``image`` and return a ``CascadeResult``"""
+        return self._run(image, k)[0]
+
+    def score_all(self, image):
+        """``{name: score}`` from the stage that answers ``image``.
+
+        Empty for a blank or tiny drawing, the negated shape distances when the
+        shape stage answers, and otherwise the embedding similarity to every
+        template, or only to the short-list with ``mode="rerank"``.
+        """
+        return self._run(image, None)[1]
+
+    def _run(self, image, k):
+        """Run the stages and return the ``CascadeResult`` with the scores of the
+        stage that answered. With ``k=None`` every score is kept, instead of only
+        the best ``k`` that the embedding recognizer returns in ``mode="full"``.
+        """
+        timings = {}
+        shortlist = []
+        clock = time.perf_counter
+
+        start = clock()
+        mask = ink_mask(image)
+        ink = np.count_nonzero(mask)
+        timings["blank"] = clock() - start
+        if ink < self.min_ink:
+            return self._finish(CascadeResult([], "blank", shortlist, timings), {})
+
+        start = clock()
+        box = ink_box(mask)
+        timings["ink_box"] = clock() - start
+        if max(box[2], box[3]) < self.min_box:
+            return self._finish(CascadeResult([], "ink_box", shortlist, timings), {})
+
+        start = clock()
+        scores = None
+        contour = main_contour(normalize_ink(mask))
+        if contour is not None and len(self.shape_index):
+            indices, distances = self.shape_index.search(contour)
+            shortlist = [self.shape_index.names[i] for i in indices[: self.shortlist]]
+            if self.accepts(distances):
+                # Smaller distances are better, so rank the negated distances
+                names = self.shape_index.names
+                scores = {names[i]: -float(d) for i, d in zip(indices, distances)}
+        timings["shape"] = clock() - start
+        self.emit("shortlist", names=shortlist)
+        if scores is not None:
+            candidates = rank_scores(scores, k or len(scores))
+            return self._finish(
+                CascadeResult(candidates, "shape", shortlist, timings), scores
+            )
+
+        start = clock()
+        if self.mode == "rerank" and shortlist:
+            scores = self.embedding_scores(image, shortlist)
+            candidates = rank_scores(scores, k or len(scores))
+        elif k is None:
+            scores = self.embedding_scores(image)
+            candidates = rank_scores(scores, len(scores))
+        else:
+            candidates = self.recognizer.recognize_topk(image, k)
+            scores = {c.name: c.score for c in candidates}
+        timings["embed"] = clock() - start
+        return self._finish(
+            CascadeResult(candidates, "embed", shortlist, timings), scores
+        )
+
+    def accepts(self, distances):
+        """Whether the shape stage is confident enough to skip the embedder"""
+        if self.accept_distance is None or len(distances) < 2:
+            return False
+        return (
+            distances[0] <= self.accept_distance
+            and distances[1] - distances[0] >= self.accept_margin
+        )
+
+    def embedding_scores(self, image, names=None):
+        """Embedding similarity of ``image`` to ``names``, or to every template"""
+        recognizer = self.recognizer
+        embedding = recognizer.embed_processed(recognizer.preprocess_into(image))
+        scores = recognizer.bank.scores(embedding)
+        bank_index = recognizer.bank.index
+        if names is None:
+            names = bank_index
+        return {
+            name: float(scores[bank_index[name]])
+            for name in names
+            if name in bank_index
+        }
+
+    def _finish(self, result, scores):
+        with self._lock:
+            for stage, seconds in result.timings.items():
+                self._calls[stage] += 1
+                self._seconds[stage] += seconds
+            self._exits[result.stage] += 1
+        self.emit("stage", stage=result.stage, timings=result.timings)
+        return result, scores
+
+    def recognize_topk(self, image, k=5):
+        return self.run(image, k).candidates
+
+    def stage_report(self):
+        """Per stage: how often it ran, how often it answered and its mean time"""
+        with self._lock:
+            return {
+                stage: {
+                    "calls": self._calls[stage],
+                    "exits": self._exits[stage],
+                    "mean_ms": (
+                        1000 * self._seconds[stage] / self._calls[stage]
+                        if self._calls[stage]
+                        else 0.0
+                    ),
+                }
+                for stage in STAGES
+            }
+
+
+def ink_box(mask):
+    """``(x, y, w, h)`` of the ink in a mask, all zero for a blank mask"""
+    rows = np.flatnonzero(mask.any(axis=1))
+    cols = np.flatnonzero(mask.any(axis=0))
+    if not len(rows):
+        return 0, 0, 0, 0
+    return cols[0], rows[0], cols[-1] - cols[0] + 1, rows[-1] - rows[0] + 1
+
+
+def evaluate_cascade(cascade, dataset, k=5):
+    """Per-stage accuracy of a cascade over ``[(label, image, params), ...]``.
+
+    For every stage reports how many samples reached it and how many it
+    answered, the top-1 accuracy of its answers and its mean time. The shape
+    stage also reports the short-list recall: how often the true label was
+    kept for the embedder.
+    """
+    reached, exits, correct, seconds = Counter(), Counter(), Counter(), Counter()
+    kept = shortlisted = 0
+    for label, image, _ in dataset:
+        result = cascade.run(image, k)
+        for stage, elapsed in result.timings.items():
+            reached[stage] += 1
+            seconds[stage] += elapsed
+        exits[result.stage] += 1
+        if result.candidates and result.candidates[0].name == label:
+            correct[result.stage] += 1
+        if result.shortlist:
+            shortlisted += 1
+            kept += label in result.shortlist
+
+    report = {}
+    for stage in STAGES:
+        report[stage] = {
+            "reached": reached[stage],
+            "exits": exits[stage],
+            "top1_accuracy": correct[stage] / exits[stage] if exits[stage] else None,
+            "mean_ms": 1000 * seconds[stage] / reached[stage]
+            if reached[stage]
+            else 0.0,
+        }
+    report["shape"]["shortlist_recall"] = kept / shortlisted if shortlisted else None
+    return report
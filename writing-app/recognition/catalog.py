@@ -0,0 +1,100 @@
+"""The glyph SVGs shown in the Learn tab, scanned once and kept in memory.
+
+A ``GlyphCatalog`` is an immutable snapshot of the light and dark SVG
+directories: the glyph names, each theme's file paths and the SVG markup
+itself. ``CatalogCache`` hands out the current snapshot and rescans only when
+one of the directories changed, which adding, removing or renaming a glyph
+does (its mtime moves); a rerun otherwise costs two ``stat`` calls instead of
+a listing and a read of every SVG.
+"""
+
+import os
+from pathlib import Path
+import threading
+
+
+def directory_signature(*directories):
+    """``mtime_ns`` of each directory, None for one that does not exist"""
+    signature = []
+    for directory in directories:
+        try:
+            signature.append(os.stat(directory).st_mtime_ns)
+        except FileNotFoundError:
+            signature.append(None)
+    return tuple(signature)
+
+
+class GlyphCatalog:
+    """Glyph names with their light and dark SVG paths and markup.
+
+    Light SVGs are ``<svg_dir>/<name>.svg`` and dark ones
+    ``<dark_svg_dir>/<name>_dark.svg``; ``names`` are the light glyphs, sorted.
+    """
+
+    def __init__(self, svg_dir, dark_svg_dir, paths, markup, signature):
+        self.svg_dir = Path(svg_dir)
+        self.dark_svg_dir = Path(dark_svg_dir)
+        self.paths = paths
+        self.markup = markup
+        self.signature = signature
+        self.names = sorted(paths["light"])
+
+    @classmethod
+    def scan(cls, svg_dir, dark_svg_dir):
+        # Taken before listing, so a change made during the scan shows up as
+        # stale on the next check rather than being missed
+        signature = directory_signature(svg_dir, dark_svg_dir)
+        paths = {
+            "light": {path.stem: path for path in Path(svg_dir).glob("*.svg")},
+            "dark": {
+                path.stem.removesuffix("_dark"): path
+                for path in Path(dark_svg_dir).glob("*_dark.svg")
+            },
+        }
+        markup = {
+            theme: {
+                name: path.read_text(encoding="utf-8") for name, path in files.items()
+            }
+            for theme, files in paths.items()
+        }
+        return cls(svg_dir, dark_svg_dir, paths, markup, signature)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.paths["light"]
+
+    def svg(self, name, theme="light"):
+        """SVG markup of a glyph, falling back to the light one if the theme
+        has no render of it"""
+        return self.markup[theme].get(name) or self.markup["light"][name]
+
+    def is_current(self):
+        return directory_signature(self.svg_dir, self.dark_svg_dir) == self.signature
+
+
+class CatalogCache:
+    """Thread-safe holder of the current ``GlyphCatalog``.
+
+    ``scans`` counts how often the directories were actually read.
+    """
+
+    def __init__(self, svg_dir, dark_svg_dir):
+        self.svg_dir = svg_dir
+        self.dark_svg_dir = dark_svg_dir
+        self.scans = 0
+        self._catalog = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        """Return the catalog, rescanning first if a directory changed"""
+        catalog = self._catalog
+        if catalog is not None and catalog.is_current():
+            return catalog
+        with self._lock:
+            # Another session may have rescanned while this one waited
+            if self._catalog is None or not self._catalog.is_current():
+                self._catalog = GlyphCatalog.scan(self.svg_dir, self.dark_svg_dir)
+                self.scans += 1
+            return self._catalog
@@ -0,0 +1,119 @@
+"""Normalized cross-correlation of one image against every template at once.
+
+``cv2.matchTemplate`` compares the input with one template per call. Here the
+templates are stacked into one array and their FFTs are computed once, so each
+input needs a single FFT per scale, one broadcast multiply and one batched
+inverse FFT to correlate it with all templates at every offset. Local template
+sums for the normalization come from precomputed integral images.
+
+Scores equal ``cv2.TM_CCOEFF_NORMED``: at scale 1 the input and templates have
+the same size and the score is their Pearson correlation. At smaller scales the
+shrunken input slides over each template and the best offset counts, which
+tolerates drawings that are larger than the template glyph.
+"""
+
+import cv2
+import numpy as np
+
+
+def integral(stack):
+    """Integral images of a ``(N, H, W)`` stack, padded to ``(N, H + 1, W + 1)``"""
+    sums = np.zeros((stack.shape[0], stack.shape[1] + 1, stack.shape[2] + 1))
+    np.cumsum(np.cumsum(stack, axis=1, dtype=np.float64), axis=2, out=sums[:, 1:, 1:])
+    return sums
+
+
+def window_sums(sums, height, width):
+    """Sum of every ``height`` by ``width`` window, from integral images"""
+    return (
+        sums[:, height:, width:]
+        - sums[:, :-height, width:]
+        - sums[:, height:, :-width]
+        + sums[:, :-height, :-width]
+    )
+
+
+def unit_rows(matrix):
+    """Subtract each row's mean and scale it to unit length (zero rows stay zero)"""
+    centered = matrix - matrix.mean(axis=1, keepdims=True)
+    norms = np.linalg.norm(centered, axis=1, keepdims=True)
+    return np.divide(centered, norms, out=np.zeros_like(centered), where=norms > 0)
+
+
+class TemplateStack:
+    """Same-sized grayscale templates with precomputed spectra and local sums.
+
+    ``scales`` are the input sizes, relative to the template size, that are
+    tried; each must be in ``(0, 1]``.
+    """
+
+    def __init__(self, names, templates, scales=(1.0,)):
+        if any(not 0 < scale <= 1 for scale in scales):
+            raise ValueError(f"scales must be in (0, 1], got {scales}")
+        self.names = list(names)
+        self.scales = tuple(scales)
+        stack = np.stack([np.asarray(t, dtype=np.float32) for t in templates])
+        count, self.height, self.width = stack.shape
+        self.patch_shapes = [
+            (max(1, round(self.height * s)), max(1, round(self.width * s)))
+            for s in self.scales
+        ]
+        # Scale 1 has a single offset, which is a dot product of unit vectors
+        self.unit = unit_rows(stack.reshape(count, -1).astype(np.float64))
+        if any(shape != (self.height, self.width) for shape in self.patch_shapes):
+            # Correlating at offsets where the patch fits inside the template
+            # never wraps around, so the template size is a large enough FFT
+            self.spectra = np.fft.rfft2(stack)
+            self.sums = integral(stack)
+            self.square_sums = integral(stack.astype(np.float64) ** 2)
+
+    def __len__(self):
+        return len(self.names)
+
+    def correlate_patch(self, patch):
+        """Best ``TM_CCOEFF_NORMED`` score of ``patch`` over each template"""
+        height, width = patch.shape
+        if (height, width) == (self.height, self.width):
+            flat = unit_rows(patch.reshape(1, -1).astype(np.float64))[0]
+            return self.unit @ flat
+
+        centered = patch.astype(np.float64) - patch.mean()
+        patch_norm = np.sqrt(np.sum(centered**2))
+        if patch_norm == 0:
+            return np.zeros(len(self))
+        padded = np.zeros((self.height, self.width), dtype=np.float32)
+        padded[:height, :width] = centered
+        products = np.fft.irfft2(
+            self.spectra * np.conj(np.fft.rfft2(padded)),
+            s=(self.height, self.width),
+        )
+        numerators = products[:, : self.height - height + 1, : self.width - width + 1]
+
+        n = height * width
+        local_sums = window_sums(self.sums, height, width)
+        local_variance = (
+            window_sums(self.square_sums, height, width) - local_sums**2 / n
+        )
+        denominators = np.sqrt(np.maximum(local_variance, 0)) * patch_norm
+        scores = np.divide(
+            numerators,
+            denominators,
+            out=np.zeros_like(denominators),
+            # Flat template regions have no defined correlation
+            where=denominators > 1e-6 * patch_norm,
+        )
+        return scores.reshape(len(self), -1).max(axis=1)
+
+    def correlate(self, image):
+        """Best score of ``image`` against each template over all scales.
+
+        ``image`` must have the templates' size; it is shrunk for each scale.
+        """
+        best = np.full(len(self), -1.0)
+        for shape in self.patch_shapes:
+            if shape == (self.height, self.width):
+                patch = image
+            else:
+                patch = cv2.resize(image, shape[::-1], interpolation=cv2.INTER_AREA)
+            np.maximum(best, self.correlate_patch(patch), out=best)
+        return best
@@ -0,0 +1,104 @@
+"""Streamlit-free interface shared by the recognition engines.
+
+An engine scores a drawing against every template and ranks the characters.
+Debug output such as intermediate images, raw scores and match visualizations is
+not drawn by the engine itself. Instead the engine emits named events to
+optional observers, so the same engine runs in the app, in batch jobs, in
+benchmarks and in worker processes. With no observers attached, emitting an
+event costs one empty loop.
+"""
+
+from typing import Protocol
+
+import numpy as np
+
+from .matching import Candidate, top_k_indices
+
+
+class RecognitionEngine(Protocol):
+    """What callers such as the benchmark and the grader rely on.
+
+    The production MobileNet recognizer and the experiment engines all provide
+    these two methods.
+    """
+
+    def recognize_topk(self, image, k=5) -> list[Candidate]: ...
+
+    def recognize(self, image, threshold) -> tuple[str | None, float]: ...
+
+
+class Observer:
+    """Receives debug events from an engine.
+
+    Subclasses define an ``on_<event>`` method for each event they render and
+    take the event payload as keyword arguments. Events without a handler are
+    ignored.
+    """
+
+    def notify(self, event, **payload):
+        handler = getattr(self, f"on_{event}", None)
+        if handler is not None:
+            handler(**payload)
+
+
+def rank_scores(scores, k=5):
+    """Turn a ``{name: score}`` dict into ranked ``Candidate`` tuples"""
+    if not scores:
+        return []
+    names = list(scores)
+    values = np.fromiter(scores.values(), dtype=np.float64, count=len(names))
+    # Take one extra so the last returned candidate also gets a real margin
+    top = top_k_indices(values, k + 1)
+    top_scores = values[top]
+    next_scores = np.append(top_scores[1:], top_scores[-1:])
+    return [
+        Candidate(names[i], float(s), float(s - n))
+        for i, s, n in zip(top[:k], top_scores[:k], next_scores[:k])
+    ]
+
+
+class ScoringEngine:
+    """Base class for engines that produce one score per template.
+
+    Subclasses implement ``score_all(image, **options)`` returning
+    ``{name: score}`` where higher is better, and call ``emit`` wherever they
+    used to render debug output. Work done only for observers (drawing
+    visualizations, for example) should be guarded by ``observed``.
+    """
+
+    def __init__(self, observers=()):
+        self.observers = list(observers)
+
+    def add_observer(self, observer):
+        self.observers.append(observer)
+        return observer
+
+    @property
+    def observed(self):
+        return bool(self.observers)
+
+    def emit(self, event, **payload):
+        for observer in self.observers:
+            observer.notify(event, **payload)
+
+    def score_all(self, image, **options):
+        raise NotImplementedError
+
+    def recognize_topk(self, image, k=5, **options):
+        """Return the ``k`` best matching characters, best first.
+
+        ``options`` are passed on to ``score_all``.
+        """
+        scores = self.score_all(image, **options)
+        self.emit("scores", scores=scores)
+        return rank_scores(scores, k)
+
+    def recognize(self, image, threshold=0.5, **options):
+        """Best character for a drawing, or None when it scores below the
+        threshold"""
+        best = self.recognize_topk(image, k=1, **options)
+        if not best or best[0].score <= 0:
+            return None, 0
+        if best[0].score >= threshold:
+            return best[0].name, best[0].score
+        return None, best[0].score
@@ -0,0 +1,259 @@
+"""Offline grading of stored writing attempts across a pool of worker processes."""
+
+import csv
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path, PurePosixPath
+import tarfile
+import time
+import zipfile
+
+import cv2
+import numpy as np
+
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".bmp", ".webp"}
+
+# Set in each worker process by init_worker()
+_worker_recognizer = None
+
+
+def is_image_name(name):
+    return PurePosixPath(name).suffix.lower() in IMAGE_EXTENSIONS
+
+
+def iter_images(source):
+    """Yield ``(name, data)`` for every image in a directory, tar or zip archive.
+
+    ``name`` is the path relative to the source, using forward slashes, and
+    ``data`` is the raw encoded file contents.
+    """
+    source = Path(source)
+    if source.is_dir():
+        for path in sorted(source.rglob("*")):
+            if path.is_file() and is_image_name(path.name):
+                yield path.relative_to(source).as_posix(), path.read_bytes()
+    elif zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and is_image_name(info.filename):
+                    yield info.filename, archive.read(info)
+    elif tarfile.is_tarfile(source):
+        with tarfile.open(source) as archive:
+            for member in archive:
+                if member.isfile() and is_image_name(member.name):
+                    yield member.name, archive.extractfile(member).read()
+    else:
+        raise ValueError(f"{source} is not a directory, zip or tar archive")
+
+
+def label_for(name, label_from):
+    """Return the expected character for an attempt, or None.
+
+    ``parent`` uses the containing directory (``moku/attempt-3.png``) and ``stem``
+    uses the file name up to the first ``_`` or ``-`` (``moku_3.png``).
+    """
+    path = PurePosixPath(name)
+    if label_from == "parent":
+        return path.parent.name or None
+    if label_from == "stem":
+        return path.stem.replace("-", "_").split("_")[0]
+    return None
+
+
+def decode_image(data):
+    """Decode an encoded image the way the app receives it.
+
+    Images with an alpha channel are returned as RGBA like canvas drawings, and
+    everything else as BGR like uploads and webcam captures. 16-bit images are
+    scaled down to 8 bits, and other depths are rejected.
+    """
+    image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_UNCHANGED)
+    if image is None:
+        raise ValueError("could not decode image")
+    if image.dtype == np.uint16:
+        image = (image >> 8).astype(np.uint8)
+    elif image.dtype != np.uint8:
+        raise ValueError(f"unsupported image depth {image.dtype}")
+    if image.ndim == 3 and image.shape[2] == 4:
+        image = cv2.cvtColor(image, cv2.COLOR_BGRA2RGBA)
+    return image
+
+
+def init_worker(recognizer_factory):
+    """Build this worker's own recognizer (and MediaPipe embedder) once"""
+    global _worker_recognizer
+    _worker_recognizer = recognizer_factory()
+
+
+def embed_rows(recognizer, decoded):
+    """Embed the images of ``(row, image)`` pairs and return the rows that were
+    embedded with their embeddings.
+
+    The images are embedded as one batch. If the batch fails they are embedded
+    one at a time, so an image the embedder rejects only marks its own row with
+    an ``error`` instead of failing the whole chunk.
+    """
+    if not decoded:
+        return [], None
+    try:
+        embeddings = recognizer.embed_batch([image for _, image in decoded])
+        return [row for row, _ in decoded], embeddings
+    except Exception:
+        pass
+    rows, embeddings = [], []
+    for row, image in decoded:
+        try:
+            embeddings.append(recognizer.embed_batch([image])[0])
+        except Exception as e:
+            row["error"] = f"could not embed image: {e}"
+        else:
+            rows.append(row)
+    return rows, np.array(embeddings)
+
+
+def grade_chunk(items, top_k=5, threshold=0.7, recognizer=None):
+    """Grade a list of ``(name, expected, data)`` items and return result rows"""
+    recognizer = recognizer or _worker_recognizer
+    bank = recognizer.bank
+
+    rows, decoded = [], []
+    for name, expected, data in items:
+        row = {"path": name, "expected": expected}
+        try:
+            decoded.append((row, decode_image(data)))
+        except ValueError as e:
+            row["error"] = str(e)
+        rows.append(row)
+
+    embedded_rows, embeddings = embed_rows(recognizer, decoded)
+    if embedded_rows:
+        scores = bank.scores_batch(embeddings)
+        ranked = bank.rank_batch(scores, top_k)
+        for row, row_scores, candidates in zip(embedded_rows, scores, ranked):
+            best = candidates[0] if candidates else None
+            row["match"] = best.name if best and best.score >= threshold else None
+            row["score"] = best.score if best else 0.0
+            row["margin"] = best.margin if best else 0.0
+            row["candidates"] = [(c.name, c.score) for c in candidates]
+            # The app grades against the selected character, not the top match
+            expected = row["expected"]
+            if expected in bank:
+                expected_score = float(row_scores[bank.index[expected]])
+                row["expected_score"] = expected_score
+                row["passed"] = expected_score >= threshold
+    return rows
+
+
+def chunked(items, size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class CsvResultWriter:
+    FIELDS = [
+        "path",
+        "expected",
+        "match",
+        "score",
+        "margin",
+        "expected_score",
+        "passed",
+        "candidates",
+        "error",
+    ]
+
+    def __init__(self, stream):
+        self.writer = csv.DictWriter(stream, fieldnames=self.FIELDS)
+        self.writer.writeheader()
+
+    def write(self, row):
+        row = dict(row)
+        if "candidates" in row:
+            row["candidates"] = ";".join(
+                f"{name}:{score:.4f}" for name, score in row["candidates"]
+            )
+        self.writer.writerow(row)
+
+
+class JsonlResultWriter:
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, row):
+        self.stream.write(json.dumps(row) + "\n")
+
+
+RESULT_WRITERS = {"csv": CsvResultWriter, "jsonl": JsonlResultWriter}
+
+
+def grade(
+    source,
+    writer,
+    recognizer_factory,
+    workers=None,
+    batch_size=32,
+    top_k=5,
+    threshold=0.7,
+    label_from="parent",
+):
+    """Grade every image in ``source`` and stream result rows to ``writer``.
+
+    Work is split into chunks of ``batch_size`` images and spread over
+    ``workers`` processes, each holding its own recognizer built by the picklable
+    ``recognizer_factory``. ``workers=0`` grades in the current process. Rows are
+    written as chunks finish, so their order is not the input order. Returns a
+    stats dict with the image count, elapsed seconds and throughput.
+    """
+    items = (
+        (name, label_for(name, label_from), data) for name, data in iter_images(source)
+    )
+    chunks = chunked(items, batch_size)
+    start = time.perf_counter()
+    count = 0
+
+    def write_rows(rows):
+        nonlocal count
+        for row in rows:
+            writer.write(row)
+            count += 1
+
+    if workers == 0:
+        recognizer = recognizer_factory()
+        for chunk in chunks:
+            write_rows(grade_chunk(chunk, top_k, threshold, recognizer))
+    else:
+        workers = workers or os.cpu_count() or 1
+        # Spawn rather than fork so no MediaPipe threads are inherited
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=init_worker,
+            initargs=(recognizer_factory,),
+        ) as pool:
+            # Keep a bounded number of chunks in flight so huge archives are
+            # not read into memory all at once
+            pending = set()
+            for chunk in chunks:
+                pending.add(pool.submit(grade_chunk, chunk, top_k, threshold))
+                if len(pending) >= 2 * workers:
+                    done = next(as_completed(pending))
+                    pending.remove(done)
+                    write_rows(done.result())
+            for done in as_completed(pending):
+                write_rows(done.result())
+
+    elapsed = time.perf_counter() - start
+    return {
+        "images": count,
+        "seconds": elapsed,
+        "images_per_second": count / elapsed if elapsed > 0 else 0.0,
+    }
@@ -0,0 +1,444 @@
+"""Nearest-neighbour indexes over template embeddings.
+
+``FlatIndex`` scores every vector exactly. ``IVFIndex`` is an inverted-file index:
+vectors are clustered with spherical k-means and a query only scores the vectors
+in its ``n_probe`` closest clusters, which keeps latency low for banks with
+hundreds of thousands of reference embeddings at a small cost in recall.
+``QuantizedIndex`` stores the vectors as int8 codes with a per-vector scale, or as
+float16, and re-ranks its best candidates against the float32 vectors. All of
+them work on L2-normalized vectors, where the dot product is the cosine
+similarity.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+import time
+import uuid
+import zipfile
+
+import numpy as np
+
+from .matching import normalize_rows, top_k_indices
+
+
+def matrix_fingerprint(vectors):
+    """Hash of a vector matrix, used to check a saved index still matches its bank"""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    digest = hashlib.sha256(str(vectors.shape).encode())
+    digest.update(vectors.data)
+    return digest.hexdigest()
+
+
+def pad_hits(scores, ids, k):
+    """Pad a hit list to ``k`` entries with ``-inf`` scores and ``-1`` ids"""
+    missing = k - len(ids)
+    if missing <= 0:
+        return scores, ids
+    return (
+        np.concatenate([scores, np.full(missing, -np.inf, dtype=np.float32)]),
+        np.concatenate([ids, np.full(missing, -1, dtype=np.intp)]),
+    )
+
+
+class FlatIndex:
+    """Exact search by scoring every vector"""
+
+    kind = "flat"
+
+    def __init__(self, vectors):
+        self.vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+
+    def __len__(self):
+        return self.vectors.shape[0]
+
+    def params(self):
+        return {}
+
+    def search(self, queries, k):
+        """Return ``(scores, ids)``, each ``(N, k)``, best first.
+
+        Rows are padded with ``-inf`` / ``-1`` when the index holds fewer than
+        ``k`` vectors.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        scores = queries @ self.vectors.T
+        ids = top_k_indices(scores, k)
+        top_scores = np.take_along_axis(scores, ids, axis=-1)
+        if ids.shape[1] < k:
+            padded = [pad_hits(s, i, k) for s, i in zip(top_scores, ids)]
+            top_scores = np.stack([s for s, _ in padded])
+            ids = np.stack([i for _, i in padded])
+        return top_scores, ids
+
+    def arrays(self):
+        return {"vectors": self.vectors}
+
+    @property
+    def nbytes(self):
+        return self.vectors.nbytes
+
+    @classmethod
+    def from_arrays(cls, arrays, params, vectors=None):
+        return cls(arrays["vectors"])
+
+
+class IVFIndex:
+    """Inverted-file index built with spherical k-means in NumPy.
+
+    ``n_lists`` defaults to about ``sqrt(N)`` clusters. Vectors are stored sorted
+    by cluster so each probed list is one contiguous slice.
+    """
+
+    kind = "ivf"
+
+    def __init__(
+        self,
+        vectors,
+        n_lists=None,
+        n_probe=8,
+        iterations=10,
+        train_size=50_000,
+        seed=0,
+        _trained=None,
+    ):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        n = vectors.shape[0]
+        self.n_lists = max(1, min(n, n_lists or int(np.sqrt(n)))) if n else 1
+        self.n_probe = n_probe
+        self.iterations = iterations
+        self.train_size = train_size
+        self.seed = seed
+
+        if _trained is not None:
+            self.centroids, self.ids, self.offsets, self.vectors = _trained
+            return
+
+        if n == 0:
+            self.centroids = np.zeros((0, vectors.shape[1]), dtype=np.float32)
+            assignments = np.zeros(0, dtype=np.intp)
+        else:
+            self.centroids = self._train(vectors)
+            assignments = self._assign(vectors)
+        self.ids = np.argsort(assignments, kind="stable")
+        counts = np.bincount(assignments, minlength=len(self.centroids))
+        self.offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.intp)
+        self.vectors = vectors[self.ids]
+
+    def __len__(self):
+        return self.vectors.shape[0]
+
+    def params(self):
+        return {
+            "n_lists": self.n_lists,
+            "n_probe": self.n_probe,
+            "iterations": self.iterations,
+            "train_size": self.train_size,
+            "seed": self.seed,
+        }
+
+    def _assign(self, vectors, chunk_size=16_384):
+        """Closest centroid for every vector, in chunks to bound memory"""
+        return np.concatenate(
+            [
+                np.argmax(vectors[i : i + chunk_size] @ self.centroids.T, axis=1)
+                for i in range(0, vectors.shape[0], chunk_size)
+            ]
+        )
+
+    def _train(self, vectors):
+        rng = np.random.default_rng(self.seed)
+        if vectors.shape[0] > self.train_size:
+            sample = vectors[rng.choice(vectors.shape[0], self.train_size, False)]
+        else:
+            sample = vectors
+        self.centroids = sample[rng.choice(sample.shape[0], self.n_lists, False)]
+
+        for _ in range(self.iterations):
+            assignments = self._assign(sample)
+            counts = np.bincount(assignments, minlength=self.n_lists)
+            sums = np.zeros_like(self.centroids)
+            np.add.at(sums, assignments, sample)
+            # Duplicated vectors leave clusters empty; reseed those
+            empty = counts == 0
+            sums[empty] = sample[rng.choice(sample.shape[0], int(empty.sum()))]
+            self.centroids = normalize_rows(sums).astype(np.float32)
+        return self.centroids
+
+    def search(self, queries, k, n_probe=None):
+        """Return ``(scores, ids)``, each ``(N, k)``, best first.
+
+        Only the ``n_probe`` lists closest to each query are scored, so results
+        are approximate. Missing hits are padded with ``-inf`` / ``-1``.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        n_probe = n_probe or self.n_probe
+        probes = top_k_indices(queries @ self.centroids.T, n_probe)
+
+        all_scores = np.empty((len(queries), k), dtype=np.float32)
+        all_ids = np.empty((len(queries), k), dtype=np.intp)
+        for i, (query, lists) in enumerate(zip(queries, probes)):
+            # Score each probed list as a contiguous slice, without gathering rows
+            ranges = [(self.offsets[j], self.offsets[j + 1]) for j in lists]
+            scores = np.concatenate(
+                [self.vectors[start:end] @ query for start, end in ranges]
+            )
+            candidates = np.concatenate([self.ids[start:end] for start, end in ranges])
+            top = top_k_indices(scores, k)
+            all_scores[i], all_ids[i] = pad_hits(scores[top], candidates[top], k)
+        return all_scores, all_ids
+
+    def arrays(self):
+        return {
+            "centroids": self.centroids,
+            "ids": self.ids,
+            "offsets": self.offsets,
+            "vectors": self.vectors,
+        }
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in self.arrays().values())
+
+    @classmethod
+    def from_arrays(cls, arrays, params, vectors=None):
+        trained = (
+            arrays["centroids"],
+            arrays["ids"],
+            arrays["offsets"],
+            arrays["vectors"],
+        )
+        return cls(arrays["vectors"], _trained=trained, **params)
+
+
+PRECISIONS = ("int8", "float16")
+
+
+def quantize(vectors, precision="int8"):
+    """Compress vectors to ``(codes, scales)``.
+
+    int8 codes use a symmetric per-vector scale, so ``codes[i] * scales[i]``
+    approximates ``vectors[i]``. float16 codes need no scale and ``scales`` is
+    None.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if precision == "float16":
+        return vectors.astype(np.float16), None
+    if precision != "int8":
+        raise ValueError(
+            f"Unknown precision {precision!r}, expected one of {PRECISIONS}"
+        )
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.rint(vectors / scales[:, None]).clip(-127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def dequantize(codes, scales):
+    """Inverse of ``quantize``, back to float32"""
+    vectors = codes.astype(np.float32)
+    if scales is not None:
+        vectors *= scales[:, None]
+    return vectors
+
+
+class QuantizedIndex:
+    """Search over reduced-precision vectors with a float32 re-rank.
+
+    The codes take a quarter (int8) or half (float16) of the float32 memory and
+    are scored in chunks, so only a small block is ever widened to float32. The
+    best ``rerank * k`` candidates of each query are then rescored exactly
+    against the float32 vectors the index was built from. Those are referenced,
+    not copied, and are not saved with the index; pass them memory-mapped
+    (``map_vectors``) so the codes are the only private copy of the bank.
+    Without them (``rerank=0``) the approximate scores are returned.
+
+    NumPy has no fast float16 kernels, so float16 halves memory but scores more
+    slowly than float32; int8 is the one to use for speed as well as size.
+    """
+
+    kind = "quantized"
+
+    def __init__(
+        self, vectors, precision="int8", rerank=4, chunk_size=256, _quantized=None
+    ):
+        self.precision = precision
+        self.rerank = rerank
+        self.chunk_size = chunk_size
+        self.rerank_vectors = (
+            None if vectors is None else np.asarray(vectors, dtype=np.float32)
+        )
+        if _quantized is not None:
+            self.codes, self.scales = _quantized
+        else:
+            self.codes, self.scales = quantize(self.rerank_vectors, precision)
+
+    def __len__(self):
+        return self.codes.shape[0]
+
+    def params(self):
+        return {
+            "precision": self.precision,
+            "rerank": self.rerank,
+            "chunk_size": self.chunk_size,
+        }
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in self.arrays().values())
+
+    def approximate_scores(self, queries):
+        """``(N, len(self))`` similarities computed from the codes"""
+        scores = np.empty((len(queries), len(self)), dtype=np.float32)
+        # Widen one cache-sized block at a time into a reused float32 buffer
+        buffer = np.empty((self.chunk_size, self.codes.shape[1]), dtype=np.float32)
+        for start in range(0, len(self), self.chunk_size):
+            codes = self.codes[start : start + self.chunk_size]
+            block = buffer[: len(codes)]
+            np.copyto(block, codes)
+            scores[:, start : start + len(codes)] = queries @ block.T
+        if self.scales is not None:
+            scores *= self.scales
+        return scores
+
+    def search(self, queries, k):
+        """Return ``(scores, ids)``, each ``(N, k)``, best first.
+
+        Missing hits are padded with ``-inf`` / ``-1``.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        scores = self.approximate_scores(queries)
+        exact = self.rerank and self.rerank_vectors is not None
+        ids = top_k_indices(scores, max(k, self.rerank * k) if exact else k)
+
+        all_scores = np.empty((len(queries), k), dtype=np.float32)
+        all_ids = np.empty((len(queries), k), dtype=np.intp)
+        for i, (query, candidates) in enumerate(zip(queries, ids)):
+            if exact:
+                candidate_scores = self.rerank_vectors[candidates] @ query
+            else:
+                candidate_scores = scores[i, candidates]
+            top = top_k_indices(candidate_scores, k)
+            all_scores[i], all_ids[i] = pad_hits(
+                candidate_scores[top], candidates[top], k
+            )
+        return all_scores, all_ids
+
+    def arrays(self):
+        if self.scales is None:
+            return {"codes": self.codes}
+        return {"codes": self.codes, "scales": self.scales}
+
+    @classmethod
+    def from_arrays(cls, arrays, params, vectors=None):
+        quantized = (arrays["codes"], arrays.get("scales"))
+        return cls(vectors, _quantized=quantized, **params)
+
+
+INDEX_TYPES = {
+    index_type.kind: index_type for index_type in (FlatIndex, IVFIndex, QuantizedIndex)
+}
+
+
+def build_index(kind, vectors, **params):
+    """Build an index of the given kind (``flat``, ``ivf`` or ``quantized``)"""
+    try:
+        index_type = INDEX_TYPES[kind]
+    except KeyError:
+        raise ValueError(
+            f"Unknown index {kind!r}, expected one of {sorted(INDEX_TYPES)}"
+        ) from None
+    return index_type(vectors, **params)
+
+
+def save_index(index, path, fingerprint):
+    """Save an index to ``path`` (``.npz``) tagged with its bank fingerprint"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    meta = {"kind": index.kind, "params": index.params(), "fingerprint": fingerprint}
+    tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    with open(tmp_path, "wb") as f:
+        np.savez(f, meta=np.array(json.dumps(meta)), **index.arrays())
+    os.replace(tmp_path, path)
+
+
+def map_vectors(vectors, path):
+    """Return ``vectors`` as float32 memory-mapped from ``path`` (``.npy``).
+
+    The file is written first unless it already holds an array of the same
+    shape, so ``path`` should name its contents, e.g. by fingerprint. A mapped
+    file's pages are shared by every process that maps it and only stay
+    resident while they are being read, unlike a private copy per worker.
+    """
+    path = Path(path)
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    try:
+        mapped = np.load(path, mmap_mode="r")
+        if mapped.shape == vectors.shape and mapped.dtype == np.float32:
+            return mapped
+    except (OSError, ValueError):
+        pass
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    with open(tmp_path, "wb") as f:
+        np.save(f, vectors)
+    os.replace(tmp_path, path)
+    return np.load(path, mmap_mode="r")
+
+
+def load_index(path, kind=None, fingerprint=None, params=None, vectors=None):
+    """Load an index saved by ``save_index``.
+
+    Returns None when the file is missing or unreadable, or when it does not
+    match the expected kind, bank fingerprint or build parameters. ``vectors``
+    are the float32 bank rows, which a ``QuantizedIndex`` re-ranks against.
+    """
+    try:
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            arrays = {name: data[name] for name in data.files if name != "meta"}
+    except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile):
+        return None
+    if kind is not None and meta["kind"] != kind:
+        return None
+    if fingerprint is not None and meta["fingerprint"] != fingerprint:
+        return None
+    if params and any(
+        meta["params"].get(key) != value for key, value in params.items()
+    ):
+        return None
+    return INDEX_TYPES[meta["kind"]].from_arrays(arrays, meta["params"], vectors)
+
+
+def recall_at_k(index, exact_index, queries, k=10):
+    """Fraction of the exact top-``k`` neighbours that ``index`` also returns.
+
+    Also reports how often both agree on the best match, the largest error in
+    the best score, and the mean per-query latency of both indexes in
+    milliseconds.
+    """
+    queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+
+    start = time.perf_counter()
+    exact_scores, exact_ids = exact_index.search(queries, k)
+    exact_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+    start = time.perf_counter()
+    scores, ids = index.search(queries, k)
+    index_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+    found_both = (ids[:, 0] >= 0) & (exact_ids[:, 0] >= 0)
+    errors = np.abs(scores[found_both, 0] - exact_scores[found_both, 0])
+    hits = sum(
+        len(np.intersect1d(found[found >= 0], expected[expected >= 0]))
+        for found, expected in zip(ids, exact_ids)
+    )
+    total = int((exact_ids >= 0).sum())
+    return {
+        "recall": hits / total if total else 1.0,
+        "top1_agreement": float(np.mean(ids[:, 0] == exact_ids[:, 0])),
+        "top1_score_error": float(np.max(errors, initial=0.0)),
+        "index_ms_per_query": index_ms,
+        "exact_ms_per_query": exact_ms,
+    }
@@ -0,0 +1,268 @@
+"""Vectorized nearest-template matching over a contiguous embedding matrix."""
+
+from typing import NamedTuple
+
+import numpy as np
+
+
+class Candidate(NamedTuple):
+    """A ranked template match.
+
+    ``margin`` is how far the score is ahead of the next-ranked template, which is
+    a better confidence signal than the raw score when two glyphs look alike.
+    """
+
+    name: str
+    score: float
+    margin: float
+
+
+def top_k_indices(scores, k):
+    """Return the indices of the ``k`` highest scores along the last axis, best first.
+
+    ``argpartition`` selects the top ``k`` in linear time, so only those ``k``
+    entries are fully sorted. A 2-D score matrix is handled row by row in one call.
+    """
+    scores = np.asarray(scores)
+    n = scores.shape[-1]
+    k = min(k, n)
+    if k <= 0:
+        return np.empty(scores.shape[:-1] + (0,), dtype=np.intp)
+    if k < n:
+        top = np.argpartition(scores, n - k, axis=-1)[..., n - k :]
+    else:
+        top = np.broadcast_to(np.arange(n), scores.shape)
+    order = np.argsort(np.take_along_axis(scores, top, axis=-1), axis=-1)[..., ::-1]
+    return np.take_along_axis(top, order, axis=-1)
+
+
+AGGREGATIONS = ("max", "mean", "centroid")
+
+
+def normalize_rows(matrix):
+    """L2-normalize each row, leaving all-zero rows untouched"""
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms > 0, norms, 1)
+
+
+class EmbeddingBank:
+    """Template embeddings stacked into one float32 matrix with a parallel name list.
+
+    Each row is one reference variant and ``labels`` gives the character it
+    belongs to; rows default to one variant per character. Rows are grouped by
+    character so per-character aggregation is a single ``reduceat`` over the
+    score matrix:
+
+    - ``max``: score of the closest variant
+    - ``mean``: average score over the variants
+    - ``centroid``: score against the normalized mean of the variants
+
+    Scoring an input against every template is a single matrix-vector product, so
+    the per-request cost does not grow with Python overhead per template. The bank
+    is treated as immutable; build a new one to change its contents.
+    """
+
+    def __init__(self, row_names, matrix, labels=None, aggregation="max"):
+        if aggregation not in AGGREGATIONS:
+            raise ValueError(
+                f"Unknown aggregation {aggregation!r}, expected one of {AGGREGATIONS}"
+            )
+        row_names = list(row_names)
+        matrix = np.asarray(matrix, dtype=np.float32)
+        labels = list(labels) if labels is not None else row_names
+        if not (matrix.shape[0] == len(row_names) == len(labels)):
+            raise ValueError(
+                f"Got {len(row_names)} names and {len(labels)} labels "
+                f"for {matrix.shape[0]} embeddings"
+            )
+
+        self.aggregation = aggregation
+        self.search_index = None
+        self.names = sorted(set(labels))
+        self.index = {name: i for i, name in enumerate(self.names)}
+
+        # Group rows by character (stable, so variant order is kept)
+        class_ids = np.array([self.index[label] for label in labels], dtype=np.intp)
+        order = np.argsort(class_ids, kind="stable")
+        self.row_names = [row_names[i] for i in order]
+        self.row_labels = class_ids[order]
+        self.matrix = np.ascontiguousarray(matrix[order])
+        self.counts = np.bincount(self.row_labels, minlength=len(self.names))
+        self.starts = np.concatenate([[0], np.cumsum(self.counts)[:-1]]).astype(np.intp)
+        self.single_variant = bool(np.all(self.counts == 1))
+
+        # One representative embedding per character: the row itself for single
+        # variants, otherwise the normalized mean of the variants
+        if self.single_variant or not len(self.names):
+            self.centroids = self.matrix
+        else:
+            sums = np.add.reduceat(self.matrix, self.starts, axis=0)
+            self.centroids = np.ascontiguousarray(normalize_rows(sums))
+
+    @classmethod
+    def from_dict(cls, embeddings, labels=None, aggregation="max"):
+        """Build a bank from a ``{row_name: embedding}`` mapping, sorted by name.
+
+        ``labels`` maps row names to characters for multi-variant banks; rows
+        missing from it are their own character.
+        """
+        row_names = sorted(embeddings)
+        if not row_names:
+            return cls([], np.empty((0, 0), dtype=np.float32), aggregation=aggregation)
+        labels = labels or {}
+        return cls(
+            row_names,
+            np.stack(
+                [np.asarray(embeddings[name], dtype=np.float32) for name in row_names]
+            ),
+            labels=[labels.get(name, name) for name in row_names],
+            aggregation=aggregation,
+        )
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def __getitem__(self, name):
+        """Return the representative embedding for a character"""
+        return self.centroids[self.index[name]]
+
+    def as_dict(self):
+        """Return ``{name: embedding}`` where each value is a view into the bank"""
+        return {name: self.centroids[i] for i, name in enumerate(self.names)}
+
+    def variant_count(self):
+        return self.matrix.shape[0]
+
+    def aggregate(self, row_scores):
+        """Reduce ``(..., rows)`` variant scores to ``(..., characters)`` scores"""
+        if self.single_variant:
+            return row_scores
+        if self.aggregation == "max":
+            return np.maximum.reduceat(row_scores, self.starts, axis=-1)
+        return np.add.reduceat(row_scores, self.starts, axis=-1) / self.counts
+
+    def scores(self, embedding):
+        """Cosine similarity of an L2-normalized embedding against every character"""
+        embedding = np.asarray(embedding, dtype=np.float32)
+        return self.scores_batch(embedding[np.newaxis])[0]
+
+    def score_for(self, embedding, name):
+        """Aggregated similarity against one character, touching only its rows"""
+        i = self.index[name]
+        embedding = np.asarray(embedding, dtype=np.float32)
+        if self.aggregation == "centroid":
+            return float(self.centroids[i] @ embedding)
+        row_scores = (
+            self.matrix[self.starts[i] : self.starts[i] + self.counts[i]] @ embedding
+        )
+        return float(
+            row_scores.max() if self.aggregation == "max" else row_scores.mean()
+        )
+
+    def scores_batch(self, embeddings):
+        """Score an ``(N, D)`` embedding matrix against every character at once"""
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if self.aggregation == "centroid":
+            return embeddings @ self.centroids.T
+        return self.aggregate(embeddings @ self.matrix.T)
+
+    def search_vectors(self):
+        """The vectors a nearest-neighbour index should be built over.
+
+        With ``max`` aggregation that is every variant row, with ``centroid`` the
+        per-character centroids. ``mean`` needs every variant score of a character,
+        which an approximate index cannot provide.
+        """
+        if self.aggregation == "centroid":
+            return self.centroids
+        if self.aggregation == "mean" and not self.single_variant:
+            raise ValueError("Index search needs 'max' or 'centroid' aggregation")
+        return self.matrix
+
+    def map_search_vectors(self, vectors):
+        """Swap ``search_vectors()`` for an equal array held elsewhere, such as
+        one memory-mapped by ``map_vectors``, releasing the in-memory copy"""
+        if vectors.shape != self.search_vectors().shape:
+            raise ValueError("Vectors do not match the bank")
+        shared = self.centroids is self.matrix
+        if self.aggregation == "centroid":
+            self.centroids = vectors
+        else:
+            self.matrix = vectors
+        if shared:
+            self.matrix = self.centroids = vectors
+
+    def attach_index(self, index):
+        """Answer ``top_k`` queries from ``index``, built over ``search_vectors()``"""
+        if len(index) != self.search_vectors().shape[0]:
+            raise ValueError("Index size does not match the bank")
+        self.search_index = index
+
+    def top_k(self, embedding, k=5):
+        """Return the ``k`` best matching characters as ranked ``Candidate`` tuples"""
+        embedding = np.asarray(embedding, dtype=np.float32)
+        return self.top_k_batch(embedding[np.newaxis], k)[0]
+
+    def top_k_batch(self, embeddings, k=5):
+        """Rank many embeddings at once with a single matrix-matrix product.
+
+        ``embeddings`` is an ``(N, D)`` matrix; returns N lists of ``Candidate``.
+        When an index is attached, only its nearest neighbours are ranked.
+        """
+        if self.search_index is None:
+            return self.rank_batch(self.scores_batch(embeddings), k)
+        return self.search_batch(embeddings, k)
+
+    def search_batch(self, embeddings, k=5):
+        """Rank the ``k`` best characters using the attached index"""
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if self.aggregation == "centroid" or self.single_variant:
+            # One indexed vector per character, so hit ids are character ids
+            scores, class_ids = self.search_index.search(embeddings, k + 1)
+        else:
+            # Fetch enough variant rows to cover k + 1 distinct characters even
+            # if the best ones all come from the same character
+            fetch = min(self.variant_count(), (k + 1) * int(self.counts.max()))
+            scores, row_ids = self.search_index.search(embeddings, fetch)
+            class_ids = np.where(row_ids >= 0, self.row_labels[row_ids], -1)
+        return [
+            self._candidates_from_hits(row_scores, row_class_ids, k)
+            for row_scores, row_class_ids in zip(scores, class_ids)
+        ]
+
+    def _candidates_from_hits(self, scores, class_ids, k):
+        """Collapse best-first hits to the first (best) hit per character"""
+        valid = class_ids >= 0
+        scores, class_ids = scores[valid], class_ids[valid]
+        _, first = np.unique(class_ids, return_index=True)
+        first = np.sort(first)[: k + 1]
+        top_scores = scores[first]
+        next_scores = np.append(top_scores[1:], top_scores[-1:])
+        return [
+            Candidate(self.names[class_ids[i]], float(s), float(s - n))
+            for i, s, n in zip(first[:k], top_scores[:k], next_scores[:k])
+        ]
+
+    def rank(self, scores, k=5):
+        """Turn a score vector from this bank into ranked ``Candidate`` tuples"""
+        return self.rank_batch(scores[np.newaxis], k)[0]
+
+    def rank_batch(self, scores, k=5):
+        """Turn an ``(N, len(bank))`` score matrix into N ranked candidate lists"""
+        # Take one extra so the last returned candidate also gets a real margin
+        top = top_k_indices(scores, k + 1)
+        top_scores = np.take_along_axis(scores, top, axis=-1)
+        next_scores = np.concatenate([top_scores[:, 1:], top_scores[:, -1:]], axis=1)
+        margins = top_scores - next_scores
+
+        k = min(k, top.shape[1])
+        return [
+            [
+                Candidate(self.names[r], float(s), float(m))
+                for r, s, m in zip(rows[:k], row_scores[:k], row_margins[:k])
+            ]
+            for rows, row_scores, row_margins in zip(top, top_scores, margins)
+        ]
@@ -0,0 +1,217 @@
+"""ORB descriptors of every template stacked into one bank that votes per glyph.
+
+Matching an input against each template with its own brute-force matcher costs
+one matcher call per glyph. The bank instead keeps every template descriptor in
+a single packed ``uint8`` matrix with a parallel glyph label per row, finds the
+nearest template descriptor for all input descriptors in one query and lets
+each of them vote for the glyph it came from. The nearest neighbours come
+either from an exact, vectorized Hamming distance (XOR plus popcount over
+64-bit words) or from an approximate FLANN LSH index, whose cost grows
+sublinearly with the number of templates.
+
+Banks are saved as ``.npz`` files tagged with a fingerprint of the template
+files and ORB parameters, so a new process can skip feature extraction.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+import uuid
+import zipfile
+
+import cv2
+import numpy as np
+
+from .template_cache import file_sha256
+
+BANK_VERSION = 1
+
+MATCHERS = ("hamming", "flann")
+
+# cv2.KeyPoint fields kept for each descriptor, for match visualizations
+KEYPOINT_FIELDS = ("x", "y", "size", "angle", "response", "octave")
+
+if hasattr(np, "bitwise_count"):
+    popcount = np.bitwise_count
+else:
+    _POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], np.uint8)
+
+    def popcount(words):
+        bytes_ = words.view(np.uint8).reshape(words.shape + (-1,))
+        return _POPCOUNT_TABLE[bytes_].sum(axis=-1, dtype=np.uint8)
+
+
+def pack_words(descriptors):
+    """View ``(N, B)`` uint8 descriptors as 64-bit words when ``B`` allows it"""
+    descriptors = np.ascontiguousarray(descriptors, dtype=np.uint8)
+    if descriptors.shape[1] % 8 == 0:
+        return descriptors.view(np.uint64)
+    return descriptors
+
+
+def hamming_distances(query, bank, chunk_size=64):
+    """Hamming distances between every row of ``query`` and of ``bank``.
+
+    Both are ``(N, B)`` packed uint8 descriptors. Queries are processed in
+    chunks so the ``(chunk, len(bank), words)`` XOR buffer stays small.
+    """
+    query_words = pack_words(query)
+    bank_words = pack_words(bank)
+    distances = np.empty((len(query_words), len(bank_words)), dtype=np.uint16)
+    for start in range(0, len(query_words), chunk_size):
+        chunk = query_words[start : start + chunk_size]
+        xor = np.bitwise_xor(chunk[:, np.newaxis, :], bank_words[np.newaxis])
+        popcount(xor).sum(axis=-1, out=distances[start : start + chunk_size])
+    return distances
+
+
+def templates_fingerprint(template_files, params):
+    """Digest of the template file contents and the feature extraction params"""
+    digest = hashlib.sha256()
+    digest.update(json.dumps({"version": BANK_VERSION, **params}).encode())
+    for name in sorted(template_files):
+        digest.update(name.encode())
+        digest.update(file_sha256(template_files[name]).encode())
+    return digest.hexdigest()
+
+
+class DescriptorBank:
+    """Template descriptors stacked into one matrix with a glyph label per row.
+
+    ``descriptors`` is ``(N, B)`` uint8 with rows grouped by glyph, ``labels``
+    gives the index into ``names`` for each row and ``keypoints`` holds the
+    ``KEYPOINT_FIELDS`` of each row. An input descriptor only votes when its
+    nearest template descriptor is within ``max_distance`` bits.
+    """
+
+    def __init__(
+        self, names, descriptors, labels, keypoints, matcher="hamming", max_distance=64
+    ):
+        if matcher not in MATCHERS:
+            raise ValueError(f"matcher must be one of {MATCHERS}, got {matcher!r}")
+        self.names = list(names)
+        self.descriptors = np.ascontiguousarray(descriptors, dtype=np.uint8)
+        self.labels = np.asarray(labels, dtype=np.int32)
+        self.keypoints = np.asarray(keypoints, dtype=np.float32)
+        self.matcher = matcher
+        self.max_distance = max_distance
+        # Row range of each glyph, rows being grouped by label
+        self.offsets = np.searchsorted(self.labels, np.arange(len(self.names) + 1))
+        self._flann = None
+
+    @classmethod
+    def from_features(cls, features, **kwargs):
+        """Build a bank from ``{name: (keypoints, descriptors)}``"""
+        names = sorted(name for name, (_, des) in features.items() if des is not None)
+        descriptors, labels, keypoints = [], [], []
+        for label, name in enumerate(names):
+            kps, des = features[name]
+            descriptors.append(des)
+            labels.append(np.full(len(des), label))
+            keypoints.append(
+                [(*kp.pt, kp.size, kp.angle, kp.response, kp.octave) for kp in kps]
+            )
+        if not names:
+            return cls([], np.empty((0, 32), np.uint8), [], np.empty((0, 6)), **kwargs)
+        return cls(
+            names,
+            np.concatenate(descriptors),
+            np.concatenate(labels),
+            np.concatenate(keypoints),
+            **kwargs,
+        )
+
+    def __len__(self):
+        return len(self.descriptors)
+
+    def descriptors_for(self, name):
+        label = self.names.index(name)
+        return self.descriptors[self.offsets[label] : self.offsets[label + 1]]
+
+    def keypoints_for(self, name):
+        label = self.names.index(name)
+        rows = self.keypoints[self.offsets[label] : self.offsets[label + 1]]
+        return [
+            cv2.KeyPoint(x, y, size, angle, response, int(octave))
+            for x, y, size, angle, response, octave in rows
+        ]
+
+    @property
+    def flann(self):
+        """LSH index over the bank, built on first use"""
+        if self._flann is None:
+            index_params = dict(
+                algorithm=6,  # FLANN_INDEX_LSH
+                table_number=6,
+                key_size=12,
+                multi_probe_level=1,
+            )
+            self._flann = cv2.FlannBasedMatcher(index_params, dict(checks=50))
+            self._flann.add([self.descriptors])
+            self._flann.train()
+        return self._flann
+
+    def nearest(self, query):
+        """Row and Hamming distance of the nearest bank descriptor per query row.
+
+        Rows without a neighbour (possible with LSH) get row -1.
+        """
+        query = np.ascontiguousarray(query, dtype=np.uint8)
+        if not len(query) or not len(self):
+            return np.full(len(query), -1), np.zeros(len(query), dtype=np.int64)
+        if self.matcher == "hamming":
+            distances = hamming_distances(query, self.descriptors)
+            rows = distances.argmin(axis=1)
+            return rows, distances[np.arange(len(query)), rows].astype(np.int64)
+
+        rows = np.full(len(query), -1)
+        best = np.zeros(len(query), dtype=np.int64)
+        for matches in self.flann.knnMatch(query, k=1):
+            if matches:
+                rows[matches[0].queryIdx] = matches[0].trainIdx
+                best[matches[0].queryIdx] = int(matches[0].distance)
+        return rows, best
+
+    def vote(self, query):
+        """Score every glyph by the share of input descriptors voting for it"""
+        rows, distances = self.nearest(query)
+        good = (rows >= 0) & (distances <= self.max_distance)
+        votes = np.bincount(self.labels[rows[good]], minlength=len(self.names))
+        total = max(len(query), 1)
+        return {name: votes[i] / total for i, name in enumerate(self.names)}
+
+    def save(self, path, fingerprint):
+        """Save to ``path`` (``.npz``) tagged with the templates' fingerprint"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        meta = {"names": self.names, "fingerprint": fingerprint}
+        tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                meta=np.array(json.dumps(meta)),
+                descriptors=self.descriptors,
+                labels=self.labels,
+                keypoints=self.keypoints,
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, fingerprint, **kwargs):
+        """Load a bank saved by ``save``, or None if it is missing, unreadable or
+        was built from different templates or parameters"""
+        try:
+            with np.load(path) as data:
+                meta = json.loads(str(data["meta"]))
+                if meta["fingerprint"] != fingerprint:
+                    return None
+                return cls(
+                    meta["names"],
+                    data["descriptors"],
+                    data["labels"],
+                    data["keypoints"],
+                    **kwargs,
+                )
+        except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile):
+            return None
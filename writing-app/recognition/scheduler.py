@@ -0,0 +1,179 @@
+"""Dynamic micro-batching of embedding requests across pinned embedders.
+
+Callers on any thread submit single images. Each worker thread owns its own
+embedder, created once by ``embedder_factory`` and never shared, so workers run
+in parallel without a lock. A worker takes the oldest request, keeps collecting
+until ``max_batch`` requests are in hand or ``window`` seconds have passed,
+runs them back-to-back and fans the results back to the waiting callers. Under
+light load a request waits at most ``window``; under a burst every worker drains
+full batches and the hand-off cost is paid once per batch.
+"""
+
+from collections import Counter, deque
+from concurrent.futures import Future
+import queue
+import threading
+import time
+
+import numpy as np
+
+# Put on the queue once per worker to shut it down
+_STOP = object()
+
+
+class EmbeddingScheduler:
+    """Thread pool that batches ``run(embedder, item)`` calls per worker.
+
+    ``metrics()`` reports queue depth, batch sizes and how long requests waited
+    in the queue before a worker picked them up.
+    """
+
+    def __init__(
+        self,
+        embedder_factory,
+        run,
+        workers=2,
+        window=0.002,
+        max_batch=16,
+        history=2048,
+    ):
+        self.embedder_factory = embedder_factory
+        self.run = run
+        self.workers = workers
+        self.window = window
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._submit_lock = threading.Lock()
+        self._closed = False
+        self._batch_sizes = Counter()
+        self._waits = deque(maxlen=history)
+        self._peak_depth = 0
+        self._threads = []
+        self._started = threading.Barrier(workers + 1)
+        self._startup_errors = []
+        for i in range(workers):
+            thread = threading.Thread(
+                target=self._work, name=f"embedder-{i}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+        # Wait for every worker to build its embedder, so failures surface here
+        self._started.wait()
+        if self._startup_errors:
+            self.close()
+            raise self._startup_errors[0]
+
+    def submit(self, item):
+        """Queue one request and return a ``Future`` for its result"""
+        future = Future()
+        # Checked and queued under the lock, so nothing lands behind _STOP
+        with self._submit_lock:
+            if self._closed:
+                raise RuntimeError("EmbeddingScheduler is closed")
+            self._queue.put((item, future, time.perf_counter()))
+        depth = self._queue.qsize()
+        if depth > self._peak_depth:
+            self._peak_depth = depth
+        return future
+
+    def embed(self, item, timeout=None):
+        """Run one request and wait for its result"""
+        return self.submit(item).result(timeout)
+
+    def embed_many(self, items, timeout=None):
+        """Run several requests, spread over the workers, and return results in order"""
+        futures = [self.submit(item) for item in items]
+        return [future.result(timeout) for future in futures]
+
+    def close(self):
+        """Stop the workers once the requests already queued are done.
+
+        Requests no worker picked up, for example because a worker failed to
+        start, are failed rather than left waiting forever.
+        """
+        with self._submit_lock:
+            if self._closed:
+                return
+            self._closed = True
+            for _ in self._threads:
+                self._queue.put(_STOP)
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join()
+        while True:
+            try:
+                request = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is not _STOP and request[1].set_running_or_notify_cancel():
+                request[1].set_exception(
+                    RuntimeError("EmbeddingScheduler closed before running this")
+                )
+
+    def _work(self):
+        try:
+            embedder = self.embedder_factory()
+        except Exception as e:
+            self._startup_errors.append(e)
+            self._started.wait()
+            return
+        self._started.wait()
+
+        stopping = False
+        while not stopping:
+            request = self._queue.get()
+            if request is _STOP:
+                return
+            batch = [request]
+            deadline = time.perf_counter() + self.window
+            while len(batch) < self.max_batch:
+                try:
+                    remaining = deadline - time.perf_counter()
+                    if remaining > 0:
+                        request = self._queue.get(timeout=remaining)
+                    else:
+                        request = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if request is _STOP:
+                    stopping = True
+                    break
+                batch.append(request)
+            self._run_batch(embedder, batch)
+
+    def _run_batch(self, embedder, batch):
+        started = time.perf_counter()
+        with self._lock:
+            self._batch_sizes[len(batch)] += 1
+            self._waits.extend(started - submitted for _, _, submitted in batch)
+        for item, future, _ in batch:
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(self.run(embedder, item))
+            except Exception as e:
+                future.set_exception(e)
+
+    def metrics(self):
+        """Snapshot of queue depth, batch size and queue wait statistics.
+
+        Wait times cover the most recent requests only.
+        """
+        with self._lock:
+            sizes = np.repeat(
+                list(self._batch_sizes), list(self._batch_sizes.values())
+            ).astype(np.float64)
+            waits_ms = np.array(self._waits, dtype=np.float64) * 1000
+        return {
+            "workers": self.workers,
+            "queue_depth": self._queue.qsize(),
+            "peak_queue_depth": self._peak_depth,
+            "batches": int(sizes.size),
+            "requests": int(sizes.sum()),
+            "batch_size_mean": float(sizes.mean()) if sizes.size else 0.0,
+            "batch_size_max": int(sizes.max()) if sizes.size else 0,
+            "wait_ms_p50": float(np.percentile(waits_ms, 50)) if waits_ms.size else 0.0,
+            "wait_ms_p95": float(np.percentile(waits_ms, 95)) if waits_ms.size else 0.0,
+            "wait_ms_max": float(waits_ms.max()) if waits_ms.size else 0.0,
+        }
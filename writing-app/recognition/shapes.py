@@ -0,0 +1,158 @@
+"""Precomputed contour shape descriptors for all templates.
+
+``cv2.matchShapes`` recomputes the moments of both contours on every call. A
+``ShapeIndex`` computes each template's main contour, log-scaled Hu moments,
+area and centroid once and keeps them in arrays, so comparing an input with
+every template is one vectorized distance over a ``(templates, 7)`` matrix.
+``hu_distances`` reproduces ``cv2.CONTOURS_MATCH_I2``.
+
+An optional coarse-to-fine cascade first ranks templates by the leading Hu
+moments only, then computes the full distance for the short-list.
+"""
+
+import cv2
+import numpy as np
+
+# cv2.matchShapes skips moments whose magnitude is at or below this
+HU_EPS = 1e-5
+
+
+def ink_mask(image, threshold=127):
+    """Binary mask (ink 255, paper 0) of a dark-on-light drawing.
+
+    Accepts grayscale, 3-channel and RGBA canvas images; transparent canvas
+    pixels count as paper.
+    """
+    if image.ndim == 3 and image.shape[2] == 4:
+        gray = cv2.cvtColor(image[:, :, :3], cv2.COLOR_RGB2GRAY)
+        gray[image[:, :, 3] == 0] = 255
+    elif image.ndim == 3:
+        gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+    else:
+        gray = image
+    _, mask = cv2.threshold(gray, threshold, 255, cv2.THRESH_BINARY_INV)
+    return mask
+
+
+def normalize_ink(mask, size=100, box=80, padding=2):
+    """Crop a mask to its ink and centre it, scaled to fit ``box``, on a
+    ``size`` square. A blank mask is only resized."""
+    coords = cv2.findNonZero(mask)
+    if coords is None:
+        return cv2.resize(mask, (size, size))
+    x, y, w, h = cv2.boundingRect(coords)
+    x, y = max(0, x - padding), max(0, y - padding)
+    w = min(mask.shape[1] - x, w + 2 * padding)
+    h = min(mask.shape[0] - y, h + 2 * padding)
+    scale = box / max(w, h)
+    new_w, new_h = max(1, int(w * scale)), max(1, int(h * scale))
+    glyph = cv2.resize(mask[y : y + h, x : x + w], (new_w, new_h))
+    result = np.zeros((size, size), dtype=np.uint8)
+    y_offset, x_offset = (size - new_h) // 2, (size - new_w) // 2
+    result[y_offset : y_offset + new_h, x_offset : x_offset + new_w] = glyph
+    return result
+
+
+def main_contour(binary):
+    """Largest external contour of a binary image, or None if it is blank"""
+    contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return None
+    return max(contours, key=cv2.contourArea)
+
+
+def log_hu_moments(moments):
+    """``sign(h) * log10(|h|)`` of the Hu moments, NaN where ``|h| <= HU_EPS``"""
+    hu = cv2.HuMoments(moments).ravel()
+    magnitude = np.abs(hu)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        logs = np.sign(hu) * np.log10(magnitude)
+    return np.where(magnitude > HU_EPS, logs, np.nan)
+
+
+def hu_distances(query, matrix):
+    """``CONTOURS_MATCH_I2`` distance of one log-Hu vector to every matrix row.
+
+    Moments that are negligible in either contour are left out, as in OpenCV.
+    """
+    differences = np.abs(matrix - query)
+    return np.where(np.isnan(differences), 0.0, differences).sum(axis=-1)
+
+
+class ShapeIndex:
+    """Main-contour descriptors of every template in parallel arrays.
+
+    ``log_hu`` is ``(T, 7)``, ``areas`` is ``(T,)`` and ``centroids`` is
+    ``(T, 2)`` (NaN for degenerate contours). ``contours`` keeps the contours
+    themselves for drawing. Templates without any contour are left out.
+    """
+
+    def __init__(self, names, contours, contour_counts=None):
+        self.names = list(names)
+        self.contours = list(contours)
+        self.positions = {name: i for i, name in enumerate(self.names)}
+        count = len(self.names)
+        self.contour_counts = np.asarray(
+            contour_counts if contour_counts is not None else [1] * count
+        )
+        self.log_hu = np.empty((count, 7))
+        self.areas = np.empty(count)
+        self.centroids = np.full((count, 2), np.nan)
+        for i, contour in enumerate(self.contours):
+            moments = cv2.moments(contour)
+            self.log_hu[i] = log_hu_moments(moments)
+            self.areas[i] = cv2.contourArea(contour)
+            if moments["m00"] != 0:
+                self.centroids[i] = moments["m10"], moments["m01"]
+                self.centroids[i] /= moments["m00"]
+
+    @classmethod
+    def from_images(cls, images):
+        """Build from ``{name: binary image}`` with white shapes on black"""
+        names, contours, counts = [], [], []
+        for name, binary in images.items():
+            found, _ = cv2.findContours(
+                binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
+            )
+            if found:
+                names.append(name)
+                contours.append(max(found, key=cv2.contourArea))
+                counts.append(len(found))
+        return cls(names, contours, counts)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.positions
+
+    def entry(self, name):
+        """``(contour, contour count, area, centroid or None)`` of one template"""
+        i = self.positions[name]
+        centroid = None
+        if not np.isnan(self.centroids[i, 0]):
+            centroid = tuple(self.centroids[i])
+        return self.contours[i], int(self.contour_counts[i]), self.areas[i], centroid
+
+    def distances(self, contour):
+        """``matchShapes`` I2 distance from ``contour`` to every template"""
+        return hu_distances(log_hu_moments(cv2.moments(contour)), self.log_hu)
+
+    def search(self, contour, shortlist=None, coarse_moments=2):
+        """Return ``(indices, distances)`` of the nearest templates.
+
+        Without ``shortlist`` every template is scored. Otherwise templates are
+        first ranked by the distance over the first ``coarse_moments`` Hu
+        moments, and only the ``shortlist`` best get the full distance.
+        """
+        query = log_hu_moments(cv2.moments(contour))
+        if not shortlist or shortlist >= len(self):
+            indices = np.arange(len(self))
+        else:
+            coarse = hu_distances(
+                query[:coarse_moments], self.log_hu[:, :coarse_moments]
+            )
+            indices = np.argpartition(coarse, shortlist - 1)[:shortlist]
+        distances = hu_distances(query, self.log_hu[indices])
+        order = np.argsort(distances, kind="stable")
+        return indices[order], distances[order]
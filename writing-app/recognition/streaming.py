@@ -0,0 +1,194 @@
+"""Continuous recognition of a live video stream.
+
+Only a few frames of a webcam stream are worth embedding. ``StreamRecognizer``
+drops a frame when it arrives sooner than the target frame rate allows
+(``FrameRateGovernor``) or when it looks the same as the last frame that was
+recognized (``ChangeDetector``), and averages the scores of the last few
+recognized frames (``SlidingWindow``) so the feedback does not flicker with
+camera noise.
+"""
+
+from collections import deque
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from .engine import rank_scores
+
+
+def frame_signature(frame, size=32):
+    """Grey ``size`` x ``size`` thumbnail of a BGR, RGB(A) or grey frame as
+    float32, cheap enough to compute for every frame"""
+    if frame.ndim == 3:
+        frame = cv2.cvtColor(
+            frame, cv2.COLOR_BGRA2GRAY if frame.shape[2] == 4 else cv2.COLOR_BGR2GRAY
+        )
+    small = cv2.resize(frame, (size, size), interpolation=cv2.INTER_AREA)
+    return small.astype(np.float32)
+
+
+class ChangeDetector:
+    """Tells whether a frame differs from the last one that was processed.
+
+    Frames are compared by the mean absolute difference of their signatures
+    in grey levels (0-255). Comparing against the last *processed* frame rather
+    than the previous one means a slow drift still adds up to a change.
+    """
+
+    def __init__(self, threshold=4.0, size=32):
+        self.threshold = threshold
+        self.size = size
+        self.reference = None
+
+    def difference(self, signature):
+        if self.reference is None:
+            return float("inf")
+        return float(np.mean(np.abs(signature - self.reference)))
+
+    def changed(self, signature):
+        return self.difference(signature) > self.threshold
+
+    def update(self, signature):
+        self.reference = signature
+
+    def reset(self):
+        self.reference = None
+
+
+class FrameRateGovernor:
+    """Lets through at most ``target_fps`` frames per second (0 for no limit)"""
+
+    def __init__(self, target_fps=5.0, clock=time.monotonic):
+        self.interval = 1.0 / target_fps if target_fps > 0 else 0.0
+        self.clock = clock
+        self.last = None
+
+    def ready(self, now=None):
+        now = self.clock() if now is None else now
+        return self.last is None or now - self.last >= self.interval
+
+    def mark(self, now=None):
+        self.last = self.clock() if now is None else now
+
+
+class SlidingWindow:
+    """Mean of the last ``size`` score vectors.
+
+    Every vector is aligned with a list of names; when the names change (the
+    templates were reloaded) the window starts over.
+    """
+
+    def __init__(self, size=5):
+        self.size = size
+        self.names = None
+        self.scores = deque(maxlen=size)
+
+    def __len__(self):
+        return len(self.scores)
+
+    def push(self, names, scores):
+        if names != self.names:
+            self.names = list(names)
+            self.scores.clear()
+        self.scores.append(np.asarray(scores, dtype=np.float32))
+
+    def mean(self):
+        """``{name: mean score}``, empty before the first push"""
+        if not self.scores:
+            return {}
+        means = np.mean(self.scores, axis=0)
+        return dict(zip(self.names, means.tolist()))
+
+    def clear(self):
+        self.names = None
+        self.scores.clear()
+
+
+class StreamRecognizer:
+    """Feeds frames to ``score`` at a bounded rate and smooths the results.
+
+    ``score(frame)`` returns ``(names, scores)`` with one score per name.
+    ``process`` may be called from the video thread while ``candidates``,
+    ``score_for`` and ``stats`` are read from another. Frames that are let
+    through are scored on the calling thread, so a stream whose frames queue up
+    behind a slow ``score`` should drop them before calling ``process``.
+    """
+
+    def __init__(
+        self,
+        score,
+        target_fps=5.0,
+        window=5,
+        change_threshold=4.0,
+        signature_size=32,
+        clock=time.monotonic,
+    ):
+        self.score = score
+        self.clock = clock
+        self.governor = FrameRateGovernor(target_fps, clock)
+        self.detector = ChangeDetector(change_threshold, signature_size)
+        self.window = SlidingWindow(window)
+        self.counts = {"frames": 0, "processed": 0, "rate_limited": 0, "unchanged": 0}
+        self.last_latency = None
+        self.last_error = None
+        self._lock = threading.Lock()
+
+    def process(self, frame):
+        """Score ``frame`` unless it is skipped; returns whether it was scored"""
+        now = self.clock()
+        with self._lock:
+            self.counts["frames"] += 1
+            if not self.governor.ready(now):
+                self.counts["rate_limited"] += 1
+                return False
+            signature = frame_signature(frame, self.detector.size)
+            if not self.detector.changed(signature):
+                self.counts["unchanged"] += 1
+                return False
+            # Claim the slot before scoring, so frames arriving meanwhile on
+            # another thread are rate limited instead of scored twice
+            self.governor.mark(now)
+            self.detector.update(signature)
+
+        start = time.perf_counter()
+        try:
+            names, scores = self.score(frame)
+        except Exception as e:
+            with self._lock:
+                self.last_error = e
+                # Let the next frame try again instead of waiting for a change
+                self.detector.reset()
+            return False
+        with self._lock:
+            self.window.push(names, scores)
+            self.counts["processed"] += 1
+            self.last_latency = time.perf_counter() - start
+            self.last_error = None
+        return True
+
+    def candidates(self, k=5):
+        """Best ``k`` smoothed ``Candidate`` tuples, empty before any frame"""
+        with self._lock:
+            return rank_scores(self.window.mean(), k)
+
+    def score_for(self, name):
+        """Smoothed score of one name, None before any frame or if unknown"""
+        with self._lock:
+            return self.window.mean().get(name)
+
+    def stats(self):
+        with self._lock:
+            return {
+                **self.counts,
+                "window": len(self.window),
+                "latency": self.last_latency,
+            }
+
+    def reset(self):
+        """Forget the smoothed results, e.g. when the target character changes"""
+        with self._lock:
+            self.window.clear()
+            self.detector.reset()
+            self.governor.last = None
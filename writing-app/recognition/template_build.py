@@ -0,0 +1,264 @@
+"""Incremental, parallel rasterization of the glyph SVGs into templates.
+
+Every output PNG is described by a job: the source SVG and a ``RenderSpec``
+(size, stroke adjustment and theme). A job's key hashes the SVG bytes, the
+spec and ``RENDER_VERSION``, and each output directory keeps a
+``manifest.json`` recording the key its files were built from. A rebuild only
+renders jobs whose key changed or whose output is missing, spreads them over a
+process pool, and deletes outputs whose SVG is gone.
+
+Rendering needs ``cairosvg`` and the Cairo library, which are not app
+dependencies (see ``scripts/README.md``), so they are imported by the worker
+that renders; planning a build works without them.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import hashlib
+import io
+import json
+import os
+from pathlib import Path
+from typing import NamedTuple
+import uuid
+
+import cv2
+import numpy as np
+
+from .augment import stroke_variant
+from .template_cache import file_sha256
+
+# Bump whenever render() output changes so every template is rebuilt
+RENDER_VERSION = 1
+THEMES = ("light", "dark")
+MANIFEST_FILE = "manifest.json"
+
+
+class RenderSpec(NamedTuple):
+    """How to render one set of templates.
+
+    ``stroke`` thickens (positive) or thins (negative) the strokes by that many
+    pixels after rasterizing. ``light`` is black ink on white, the layout of
+    ``templates/``; ``dark`` is the same glyph inverted.
+    """
+
+    width: int = 100
+    height: int = 100
+    stroke: int = 0
+    theme: str = "light"
+
+    @classmethod
+    def parse(cls, text):
+        """Parse ``WIDTH[xHEIGHT][:STROKE][:THEME]``, e.g. ``64``,
+        ``128x96:+1`` or ``100:0:dark``"""
+        size, *rest = text.split(":")
+        width, _, height = size.partition("x")
+        spec = cls(int(width), int(height or width))
+        if rest and rest[0]:
+            spec = spec._replace(stroke=int(rest[0]))
+        if len(rest) > 1:
+            spec = spec._replace(theme=rest[1])
+        spec.validate()
+        return spec
+
+    def validate(self):
+        if self.width <= 0 or self.height <= 0:
+            raise ValueError(f"size must be positive, got {self.width}x{self.height}")
+        if self.theme not in THEMES:
+            raise ValueError(f"theme must be one of {THEMES}, got {self.theme!r}")
+
+    def fields(self):
+        """Values for formatting output directory patterns"""
+        return {**self._asdict(), "size": f"{self.width}x{self.height}"}
+
+
+class Job(NamedTuple):
+    name: str
+    source: Path
+    spec: RenderSpec
+    output: Path
+    key: str
+
+
+def job_key(svg_sha256, spec):
+    """Digest of everything that determines one output's pixels"""
+    params = json.dumps(
+        {"version": RENDER_VERSION, "svg": svg_sha256, "spec": spec._asdict()},
+        sort_keys=True,
+    )
+    return hashlib.sha256(params.encode()).hexdigest()
+
+
+def read_manifest(output_dir):
+    """``{file name: entry}`` of an output directory, empty if it has none"""
+    try:
+        manifest = json.loads((Path(output_dir) / MANIFEST_FILE).read_text())
+    except (OSError, ValueError):
+        return {}
+    return manifest.get("outputs", {})
+
+
+def write_manifest(output_dir, spec, outputs):
+    """Replace an output directory's manifest in one step"""
+    output_dir = Path(output_dir)
+    manifest = {
+        "version": RENDER_VERSION,
+        "spec": spec._asdict(),
+        "outputs": dict(sorted(outputs.items())),
+    }
+    tmp_path = output_dir / f"{MANIFEST_FILE}.{uuid.uuid4().hex}.tmp"
+    tmp_path.write_text(json.dumps(manifest, indent=2))
+    os.replace(tmp_path, output_dir / MANIFEST_FILE)
+
+
+def output_dirs(output_pattern, specs):
+    """``{spec: directory}`` from a pattern like ``build/{theme}-{size}``.
+
+    A single spec may use a plain directory; several must each get their own.
+    """
+    dirs = {spec: Path(output_pattern.format(**spec.fields())) for spec in specs}
+    if len(set(dirs.values())) < len(dirs):
+        raise ValueError(
+            f"{output_pattern!r} maps several specs to one directory; include "
+            "fields such as {size}, {stroke} or {theme}"
+        )
+    return dirs
+
+
+def plan(svg_files, dirs, manifests):
+    """Split all ``(svg, spec)`` pairs into jobs to render and jobs that are
+    up to date, and list outputs whose SVG no longer exists.
+
+    ``manifests`` maps each spec to its directory's manifest entries. Returns
+    ``(pending, current, orphans)``. Each SVG is hashed once however many specs
+    use it.
+    """
+    hashes = {path: file_sha256(path) for path in svg_files}
+    pending, current, orphans = [], [], []
+    for spec, output_dir in dirs.items():
+        manifest = manifests[spec]
+        names = set()
+        for path, svg_sha256 in hashes.items():
+            names.add(f"{path.stem}.png")
+            output = output_dir / f"{path.stem}.png"
+            job = Job(path.stem, path, spec, output, job_key(svg_sha256, spec))
+            entry = manifest.get(output.name)
+            if entry and entry["key"] == job.key and output.exists():
+                current.append(job)
+            else:
+                pending.append(job)
+        orphans.extend(output_dir / name for name in manifest if name not in names)
+    return pending, current, orphans
+
+
+def rasterize(svg_path, width=None, height=None, background="white", mode="L"):
+    """Render an SVG as a uint8 image in PIL ``mode``.
+
+    Give one of ``width`` and ``height`` to keep the SVG's aspect ratio. A
+    ``background`` of None keeps the canvas transparent (use ``mode="RGBA"``).
+    """
+    import cairosvg
+    from PIL import Image
+
+    png_data = cairosvg.svg2png(
+        url=str(svg_path),
+        output_width=width,
+        output_height=height,
+        background_color=background,
+    )
+    return np.array(Image.open(io.BytesIO(png_data)).convert(mode))
+
+
+def render(svg_path, spec):
+    """Binary template image of one SVG for ``spec``"""
+    gray = rasterize(svg_path, spec.width, spec.height)
+    _, binary = cv2.threshold(gray, 127, 255, cv2.THRESH_BINARY)
+    binary = stroke_variant(binary, spec.stroke)
+    if spec.theme == "dark":
+        binary = cv2.bitwise_not(binary)
+    return binary
+
+
+def render_job(job):
+    """Render one job to its output path; returns the output's SHA-256.
+
+    The PNG is written beside the target and renamed over it, so readers such
+    as the app's template watcher never see a partial file.
+    """
+    image = render(job.source, job.spec)
+    ok, encoded = cv2.imencode(".png", image)
+    if not ok:
+        raise ValueError(f"Could not encode {job.output}")
+    data = encoded.tobytes()
+    tmp_path = job.output.with_name(f".{job.output.name}.{uuid.uuid4().hex}.tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, job.output)
+    return hashlib.sha256(data).hexdigest()
+
+
+def manifest_entry(job, output_sha256):
+    return {
+        "source": job.source.name,
+        "key": job.key,
+        "sha256": output_sha256,
+    }
+
+
+def build(svg_dir, output_pattern, specs, workers=None, renderer=render_job):
+    """Bring every output directory up to date with the SVGs in ``svg_dir``.
+
+    ``output_pattern`` is formatted with each spec's fields (see
+    ``output_dirs``). Out-of-date jobs are rendered by ``renderer`` on
+    ``workers`` processes (default: all cores; 0 renders in this process). A
+    job that fails is reported and left out of the manifest, so the next build
+    retries it. Returns counts of ``rendered``, ``skipped``, ``failed`` and
+    ``removed`` outputs, plus the ``errors`` themselves.
+    """
+    for spec in specs:
+        spec.validate()
+    dirs = output_dirs(output_pattern, specs)
+    for output_dir in dirs.values():
+        output_dir.mkdir(parents=True, exist_ok=True)
+    manifests = {spec: read_manifest(output_dir) for spec, output_dir in dirs.items()}
+    svg_files = sorted(Path(svg_dir).glob("*.svg"))
+    pending, current, orphans = plan(svg_files, dirs, manifests)
+
+    outputs = {spec: {} for spec in specs}
+    for job in current:
+        outputs[job.spec][job.output.name] = manifests[job.spec][job.output.name]
+
+    run = partial(_try_render, renderer)
+    if workers == 0 or not pending:
+        results = [run(job) for job in pending]
+    else:
+        # A few chunks per worker keeps the pool busy without a round trip per SVG
+        chunksize = max(1, len(pending) // (4 * (workers or os.cpu_count() or 1)))
+        with ProcessPoolExecutor(workers) as executor:
+            results = list(executor.map(run, pending, chunksize=chunksize))
+
+    errors = {}
+    for job, (output_sha256, error) in zip(pending, results):
+        if error is None:
+            outputs[job.spec][job.output.name] = manifest_entry(job, output_sha256)
+        else:
+            errors[str(job.output)] = error
+
+    for orphan in orphans:
+        orphan.unlink(missing_ok=True)
+    for spec, output_dir in dirs.items():
+        write_manifest(output_dir, spec, outputs[spec])
+
+    return {
+        "rendered": len(pending) - len(errors),
+        "skipped": len(current),
+        "failed": len(errors),
+        "removed": len(orphans),
+        "errors": errors,
+    }
+
+
+def _try_render(renderer, job):
+    try:
+        return renderer(job), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
@@ -0,0 +1,163 @@
+"""Persistent on-disk cache of template embeddings."""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+import uuid
+
+import numpy as np
+
+CACHE_VERSION = 1
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    """Return the hex SHA-256 digest of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class TemplateEmbeddingCache:
+    """Store template embeddings on disk so a new process can skip re-embedding.
+
+    The cache directory holds a float32 matrix (one row per template, saved as
+    ``.npy`` so it can be memory-mapped) and a ``manifest.json`` describing it.
+    The manifest records the cache version, the model file hash and the
+    preprocessing parameters; if any of these differ the whole cache is ignored.
+    Each template also has its own fingerprint (mtime, size and content hash), so
+    editing one PNG only invalidates that row.
+    """
+
+    MANIFEST_FILE = "manifest.json"
+
+    def __init__(self, cache_dir, model_path, preprocessing):
+        self.cache_dir = Path(cache_dir)
+        self.model_path = Path(model_path)
+        self.preprocessing = preprocessing
+        self.stale = True
+        self._model_hash = None
+        self._fingerprints = {}
+
+    @property
+    def model_hash(self):
+        if self._model_hash is None:
+            self._model_hash = file_sha256(self.model_path)
+        return self._model_hash
+
+    def header(self):
+        """Everything that must match for any cached row to be reused"""
+        return {
+            "version": CACHE_VERSION,
+            "model_sha256": self.model_hash,
+            "preprocessing": self.preprocessing,
+        }
+
+    def _read_manifest(self):
+        try:
+            manifest = json.loads((self.cache_dir / self.MANIFEST_FILE).read_text())
+        except (OSError, ValueError):
+            return None
+        # Round-trip through JSON so tuples in the preprocessing params compare equal
+        if manifest.get("header") != json.loads(json.dumps(self.header())):
+            return None
+        return manifest
+
+    def _fingerprint(self, path, entry=None):
+        """Fingerprint a template file, reusing the cached content hash when the
+        mtime and size are unchanged"""
+        stat = os.stat(path)
+        if (
+            entry is not None
+            and entry["mtime_ns"] == stat.st_mtime_ns
+            and entry["size"] == stat.st_size
+        ):
+            sha256 = entry["sha256"]
+        else:
+            sha256 = file_sha256(path)
+        return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "sha256": sha256}
+
+    def load(self, template_files):
+        """Return cached embeddings for the templates that are still valid.
+
+        ``template_files`` maps template names to their image paths. The returned
+        dict maps names to read-only rows of the memory-mapped matrix; templates
+        that are new or changed are simply missing from it. ``self.stale`` is set
+        when the cache on disk needs to be rewritten afterwards.
+        """
+        self._fingerprints = {}
+        manifest = self._read_manifest()
+        entries = manifest["templates"] if manifest else {}
+
+        matrix = None
+        if manifest:
+            try:
+                matrix = np.load(
+                    self.cache_dir / manifest["embeddings_file"], mmap_mode="r"
+                )
+            except (OSError, ValueError):
+                entries = {}
+
+        cached = {}
+        stale = set(entries) != set(template_files)
+        for name, path in template_files.items():
+            entry = entries.get(name)
+            fingerprint = self._fingerprint(path, entry)
+            self._fingerprints[name] = fingerprint
+            if entry is None or entry["sha256"] != fingerprint["sha256"]:
+                stale = True
+                continue
+            if entry["mtime_ns"] != fingerprint["mtime_ns"]:
+                # Same content with a new mtime (e.g. a fresh checkout); keep the
+                # row but record the new mtime so the next start skips hashing
+                stale = True
+            cached[name] = matrix[entry["row"]]
+
+        self.stale = stale
+        return cached
+
+    def save(self, template_files, embeddings):
+        """Write the embeddings for ``template_files`` to the cache.
+
+        The matrix gets a fresh file name and the manifest is replaced last, so
+        other processes either see the old cache or the new one, never a mix.
+        """
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        names = sorted(template_files)
+        matrix = np.stack(
+            [np.asarray(embeddings[name], dtype=np.float32) for name in names]
+        )
+
+        embeddings_file = f"embeddings-{uuid.uuid4().hex}.npy"
+        np.save(self.cache_dir / embeddings_file, matrix)
+
+        templates = {}
+        for row, name in enumerate(names):
+            fingerprint = self._fingerprints.get(name)
+            if fingerprint is None:
+                fingerprint = self._fingerprint(template_files[name])
+            templates[name] = {**fingerprint, "row": row}
+
+        manifest = {
+            "header": self.header(),
+            "embeddings_file": embeddings_file,
+            "templates": templates,
+        }
+        manifest_path = self.cache_dir / self.MANIFEST_FILE
+        try:
+            replaced = json.loads(manifest_path.read_text()).get("embeddings_file")
+        except (OSError, ValueError, AttributeError):
+            replaced = None
+        tmp_path = self.cache_dir / f"{self.MANIFEST_FILE}.{uuid.uuid4().hex}.tmp"
+        tmp_path.write_text(json.dumps(manifest, indent=2))
+        os.replace(tmp_path, manifest_path)
+        self.stale = False
+
+        # Only the matrix of the manifest this one replaced is removed: another
+        # process may be saving at the same time, and its matrix must survive
+        # until its own manifest is replaced. Readers that already mapped the
+        # old matrix keep their open handle.
+        if replaced and replaced != embeddings_file:
+            (self.cache_dir / Path(replaced).name).unlink(missing_ok=True)
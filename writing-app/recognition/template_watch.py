@@ -0,0 +1,114 @@
+"""Find the template images on disk and detect which were added, edited or removed.
+
+Templates are compared by ``(mtime_ns, size)`` snapshots, which costs one
+``stat`` per file and works the same on every platform, in containers and on
+network mounts where inotify-style events are not delivered. A
+``TemplateWatcher`` polls on a background thread and hands each check to a
+callback, typically ``MobileNetSitelenPonaRecognizer.reload_templates``.
+"""
+
+import logging
+import os
+from pathlib import Path
+import threading
+from typing import NamedTuple
+
+logger = logging.getLogger(__name__)
+
+
+def find_template_files(templates_dir):
+    """Return ``({row_name: path}, {row_name: char_name})`` for all templates.
+
+    ``<templates_dir>/<char>.png`` is the canonical reference for a character,
+    and any ``<char>/*.png`` are extra variants (handwritten samples, other
+    stroke widths or renders) stored as rows named ``<char>/<variant>``.
+    """
+    template_path = Path(templates_dir)
+    template_files = {f.stem: f for f in sorted(template_path.glob("*.png"))}
+    variant_labels = {}
+    for variant_file in sorted(template_path.glob("*/*.png")):
+        row_name = f"{variant_file.parent.name}/{variant_file.stem}"
+        template_files[row_name] = variant_file
+        variant_labels[row_name] = variant_file.parent.name
+    return template_files, variant_labels
+
+
+class TemplateChanges(NamedTuple):
+    """Template row names that appeared, changed or disappeared, each sorted.
+
+    Empty changes are falsy, so ``if changes:`` means something needs reloading.
+    """
+
+    added: list
+    changed: list
+    removed: list
+
+    def __bool__(self):
+        return bool(self.added or self.changed or self.removed)
+
+    def affected(self):
+        """Rows whose image must be read and embedded again"""
+        return self.added + self.changed
+
+
+def stat_snapshot(template_files):
+    """``{name: (mtime_ns, size)}`` for ``{name: path}``, skipping vanished files"""
+    snapshot = {}
+    for name, path in template_files.items():
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        snapshot[name] = (stat.st_mtime_ns, stat.st_size)
+    return snapshot
+
+
+def diff_snapshots(old, new):
+    """``TemplateChanges`` that turn snapshot ``old`` into ``new``"""
+    return TemplateChanges(
+        added=sorted(new.keys() - old.keys()),
+        changed=sorted(
+            name for name in new.keys() & old.keys() if new[name] != old[name]
+        ),
+        removed=sorted(old.keys() - new.keys()),
+    )
+
+
+class TemplateWatcher:
+    """Call ``check()`` every ``interval`` seconds on a daemon thread.
+
+    An exception from ``check`` (say, a PNG read while it was still being
+    written) is reported and the check simply runs again on the next tick.
+    """
+
+    def __init__(self, check, interval=2.0):
+        if interval <= 0:
+            raise ValueError(f"interval must be positive, got {interval}")
+        self.check = check
+        self.interval = interval
+        self.errors = 0
+        self.last_error = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="template-watcher", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                self.errors += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+                logger.exception("Template reload failed")
+
+    @property
+    def running(self):
+        return self._thread.is_alive()
+
+    def close(self, timeout=None):
+        """Stop polling; a check that is already running is allowed to finish"""
+        self._stop.set()
+        if threading.current_thread() is not self._thread:
+            self._thread.join(timeout)
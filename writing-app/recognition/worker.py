@@ -0,0 +1,130 @@
+"""Background inference service shared by every Streamlit session.
+
+The UI submits recognition jobs here instead of running the embedder inside the
+script run. Jobs go to a small thread pool behind a bounded queue, so a burst of
+sessions cannot pile up unbounded work. Each session passes its previous ticket
+back in: resubmitting the same input returns that ticket unless it failed
+(repeated clicks coalesce into one job), and submitting a different input
+cancels it if it has not started yet.
+"""
+
+from collections import Counter
+import concurrent.futures
+import hashlib
+import threading
+
+import numpy as np
+
+
+class QueueFull(RuntimeError):
+    """Raised when the service already holds ``max_pending`` unfinished jobs"""
+
+
+def input_key(*parts):
+    """Digest of a job's inputs, used to recognize repeated submissions.
+
+    Arrays are hashed by shape, dtype and contents; anything else by ``repr``.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        if isinstance(part, np.ndarray):
+            digest.update(f"{part.shape}{part.dtype}".encode())
+            digest.update(np.ascontiguousarray(part).data)
+        else:
+            digest.update(repr(part).encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class Ticket:
+    """Handle to one submitted job"""
+
+    def __init__(self, key, future):
+        self.key = key
+        self.future = future
+
+    def done(self):
+        return self.future.done()
+
+    def cancelled(self):
+        return self.future.cancelled()
+
+    def reusable(self):
+        """True while pending, or once finished without an error"""
+        if not self.future.done():
+            return True
+        return not self.future.cancelled() and self.future.exception() is None
+
+    def cancel(self):
+        """Drop the job if it has not started. Returns True if it was dropped."""
+        return self.future.cancel()
+
+    def wait(self, timeout=None):
+        """Block for up to ``timeout`` seconds; True once the job has finished"""
+        done, _ = concurrent.futures.wait([self.future], timeout=timeout)
+        return bool(done)
+
+    def result(self, timeout=None):
+        return self.future.result(timeout=timeout)
+
+
+class InferenceService:
+    """Thread pool with a bounded queue, request coalescing and cancellation.
+
+    ``workers`` threads run jobs; at most ``max_pending`` jobs may be queued or
+    running at once. ``stats`` counts submitted, coalesced, cancelled, rejected
+    and finished jobs.
+    """
+
+    def __init__(self, workers=2, max_pending=32):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.stats = Counter()
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            workers, thread_name_prefix="recognizer"
+        )
+        # Reentrant: cancelling a queued job runs _finished() in the same thread
+        self._lock = threading.RLock()
+        self._pending = 0
+
+    @property
+    def pending(self):
+        """Jobs queued or running"""
+        return self._pending
+
+    def submit(self, key, fn, *args, previous=None, **kwargs):
+        """Run ``fn(*args, **kwargs)`` in the pool and return its ``Ticket``.
+
+        ``key`` identifies the input (see ``input_key``). If ``previous`` has
+        the same key and is still pending or succeeded it is returned as is; a
+        cancelled or failed one is run again, so a transient error is not
+        replayed on every resubmission. Otherwise ``previous`` is cancelled when
+        still queued; a running job cannot be interrupted, but its caller simply
+        stops waiting for it.
+        Raises ``QueueFull`` when the pool already has ``max_pending`` jobs.
+        """
+        with self._lock:
+            if previous is not None:
+                if previous.key == key and previous.reusable():
+                    self.stats["coalesced"] += 1
+                    return previous
+                if previous.cancel():
+                    self.stats["cancelled"] += 1
+            if self._pending >= self.max_pending:
+                self.stats["rejected"] += 1
+                raise QueueFull("The recognizer is busy, please try again in a moment")
+            self._pending += 1
+            self.stats["submitted"] += 1
+            future = self._executor.submit(fn, *args, **kwargs)
+        # Outside the lock: the callback runs immediately if the job already ended
+        future.add_done_callback(self._finished)
+        return Ticket(key, future)
+
+    def _finished(self, future):
+        with self._lock:
+            self._pending -= 1
+            if not future.cancelled():
+                self.stats["finished"] += 1
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
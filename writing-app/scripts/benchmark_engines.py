@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""Compare the recognition engines on an augmented set built from the templates.
+
+Run from the writing-app directory:
+
+    python scripts/benchmark_engines.py --per-template 5 --output benchmark.json
+
+Benchmarks the four experiments (cv2_matchshape, cv2_matchtemplate, cv2_orb,
+mp_efficientnet), the production MobileNet recognizer and the cascade built on
+it (``recognition.cascade``, full and re-rank modes) on the same labeled
+samples: every template rotated, scaled, shifted, thinned or thickened and made
+noisy with a fixed seed. Every engine is driven through ``recognize_topk``
+(see ``recognition.engine``) and runs in its own process so its peak RSS is
+measured in isolation. Reports top-1/top-k accuracy, p50/p95 latency,
+throughput, load time and peak RSS, and writes them to a JSON report; cascades
+also report each stage's exits, accuracy and mean time. Engines whose model
+file is missing are reported as skipped.
+"""
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+import importlib.util
+import multiprocessing
+from pathlib import Path
+import sys
+import time
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Allow running as a script from the writing-app directory
+sys.path.insert(0, str(ROOT))
+
+from recognition.benchmark import (  # noqa: E402
+    build_dataset,
+    environment,
+    evaluate,
+    peak_rss_mb,
+    write_report,
+)
+from recognition.cascade import CascadeRecognizer, evaluate_cascade  # noqa: E402
+
+
+def load_experiment(filename):
+    """Import one of the ``experiments/*.app.py`` files as a module"""
+    path = ROOT / "experiments" / filename
+    spec = importlib.util.spec_from_file_location(path.stem.replace(".", "_"), path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def require_model(path):
+    if not Path(path).exists():
+        raise FileNotFoundError(f"model file not found: {path}")
+
+
+def match_template(templates_dir, models_dir):
+    module = load_experiment("cv2_matchtemplate.app.py")
+    return module.SitelenPonaRecognizer(templates_dir)
+
+
+def orb(templates_dir, models_dir):
+    module = load_experiment("cv2_orb.app.py")
+    return module.ORBSitelenPonaRecognizer(templates_dir)
+
+
+def match_shape(templates_dir, models_dir):
+    module = load_experiment("cv2_matchshape.app.py")
+    return module.SitelenPonaTeacher(templates_dir)
+
+
+def efficientnet(templates_dir, models_dir):
+    model_path = Path(models_dir) / "efficientnet_lite0_fp32.tflite"
+    require_model(model_path)
+    module = load_experiment("mp_efficientnet.app.py")
+    engine = module.SitelenPonaRecognizer(model_path=str(model_path))
+    # The constructor looks for templates relative to experiments/
+    engine.load_templates(templates_dir)
+    return engine
+
+
+def mobilenet(templates_dir, models_dir):
+    import app
+    from recognition.result_cache import ResultCache
+
+    model_path = Path(models_dir) / "mobilenet_v3_small.tflite"
+    require_model(model_path)
+    recognizer = app.MobileNetSitelenPonaRecognizer(
+        templates_dir=templates_dir, model_path=str(model_path), cache_dir=None
+    )
+    # Every sample must be embedded, not answered from the result cache
+    recognizer.result_cache = ResultCache(max_entries=0)
+    recognizer.warm_up()
+    return recognizer
+
+
+def cascade(templates_dir, models_dir, mode="full"):
+    from recognition.cascade import CascadeRecognizer, shape_index_from_templates
+
+    recognizer = mobilenet(templates_dir, models_dir)
+    shape_index = shape_index_from_templates(
+        {name: images["original"] for name, images in recognizer.templates.items()}
+    )
+    return CascadeRecognizer(recognizer, shape_index, mode=mode)
+
+
+def cascade_rerank(templates_dir, models_dir):
+    return cascade(templates_dir, models_dir, mode="rerank")
+
+
+# Factories taking (templates_dir, models_dir) and returning a RecognitionEngine
+ENGINES = {
+    "cv2_matchshape": match_shape,
+    "cv2_matchtemplate": match_template,
+    "cv2_orb": orb,
+    "mp_efficientnet": efficientnet,
+    "mobilenet": mobilenet,
+    "cascade": cascade,
+    "cascade_rerank": cascade_rerank,
+}
+
+
+def run_engine(name, templates_dir, models_dir, per_template, seed, k):
+    """Build one engine and evaluate it; runs in a fresh process"""
+    dataset = build_dataset(templates_dir, per_template, seed)
+    rss_before = peak_rss_mb()
+    start = time.perf_counter()
+    try:
+        engine = ENGINES[name](templates_dir, models_dir)
+    except Exception as e:
+        return {"skipped": f"{type(e).__name__}: {e}"}
+    load_seconds = time.perf_counter() - start
+
+    result = evaluate(engine, dataset, k)
+    result["load_seconds"] = load_seconds
+    result["rss_before_load_mb"] = rss_before
+    result["peak_rss_mb"] = peak_rss_mb()
+    if isinstance(engine, CascadeRecognizer):
+        result["stages"] = evaluate_cascade(engine, dataset, k)
+    return result
+
+
+def print_table(engines, k):
+    columns = ["top1", f"top{k}", "p50 ms", "p95 ms", "per s", "RSS MB"]
+    print(f"{'engine':<18}" + "".join(f"{c:>9}" for c in columns))
+    for name, result in engines.items():
+        if "skipped" in result:
+            print(f"{name:<18} skipped: {result['skipped']}")
+            continue
+        values = [
+            f"{result['top1_accuracy']:.3f}",
+            f"{result[f'top{k}_accuracy']:.3f}",
+            f"{result['latency_ms_p50']:.2f}",
+            f"{result['latency_ms_p95']:.2f}",
+            f"{result['throughput_per_s']:.1f}",
+            f"{result['peak_rss_mb']:.0f}",
+        ]
+        print(f"{name:<18}" + "".join(f"{v:>9}" for v in values))
+        for stage, stats in result.get("stages", {}).items():
+            accuracy = stats["top1_accuracy"]
+            print(
+                f"  {stage:<16}{stats['exits']:>9}"
+                f"{'-' if accuracy is None else f'{accuracy:.3f}':>9}"
+                f"{stats['mean_ms']:>9.2f}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--engines", nargs="+", choices=sorted(ENGINES), default=list(ENGINES)
+    )
+    parser.add_argument("--templates-dir", default="templates")
+    parser.add_argument("--models-dir", default="models")
+    parser.add_argument("--per-template", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--output", default="benchmark-report.json")
+    parser.add_argument(
+        "--in-process",
+        action="store_true",
+        help="Run every engine in this process (peak RSS is then cumulative)",
+    )
+    args = parser.parse_args()
+
+    engine_args = (args.templates_dir, args.models_dir, args.per_template, args.seed)
+    results = {}
+    for name in args.engines:
+        print(f"Benchmarking {name}...", file=sys.stderr)
+        if args.in_process:
+            results[name] = run_engine(name, *engine_args, args.k)
+            continue
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(1, mp_context=context) as pool:
+            results[name] = pool.submit(run_engine, name, *engine_args, args.k).result()
+
+    dataset = build_dataset(args.templates_dir, args.per_template, args.seed)
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "dataset": {
+            "templates_dir": args.templates_dir,
+            "characters": len({label for label, _, _ in dataset}),
+            "per_template": args.per_template,
+            "samples": len(dataset),
+            "seed": args.seed,
+            "k": args.k,
+        },
+        "environment": environment(),
+        "engines": results,
+    }
+    write_report(args.output, report)
+    print_table(results, args.k)
+    print(f"Report written to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""Compare the approximate indexes against exact float32 search on a synthetic bank.
+
+Run from the writing-app directory:
+
+    python scripts/benchmark_index.py --size 100000 --probes 4 8 16
+
+The bank is made of unit vectors clustered around one centre per character,
+like many handwritten variants of each glyph, and the queries are noisy copies
+of bank rows. Reports build time, recall@k and per-query latency for IVF, and
+memory, recall@k and best-match agreement for int8 and float16 storage.
+
+Memory is reported three ways: the size of the stored arrays, the memory the
+index still holds in the process after building it and running the queries
+(NumPy allocations traced with ``tracemalloc``), and the pages of the float32
+vector file that became resident meanwhile. The quantized indexes re-rank
+against that memory-mapped file, the way the app runs them, so those pages are
+shared between processes. Mapped pages are read from ``/proc`` and shown as
+``n/a`` elsewhere.
+"""
+
+import argparse
+import gc
+from pathlib import Path
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+# Allow running as a script from the writing-app directory
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from recognition.index import (  # noqa: E402
+    PRECISIONS,
+    FlatIndex,
+    IVFIndex,
+    QuantizedIndex,
+    map_vectors,
+    recall_at_k,
+)
+from recognition.matching import normalize_rows  # noqa: E402
+
+
+def synthetic_bank(size, dim, characters, spread, rng):
+    centres = rng.standard_normal((characters, dim))
+    labels = rng.integers(0, characters, size)
+    noise = spread * rng.standard_normal((size, dim))
+    return normalize_rows(centres[labels] + noise).astype(np.float32)
+
+
+def averaged_recall(index, exact, queries, k):
+    """Time single queries, the way the app searches"""
+    result = {}
+    for query in queries:
+        for key, value in recall_at_k(index, exact, query, k).items():
+            if key == "top1_score_error":
+                result[key] = max(result.get(key, 0.0), value)
+            else:
+                result[key] = result.get(key, 0.0) + value / len(queries)
+    return result
+
+
+def mapped_bytes():
+    """File-backed resident bytes of this process, or None where ``/proc`` is
+    not available"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key == "RssFile":
+                    return int(value.split()[0]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def measure_memory(build, queries, k):
+    """Build an index and search ``queries`` once, returning the index, the
+    bytes of memory it still holds and how many pages of mapped files became
+    resident meanwhile"""
+    gc.collect()
+    mapped_before = mapped_bytes()
+    tracemalloc.start()
+    try:
+        index = build()
+        index.search(queries, k)
+        gc.collect()
+        held = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    mapped_after = mapped_bytes()
+    mapped = None
+    if mapped_before is not None and mapped_after is not None:
+        mapped = mapped_after - mapped_before
+    return index, held, mapped
+
+
+def format_mb(value):
+    return f"{value / 2**20:.1f}" if value is not None else "n/a"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--characters", type=int, default=120)
+    parser.add_argument("--spread", type=float, default=0.05)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--lists", type=int, default=None)
+    parser.add_argument("--probes", type=int, nargs="+", default=[4, 8, 16])
+    parser.add_argument("--precisions", nargs="*", default=list(PRECISIONS))
+    parser.add_argument(
+        "--rerank",
+        type=int,
+        default=4,
+        help="Re-rank this many times k candidates in float32 (0 to disable)",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    vectors = synthetic_bank(args.size, args.dim, args.characters, args.spread, rng)
+    rows = rng.choice(args.size, args.queries, replace=False)
+    queries = normalize_rows(
+        vectors[rows] + args.spread * rng.standard_normal((args.queries, args.dim))
+    ).astype(np.float32)
+
+    exact = FlatIndex(vectors)
+    start = time.perf_counter()
+    ivf = IVFIndex(vectors, n_lists=args.lists)
+    build_seconds = time.perf_counter() - start
+    print(
+        f"{args.size} vectors x {args.dim} dims, "
+        f"IVF with {ivf.n_lists} lists built in {build_seconds:.1f}s"
+    )
+
+    print(f"{'n_probe':>8} {'recall@' + str(args.k):>10} {'ivf ms':>8} {'exact ms':>9}")
+    for n_probe in args.probes:
+        ivf.n_probe = n_probe
+        result = averaged_recall(ivf, exact, queries, args.k)
+        print(
+            f"{n_probe:>8} {result['recall']:>10.3f} "
+            f"{result['index_ms_per_query']:>8.3f} {result['exact_ms_per_query']:>9.3f}"
+        )
+
+    if not args.precisions:
+        return
+    print()
+    print(
+        f"{'storage':>8} {'MB':>8} {'held MB':>8} {'mapped MB':>9} "
+        f"{'recall@' + str(args.k):>10} {'top-1 agree':>12} {'max err':>8} {'ms':>8}"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "vectors.npy"
+        map_vectors(vectors, path)
+        rows = [("float32", lambda: FlatIndex(np.load(path)))]
+        rows += [
+            (
+                precision,
+                lambda precision=precision: QuantizedIndex(
+                    np.load(path, mmap_mode="r"),
+                    precision=precision,
+                    rerank=args.rerank,
+                ),
+            )
+            for precision in args.precisions
+        ]
+        for storage, build in rows:
+            index, held, mapped = measure_memory(build, queries, args.k)
+            result = averaged_recall(index, exact, queries, args.k)
+            print(
+                f"{storage:>8} {index.nbytes / 2**20:>8.1f} {format_mb(held):>8} "
+                f"{format_mb(mapped):>9} {result['recall']:>10.3f} "
+                f"{result['top1_agreement']:>12.3f} "
+                f"{result['top1_score_error']:>8.4f} "
+                f"{result['index_ms_per_query']:>8.3f}"
+            )
+            del index
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Pack the template PNGs and the Learn tab glyph renders into single files.
+
+Run from the writing-app directory after changing templates or SVGs:
+
+    python scripts/build_atlas.py
+
+writes ``assets/templates.npy`` and ``.json`` (every template in one array)
+and ``assets/glyphs.png`` and ``.json`` (light and dark glyph renders on one
+atlas). The glyph atlas needs ``cairosvg`` and Cairo; without them only the
+template pack is built.
+"""
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+import sys
+
+# Allow running as a script from the writing-app directory
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from recognition.atlas import GlyphAtlas, TemplatePack  # noqa: E402
+from recognition.catalog import GlyphCatalog  # noqa: E402
+from recognition.template_build import rasterize  # noqa: E402
+from recognition.template_watch import find_template_files  # noqa: E402
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--templates-dir", default="templates")
+    parser.add_argument("--svg-dir", default="sitelen_pona_svgs")
+    parser.add_argument("--dark-svg-dir", default="sitelen_pona_svgs_dark")
+    parser.add_argument("--output-dir", default="assets")
+    parser.add_argument(
+        "--glyph-height",
+        type=int,
+        default=120,
+        help="Rendered glyph height in pixels (the Learn tab shows them at 60)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Render processes (default: all cores)",
+    )
+    return parser.parse_args(argv)
+
+
+def build_glyph_atlas(sources, height, workers=None):
+    render = partial(rasterize, height=height, background=None, mode="RGBA")
+    glyphs = {}
+    with ProcessPoolExecutor(workers) as executor:
+        for theme, paths in sources.items():
+            glyphs[theme] = dict(zip(paths, executor.map(render, paths.values())))
+    return GlyphAtlas.build(glyphs)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    output_dir = Path(args.output_dir)
+
+    template_files, _ = find_template_files(args.templates_dir)
+    pack = TemplatePack.build(template_files)
+    pack.save(output_dir / "templates")
+    print(
+        f"Packed {len(pack)} of {len(template_files)} templates into "
+        f"{output_dir / 'templates.npy'}"
+    )
+
+    try:
+        import cairosvg  # noqa: F401
+    except (ImportError, OSError) as e:
+        print(f"Skipping the glyph atlas, cairosvg is unavailable: {e}")
+        return 0
+    sources = GlyphCatalog.scan(args.svg_dir, args.dark_svg_dir).paths
+    atlas = build_glyph_atlas(sources, args.glyph_height, args.workers)
+    atlas.save(output_dir / "glyphs")
+    height, width = atlas.image.shape[:2]
+    print(
+        f"Packed {sum(len(paths) for paths in sources.values())} glyph renders "
+        f"into a {width}x{height} atlas at {output_dir / 'glyphs.png'}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
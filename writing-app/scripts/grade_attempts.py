@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Re-score an archive of stored writing attempts with the MobileNet recognizer.
+
+Run from the writing-app directory, e.g.:
+
+    python scripts/grade_attempts.py attempts.zip --output results.csv
+
+Attempts are expected to be grouped by character (``moku/attempt-1.png``); use
+``--label-from stem`` for flat archives named like ``moku_1.png``.
+"""
+
+import argparse
+from functools import partial
+from pathlib import Path
+import sys
+
+# Allow running as a script from the writing-app directory
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app import MobileNetSitelenPonaRecognizer, RecognizerConfig  # noqa: E402
+from recognition.grading import RESULT_WRITERS, grade  # noqa: E402
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("source", help="Directory, zip or tar archive of images")
+    parser.add_argument(
+        "-o", "--output", default="-", help="Output file (default: stdout)"
+    )
+    parser.add_argument(
+        "--format",
+        choices=sorted(RESULT_WRITERS),
+        help="Output format (default: from the output extension, else csv)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Worker processes (default: all cores, 0 grades in-process)",
+    )
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=0.7)
+    parser.add_argument(
+        "--label-from", choices=["parent", "stem", "none"], default="parent"
+    )
+    parser.add_argument("--templates-dir", default=RecognizerConfig.TEMPLATES_DIR)
+    parser.add_argument("--model-path", default=RecognizerConfig.MODEL_PATH)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    output_format = args.format or (
+        "jsonl" if args.output.endswith((".jsonl", ".json")) else "csv"
+    )
+    recognizer_factory = partial(
+        MobileNetSitelenPonaRecognizer,
+        templates_dir=args.templates_dir,
+        model_path=args.model_path,
+    )
+
+    stream = (
+        sys.stdout
+        if args.output == "-"
+        else open(args.output, "w", newline="", encoding="utf-8")
+    )
+    try:
+        stats = grade(
+            args.source,
+            RESULT_WRITERS[output_format](stream),
+            recognizer_factory,
+            workers=args.workers,
+            batch_size=args.batch_size,
+            top_k=args.top_k,
+            threshold=args.threshold,
+            label_from=args.label_from,
+        )
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+
+    print(
+        f"Graded {stats['images']} images in {stats['seconds']:.2f}s "
+        f"({stats['images_per_second']:.1f} images/s)",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
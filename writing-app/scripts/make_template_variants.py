@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""Generate stroke-width variants of the glyph templates.
+
+Run from the writing-app directory:
+
+    python scripts/make_template_variants.py
+
+For every ``templates/<char>.png`` this writes thinner and thicker copies to
+``templates/<char>/stroke<sign><n>.png``, e.g. ``stroke+2.png`` for strokes two
+pixels wider and ``stroke-1.png`` for one pixel thinner, which the recognizer
+loads as extra reference variants for that character. Handwritten samples can be
+dropped into the same per-character folders.
+"""
+
+import argparse
+from pathlib import Path
+import sys
+
+import cv2
+import numpy as np
+
+# Allow running as a script from the writing-app directory
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from recognition.augment import stroke_variant  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--templates-dir", default="templates")
+    parser.add_argument(
+        "--deltas",
+        type=int,
+        nargs="+",
+        default=[-1, 2],
+        help="Stroke width changes in pixels (negative thins)",
+    )
+    args = parser.parse_args()
+
+    templates_dir = Path(args.templates_dir)
+    for template_file in sorted(templates_dir.glob("*.png")):
+        image = cv2.imread(str(template_file), cv2.IMREAD_GRAYSCALE)
+        if image is None:
+            print(f"Failed to load template: {template_file}")
+            continue
+
+        variant_dir = templates_dir / template_file.stem
+        variant_dir.mkdir(exist_ok=True)
+        for delta in args.deltas:
+            variant = stroke_variant(image, delta)
+            # Skip variants that erased the glyph entirely
+            if np.all(variant == 255):
+                continue
+            sign = "+" if delta > 0 else "-"
+            output_path = variant_dir / f"stroke{sign}{abs(delta)}.png"
+            cv2.imwrite(str(output_path), variant)
+        print(f"Processed: {template_file.name} -> {variant_dir.name}/")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,70 +1,197 @@
+#!/usr/bin/env python3
+"""Download the Sitelen Pona glyph images from the Sona Pona wiki.
+
+Run from the writing-app directory:
+
+    python scripts/scraper.py --workers 8
+
+Images are fetched concurrently over one pooled session. A ``manifest.json``
+in the image directory keeps each image's ETag and Last-Modified, so a later
+run only revalidates them and downloads the ones that changed. Images that
+failed are missing from the manifest and are fetched again on the next run.
+"""
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import hashlib
+import json
 import os
 import re
 import shutil
 from urllib.parse import urljoin
+import uuid
 
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 BASE_URL = "https://sona.pona.la/wiki/sitelen_pona"
 IMAGE_DIR = "sitelen_glyphs"
+MANIFEST_FILE = "manifest.json"
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
 }
-
-
-def fetch_glyph_images():
+TIMEOUT = 30
+
+
+def make_session(pool_size=8, retries=3):
+    """Session whose connection pool fits ``pool_size`` concurrent requests and
+    that retries transient server errors with backoff"""
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    retry = Retry(
+        total=retries,
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("GET",),
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def find_image_urls(html, page_url):
+    """``{full image URL: file name}`` for every image on a page"""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    urls = {}
+    for img in soup.find_all("img"):
+        img_url = img.get("src")
+        if not img_url:
+            continue  # Skip if src is missing
+        # Ensure full URL and extract image filename
+        urls[urljoin(page_url, img_url)] = img_url.split("/")[-1]
+    return urls
+
+
+def read_manifest(image_dir):
+    try:
+        with open(os.path.join(image_dir, MANIFEST_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_manifest(image_dir, manifest):
+    """Replace the manifest in one step, so an interrupted run leaves a valid one"""
+    path = os.path.join(image_dir, MANIFEST_FILE)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(dict(sorted(manifest.items())), f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def fetch_image(session, url, path, entry=None, timeout=TIMEOUT):
+    """Download ``url`` to ``path`` unless the server says it is unchanged.
+
+    ``entry`` is the image's previous manifest entry; its validators are sent
+    as If-None-Match and If-Modified-Since when the file is still on disk.
+    Returns ``(status, entry)`` with status ``"downloaded"`` or
+    ``"unchanged"``; raises ``requests.RequestException`` on failure.
+    """
+    headers = {}
+    if entry and os.path.exists(path):
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    response = session.get(url, headers=headers, timeout=timeout)
+    if response.status_code == 304:
+        return "unchanged", entry
+    response.raise_for_status()
+
+    # Write next to the target and rename, so a crash never leaves half a file
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(response.content)
+    os.replace(tmp_path, path)
+    return "downloaded", {
+        "file": os.path.basename(path),
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "sha256": hashlib.sha256(response.content).hexdigest(),
+        "size": len(response.content),
+    }
+
+
+def download_all(session, urls, image_dir, workers=8, force=False, log=print):
+    """Fetch ``{url: file name}`` into ``image_dir`` on ``workers`` threads.
+
+    The manifest is rewritten after every image, so a run that fails or is
+    interrupted resumes where it stopped. ``force`` ignores the manifest and
+    downloads everything. Returns the number of images per outcome and the
+    errors of those that failed.
+    """
+    os.makedirs(image_dir, exist_ok=True)
+    manifest = {} if force else read_manifest(image_dir)
+    counts = {"downloaded": 0, "unchanged": 0, "failed": 0}
+    errors = {}
+
+    def fetch(url, name):
+        path = os.path.join(image_dir, name)
+        return fetch_image(session, url, path, manifest.get(url))
+
+    with ThreadPoolExecutor(workers) as executor:
+        futures = {
+            executor.submit(fetch, url, name): (url, name) for url, name in urls.items()
+        }
+        for future in as_completed(futures):
+            url, name = futures[future]
+            try:
+                status, entry = future.result()
+            except Exception as e:
+                status, entry = "failed", None
+                errors[url] = f"{type(e).__name__}: {e}"
+                log(f"Failed to download {name}: {e}")
+            else:
+                log(f"{status.capitalize()}: {name}")
+            # Results are collected on this thread only, so no lock is needed
+            counts[status] += 1
+            if entry is not None:
+                manifest[url] = entry
+            else:
+                manifest.pop(url, None)
+            write_manifest(image_dir, manifest)
+    return {**counts, "errors": errors}
+
+
+def fetch_glyph_images(
+    page_url=BASE_URL, image_dir=IMAGE_DIR, workers=8, force=False, session=None
+):
     """Fetches and downloads all Sitelen Pona glyph images from the wiki page."""
-    # Create directory if it doesn't exist
-    os.makedirs(IMAGE_DIR, exist_ok=True)
-
+    session = session or make_session(workers)
     # Fetch the webpage content with headers
-    response = requests.get(BASE_URL, headers=HEADERS)
+    response = session.get(page_url, timeout=TIMEOUT)
     if response.status_code != 200:
         print(f"Failed to retrieve page: {response.status_code}")
-        return
-
-    # Parse HTML content
-    soup = BeautifulSoup(response.text, "html.parser")
+        return None
 
-    # Find all images inside the wiki content
-    images = soup.find_all("img")
+    urls = find_image_urls(response.text, page_url)
+    print(f"Found {len(urls)} images. Downloading...")
+    stats = download_all(session, urls, image_dir, workers=workers, force=force)
+    print(
+        f"Downloaded {stats['downloaded']}, unchanged {stats['unchanged']}, "
+        f"failed {stats['failed']}"
+    )
+    return stats
 
-    print(f"Found {len(images)} images. Downloading...")
 
-    for img in images:
-        img_url = img.get("src")
-        if not img_url:
-            continue  # Skip if src is missing
-
-        # Ensure full URL
-        full_img_url = urljoin(BASE_URL, img_url)
-
-        # Extract image filename
-        img_name = img_url.split("/")[-1]
-        img_path = os.path.join(IMAGE_DIR, img_name)
-
-        # Download the image with headers
-        try:
-            img_data = requests.get(full_img_url, headers=HEADERS).content
-            with open(img_path, "wb") as f:
-                f.write(img_data)
-            print(f"Downloaded: {img_name}")
-        except Exception as e:
-            print(f"Failed to download {img_name}: {e}")
-
-
-def rename_glyph_files():
+def rename_glyph_files(image_dir=IMAGE_DIR):
     """Renames glyph files according to the specified pattern."""
     # Create renamed directory
-    renamed_dir = os.path.join(IMAGE_DIR, "renamed_svg")
+    renamed_dir = os.path.join(image_dir, "renamed_svg")
     os.makedirs(renamed_dir, exist_ok=True)
 
     # Pattern to match files like 'A_-_sitelen_pona_pu_%28monospaced%29.svg'
     pattern = r"^([A-Za-z]+)_-_sitelen_pona_pu_%28monospaced%29.svg$"
 
     # Iterate through files in the directory
-    for filename in os.listdir(IMAGE_DIR):
+    for filename in os.listdir(image_dir):
         if not filename.endswith(".svg"):
             continue
 
@@ -75,7 +202,7 @@ def rename_glyph_files():
             new_filename = f"{character}.svg"
 
             # Source and destination paths
-            src_path = os.path.join(IMAGE_DIR, filename)
+            src_path = os.path.join(image_dir, filename)
             dst_path = os.path.join(renamed_dir, new_filename)
 
             # Copy and rename the file
@@ -83,6 +210,23 @@ def rename_glyph_files():
             print(f"Renamed: {filename} -> {new_filename}")
 
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default=BASE_URL, help="Wiki page to scrape")
+    parser.add_argument("--image-dir", default=IMAGE_DIR)
+    parser.add_argument(
+        "--workers", type=int, default=8, help="Concurrent downloads (default: 8)"
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Download every image, ignoring the manifest",
+    )
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
-    fetch_glyph_images()
-    rename_glyph_files()
+    args = parse_args()
+    stats = fetch_glyph_images(args.url, args.image_dir, args.workers, args.force)
+    rename_glyph_files(args.image_dir)
+    raise SystemExit(1 if stats is None or stats["failed"] else 0)
@@ -1,66 +1,97 @@
-import io
+#!/usr/bin/env python3
+"""Rasterize the glyph SVGs into binary PNG templates, rebuilding only what changed.
+
+Run from the writing-app directory:
+
+    python scripts/svg_processor.py
+
+renders ``sitelen_pona_svgs/*.svg`` into ``templates/`` at 100x100. Several
+sizes, stroke widths and themes can be built in one pass, each into its own
+directory:
+
+    python scripts/svg_processor.py --spec 64 --spec 100:+1 --spec 100:0:dark \\
+        --output "build/templates-{size}-s{stroke}-{theme}"
+
+Each output directory gets a ``manifest.json`` keyed by the SVG contents and
+render parameters, so unchanged glyphs are skipped on the next run.
+"""
+
+import argparse
 from pathlib import Path
+import sys
+import time
+
+# Allow running as a script from the writing-app directory
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-import cairosvg  # For SVG conversion
-import cv2
-import numpy as np
-from PIL import Image
+from recognition.template_build import RenderSpec, build, render  # noqa: E402
 
 
 class SitelenPonaTemplateProcessor:
-    def __init__(self, input_dir, output_dir, size=(100, 100)):
+    def __init__(self, input_dir, output_dir, size=(100, 100), workers=None):
         self.input_dir = Path(input_dir)
         self.output_dir = Path(output_dir)
         self.size = size
+        self.workers = workers
         self.output_dir.mkdir(exist_ok=True)
 
     def process_svg(self, svg_path):
         """Convert SVG to PNG and preprocess for template matching"""
-        # Convert SVG to PNG in memory
-        png_data = cairosvg.svg2png(
-            url=str(svg_path),
-            output_width=self.size[0],
-            output_height=self.size[1],
-            background_color="white",
-        )
-
-        # Convert to numpy array
-        image = Image.open(io.BytesIO(png_data))
-        image_array = np.array(image)
-
-        # Convert to grayscale if needed
-        if len(image_array.shape) == 3:
-            image_array = cv2.cvtColor(image_array, cv2.COLOR_RGB2GRAY)
-
-        # Threshold to create binary image
-        _, binary = cv2.threshold(image_array, 127, 255, cv2.THRESH_BINARY)
-
-        return binary
+        return render(svg_path, RenderSpec(*self.size))
 
     def process_all(self):
-        """Process all SVG files in the input directory"""
-        for svg_file in self.input_dir.glob("*.svg"):
-            try:
-                # Process the SVG
-                processed = self.process_svg(svg_file)
-
-                # Save as PNG
-                output_path = self.output_dir / f"{svg_file.stem}.png"
-                cv2.imwrite(str(output_path), processed)
-
-                print(f"Processed: {svg_file.name} -> {output_path.name}")
-
-            except Exception as e:
-                print(f"Error processing {svg_file.name}: {e}")
+        """Process the SVG files in the input directory that changed since the
+        last run"""
+        stats = build(
+            self.input_dir,
+            str(self.output_dir),
+            [RenderSpec(*self.size)],
+            workers=self.workers,
+        )
+        for output, error in stats["errors"].items():
+            print(f"Error processing {output}: {error}")
+        return stats
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--input", default="sitelen_pona_svgs", help="SVG directory")
+    parser.add_argument(
+        "--output",
+        default="templates",
+        help="Output directory, formatted with {size}, {width}, {height}, "
+        "{stroke} and {theme} when several specs are given (default: templates)",
+    )
+    parser.add_argument(
+        "--spec",
+        action="append",
+        type=RenderSpec.parse,
+        help="WIDTH[xHEIGHT][:STROKE][:THEME], repeatable (default: 100)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Render processes (default: all cores, 0 renders in-process)",
+    )
+    return parser.parse_args(argv)
 
 
-def main():
-    # Example usage
-    processor = SitelenPonaTemplateProcessor(
-        input_dir="sitelen_pona_svgs", output_dir="templates", size=(100, 100)
+def main(argv=None):
+    args = parse_args(argv)
+    start = time.perf_counter()
+    stats = build(
+        args.input, args.output, args.spec or [RenderSpec()], workers=args.workers
+    )
+    for output, error in stats["errors"].items():
+        print(f"Error processing {output}: {error}", file=sys.stderr)
+    print(
+        f"Rendered {stats['rendered']}, skipped {stats['skipped']} unchanged, "
+        f"removed {stats['removed']}, failed {stats['failed']} "
+        f"in {time.perf_counter() - start:.1f}s"
     )
-    processor.process_all()
+    return 1 if stats["failed"] else 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,250 @@
+"""Headless HTTP inference service for the Sitelen Pona recognizer.
+
+Run from the writing-app directory (needs the ``server`` extra):
+
+    uvicorn server:app --host 0.0.0.0 --port 8000
+
+``POST /recognize`` takes one image upload and ``POST /recognize/batch`` several.
+Concurrent requests are micro-batched server-side into one embed-and-match pass
+on a small worker pool. ``GET /health`` reports liveness, ``GET /ready`` turns
+200 once the templates are embedded and the model is warmed up, and
+``GET /metrics`` reports batching and template reload statistics.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+import os
+from types import SimpleNamespace
+
+from fastapi import FastAPI, File, HTTPException, Query, UploadFile
+from fastapi.responses import JSONResponse
+
+from app import MobileNetSitelenPonaRecognizer, RecognizerConfig
+from recognition.batching import MicroBatcher
+from recognition.grading import decode_image
+
+
+class ServerConfig:
+    # Requests arriving within this window are embedded together
+    BATCH_WINDOW_MS = float(os.environ.get("SITELEN_BATCH_WINDOW_MS", "5"))
+    MAX_BATCH = int(os.environ.get("SITELEN_MAX_BATCH", "32"))
+    # Batches running at once, each on its own worker thread
+    WORKERS = RecognizerConfig.WORKERS
+    THRESHOLD = 0.7
+    MAX_K = 20
+
+
+class UnknownCharacter(KeyError):
+    """Raised for a ``character`` the template bank does not contain"""
+
+    def __str__(self):
+        return f"Unknown character {self.args[0]!r}"
+
+
+def load_recognizer():
+    """Build the recognizer with the app defaults and warm it up"""
+    recognizer = MobileNetSitelenPonaRecognizer()
+    recognizer.warm_up()
+    if RecognizerConfig.EMBED_WORKERS > 0:
+        recognizer.start_scheduler()
+    if RecognizerConfig.TEMPLATE_WATCH_INTERVAL > 0:
+        recognizer.start_watching()
+    return recognizer
+
+
+def recognize_items(recognizer, items):
+    """Embed and match ``(image, k, threshold, character)`` requests in one pass.
+
+    Returns one result dict per item with the best ``match`` (None below the
+    threshold), its ``score`` and the top ``candidates``. When a ``character``
+    is given, its own score and whether it passes are included, which is how the
+    app grades a practice attempt. An item that fails on its own, such as one
+    asking for a character a template reload just removed, gets its exception
+    in place of the result so the rest of the batch still succeeds.
+    """
+    bank = recognizer.bank
+    embeddings = recognizer.embed_batch([image for image, *_ in items])
+    ranked = bank.top_k_batch(embeddings, max(k for _, k, _, _ in items))
+
+    results = []
+    for (_, k, threshold, character), embedding, candidates in zip(
+        items, embeddings, ranked
+    ):
+        try:
+            results.append(
+                item_result(bank, embedding, candidates, k, threshold, character)
+            )
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+def item_result(bank, embedding, candidates, k, threshold, character):
+    """Result dict of one ``recognize_items`` request"""
+    best = candidates[0] if candidates else None
+    result = {
+        "match": best.name if best and best.score >= threshold else None,
+        "score": best.score if best else 0.0,
+        "candidates": [candidate._asdict() for candidate in candidates[:k]],
+    }
+    if character is not None:
+        if character not in bank:
+            raise UnknownCharacter(character)
+        character_score = bank.score_for(embedding, character)
+        result["character"] = character
+        result["character_score"] = character_score
+        result["passed"] = character_score >= threshold
+    return result
+
+
+def create_app(
+    recognizer_factory=load_recognizer,
+    workers=ServerConfig.WORKERS,
+    max_batch=ServerConfig.MAX_BATCH,
+    window_ms=ServerConfig.BATCH_WINDOW_MS,
+):
+    """Build the FastAPI application around a recognizer built by
+    ``recognizer_factory``, which runs in the background at startup"""
+    executor = ThreadPoolExecutor(workers, thread_name_prefix="inference")
+    state = SimpleNamespace(recognizer=None, error=None, loaded=None)
+    batcher = MicroBatcher(
+        lambda items: recognize_items(state.recognizer, items),
+        max_batch=max_batch,
+        window=window_ms / 1000,
+        executor=executor,
+        max_concurrent=workers,
+    )
+
+    async def load():
+        try:
+            state.recognizer = await asyncio.get_running_loop().run_in_executor(
+                executor, recognizer_factory
+            )
+        except Exception as e:
+            state.error = str(e)
+        finally:
+            state.loaded.set()
+
+    @asynccontextmanager
+    async def lifespan(api):
+        state.loaded = asyncio.Event()
+        loading = asyncio.create_task(load())
+        batcher.start()
+        yield
+        await batcher.stop()
+        await asyncio.gather(loading, return_exceptions=True)
+        executor.shutdown(wait=False, cancel_futures=True)
+        if state.recognizer is not None:
+            state.recognizer.stop_scheduler()
+            state.recognizer.stop_watching()
+
+    api = FastAPI(title="Sitelen Pona Recognizer", lifespan=lifespan)
+    api.state.batcher = batcher
+
+    def ready_recognizer():
+        if state.recognizer is None:
+            raise HTTPException(503, state.error or "Templates are still loading")
+        return state.recognizer
+
+    def check_character(recognizer, character):
+        if character is not None and character not in recognizer.bank:
+            raise HTTPException(404, str(UnknownCharacter(character)))
+
+    async def read_image(upload):
+        try:
+            return decode_image(await upload.read())
+        except ValueError as e:
+            raise HTTPException(400, f"{upload.filename}: {e}") from None
+
+    @api.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    @api.get("/ready")
+    async def ready(timeout: float = Query(0, ge=0, le=300)):
+        """Ready once templates are loaded; ``timeout`` waits up to that many
+        seconds for warm-up to finish instead of answering right away"""
+        if timeout and not state.loaded.is_set():
+            try:
+                await asyncio.wait_for(state.loaded.wait(), timeout)
+            except TimeoutError:
+                pass
+        if state.recognizer is not None:
+            bank = state.recognizer.bank
+            return {
+                "status": "ready",
+                "characters": len(bank),
+                "templates": len(bank.row_names),
+            }
+        if state.error is not None:
+            return JSONResponse({"status": "failed", "error": state.error}, 503)
+        return JSONResponse({"status": "loading"}, 503)
+
+    @api.get("/metrics")
+    async def metrics():
+        """Request batching, embedding scheduler and template reload statistics"""
+        recognizer = state.recognizer
+        scheduler = recognizer and recognizer.scheduler
+        templates = None
+        if recognizer is not None:
+            watcher = recognizer.watcher
+            templates = {
+                "reloads": recognizer.reload_count,
+                "last_reload": recognizer.last_reload,
+                "watching": watcher is not None and watcher.running,
+                "watch_errors": watcher.errors if watcher is not None else 0,
+            }
+        return {
+            "batcher": dict(batcher.stats),
+            "embedder": scheduler.metrics() if scheduler is not None else None,
+            "templates": templates,
+        }
+
+    @api.post("/recognize")
+    async def recognize(
+        image: UploadFile = File(...),
+        k: int = Query(5, ge=1, le=ServerConfig.MAX_K),
+        threshold: float = Query(ServerConfig.THRESHOLD),
+        character: str | None = None,
+    ):
+        check_character(ready_recognizer(), character)
+        decoded = await read_image(image)
+        try:
+            return await batcher.submit((decoded, k, threshold, character))
+        except UnknownCharacter as e:
+            # Removed by a template reload after check_character()
+            raise HTTPException(404, str(e)) from None
+
+    @api.post("/recognize/batch")
+    async def recognize_batch(
+        images: list[UploadFile] = File(...),
+        k: int = Query(5, ge=1, le=ServerConfig.MAX_K),
+        threshold: float = Query(ServerConfig.THRESHOLD),
+        character: str | None = None,
+    ):
+        check_character(ready_recognizer(), character)
+        decoded = [await read_image(upload) for upload in images]
+        results = await batcher.submit_many(
+            [(image, k, threshold, character) for image in decoded],
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, BaseException) and not isinstance(
+                result, UnknownCharacter
+            ):
+                raise result
+        # A character removed by a template reload mid-request fails its items
+        return {
+            "results": [
+                {"error": str(result)}
+                if isinstance(result, UnknownCharacter)
+                else result
+                for result in results
+            ]
+        }
+
+    return api
+
+
+app = create_app()
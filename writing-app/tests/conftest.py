@@ -2,11 +2,18 @@
 
 import os
 from pathlib import Path
+import shutil
+from types import SimpleNamespace
 from typing import Generator
+from unittest.mock import MagicMock
 
+import cv2
+import numpy as np
 import pytest
 from streamlit.testing.v1 import AppTest
 
+SMALL_TEMPLATE_NAMES = ["a", "ike", "moku", "pona", "toki"]
+
 
 @pytest.fixture(scope="session")
 def project_root() -> Path:
@@ -75,3 +82,32 @@ def mock_recognizer(monkeypatch: pytest.MonkeyPatch) -> None:
             return 0.75
 
     monkeypatch.setattr("app.MobileNetSitelenPonaRecognizer", MockRecognizer)
+
+
+def fake_embed(image: np.ndarray) -> SimpleNamespace:
+    """Embed an image as its L2-normalized 16x16 ink map."""
+    ink = 255 - cv2.resize(cv2.cvtColor(image, cv2.COLOR_RGB2GRAY), (16, 16))
+    vector = ink.astype(np.float32).ravel()
+    vector /= max(np.linalg.norm(vector), 1e-6)
+    return SimpleNamespace(embeddings=[SimpleNamespace(embedding=vector)])
+
+
+@pytest.fixture
+def fake_mediapipe(monkeypatch: pytest.MonkeyPatch) -> MagicMock:
+    """Replace MediaPipe in app with a deterministic embedder."""
+    fake_mp = MagicMock()
+    fake_mp.Image.side_effect = lambda image_format, data: data
+    embedder = fake_mp.tasks.vision.ImageEmbedder.create_from_options.return_value
+    embedder.embed.side_effect = fake_embed
+    monkeypatch.setattr("app.mp", fake_mp)
+    return fake_mp
+
+
+@pytest.fixture
+def small_templates_dir(tmp_path: Path, templates_dir: Path) -> Path:
+    """Copy a handful of real templates into a temporary directory."""
+    target = tmp_path / "templates"
+    target.mkdir()
+    for name in SMALL_TEMPLATE_NAMES:
+        shutil.copy(templates_dir / f"{name}.png", target / f"{name}.png")
+    return target
@@ -6,6 +6,7 @@ import sys
 import pytest
 from streamlit.testing.v1 import AppTest
 
+import app as app_module
 from app import InputMode, SessionKey
 
 
@@ -199,3 +200,53 @@ def test_debug_mode_features(app: AppTest):
     debug_toggle.set_value(True)
     app.session_state[SessionKey.DEBUG_MODE] = True  # Manually update session state
     assert app.session_state[SessionKey.DEBUG_MODE] is True
+
+
+def test_live_webcam_falls_back_to_pictures_without_webrtc(app: AppTest):
+    """Without streamlit-webrtc the live toggle explains how to enable it."""
+    app.sidebar.selectbox[0].set_value(InputMode.WEBCAM).run()
+    live_toggle = next(toggle for toggle in app.toggle if toggle.key == "live_webcam")
+    assert live_toggle.value is False
+
+    with patch.dict(sys.modules, {"streamlit_webrtc": None}):
+        live_toggle.set_value(True).run()
+    assert not app.exception
+    assert any("webcam" in info.value for info in app.info)
+
+
+# Runs main() of the imported app module, so its recognizer can be patched
+MAIN_SCRIPT = """
+import app
+
+app.main()
+"""
+
+
+def test_removed_template_resets_the_selected_character(
+    fake_mediapipe, small_templates_dir, monkeypatch
+):
+    """A reload that removes the selected template falls back to another one."""
+    recognizer = app_module.MobileNetSitelenPonaRecognizer(
+        templates_dir=str(small_templates_dir), cache_dir=None
+    )
+    monkeypatch.setattr(app_module, "create_recognizer", lambda: recognizer)
+    # The script runner installs the script as __main__, which spawned worker
+    # processes of later tests would run again
+    monkeypatch.setitem(sys.modules, "__main__", sys.modules["__main__"])
+    at = AppTest.from_string(MAIN_SCRIPT, default_timeout=10)
+    at.session_state["input_mode"] = InputMode.DRAW
+    at.session_state[SessionKey.SELECTED_CHAR] = "moku"
+    at.run()
+    assert not at.exception
+    assert at.selectbox[0].value == "moku"
+
+    (small_templates_dir / "moku.png").unlink()
+    assert recognizer.reload_templates().removed == ["moku"]
+    at.session_state[SessionKey.CHECK_TICKET] = MagicMock()
+    at.run()
+
+    assert not at.exception
+    selected = at.session_state[SessionKey.SELECTED_CHAR]
+    assert selected in recognizer.templates
+    assert at.selectbox[0].value == selected
+    assert SessionKey.CHECK_TICKET not in at.session_state
@@ -0,0 +1,97 @@
+"""Tests for the packed glyph atlas and template pack."""
+
+import os
+from pathlib import Path
+import shutil
+from unittest.mock import MagicMock
+
+import cv2
+import numpy as np
+import pytest
+
+import app
+from recognition.atlas import GlyphAtlas, TemplatePack, pack_grid
+from recognition.template_watch import find_template_files
+
+
+def stat(path):
+    info = os.stat(path)
+    return info.st_mtime_ns, info.st_size
+
+
+def test_pack_grid_places_every_image():
+    images = {
+        "a": np.full((4, 6), 1, np.uint8),
+        "b": np.full((5, 3), 2, np.uint8),
+        "c": np.full((2, 2), 3, np.uint8),
+    }
+    atlas, boxes = pack_grid(images, columns=2)
+    assert atlas.shape == (10, 12)
+    for key, (x, y, width, height) in boxes.items():
+        np.testing.assert_array_equal(atlas[y : y + height, x : x + width], images[key])
+
+
+def test_glyph_atlas_round_trip(tmp_path):
+    rng = np.random.default_rng(0)
+    glyphs = {
+        "light": {"a": rng.integers(0, 256, (12, 10, 4), dtype=np.uint8)},
+        "dark": {"a": rng.integers(0, 256, (12, 11, 4), dtype=np.uint8)},
+    }
+    GlyphAtlas.build(glyphs).save(tmp_path / "glyphs")
+    atlas = GlyphAtlas.load(tmp_path / "glyphs")
+    for theme, images in glyphs.items():
+        np.testing.assert_array_equal(atlas.glyph("a", theme), images["a"])
+    with pytest.raises(FileNotFoundError):
+        GlyphAtlas.load(tmp_path / "missing")
+
+
+def test_template_pack_only_serves_unchanged_files(small_templates_dir, tmp_path):
+    cv2.imwrite(str(small_templates_dir / "odd.png"), np.zeros((30, 30), np.uint8))
+    template_files, _ = find_template_files(small_templates_dir)
+    TemplatePack.build(template_files).save(tmp_path / "templates")
+    pack = TemplatePack.load(tmp_path / "templates")
+    assert len(pack) == 5  # the odd-sized template is read from its file
+
+    moku = small_templates_dir / "moku.png"
+    np.testing.assert_array_equal(
+        pack.get("moku", stat(moku)), cv2.imread(str(moku), cv2.IMREAD_GRAYSCALE)
+    )
+    assert pack.get("odd", stat(small_templates_dir / "odd.png")) is None
+    shutil.copy(small_templates_dir / "toki.png", moku)
+    assert pack.get("moku", stat(moku)) is None
+
+
+def test_recognizer_reads_templates_from_the_pack(
+    fake_mediapipe: MagicMock, small_templates_dir: Path, tmp_path: Path
+):
+    template_files, _ = find_template_files(small_templates_dir)
+    pack = TemplatePack.build(template_files)
+    # Blank out one packed image to tell it apart from its file
+    pack.images[pack.rows["moku"]["index"]] = 255
+    pack.save(tmp_path / "templates")
+
+    recognizer = app.MobileNetSitelenPonaRecognizer(
+        templates_dir=str(small_templates_dir),
+        cache_dir=None,
+        template_pack=str(tmp_path / "templates"),
+    )
+    assert (recognizer.templates["moku"]["original"] == 255).all()
+    np.testing.assert_array_equal(
+        recognizer.templates["toki"]["original"],
+        cv2.cvtColor(cv2.imread(str(template_files["toki"])), cv2.COLOR_BGR2RGB),
+    )
+
+    # Once the file changes, it is read from disk again
+    os.utime(template_files["moku"], ns=(0, stat(template_files["moku"])[0] + 1))
+    recognizer.reload_templates()
+    assert not (recognizer.templates["moku"]["original"] == 255).all()
+
+
+def test_missing_pack_reads_files(fake_mediapipe, small_templates_dir, tmp_path):
+    recognizer = app.MobileNetSitelenPonaRecognizer(
+        templates_dir=str(small_templates_dir),
+        cache_dir=None,
+        template_pack=str(tmp_path / "missing"),
+    )
+    assert recognizer.template_pack is None
+    assert len(recognizer.templates) == 5
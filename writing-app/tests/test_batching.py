@@ -0,0 +1,142 @@
+"""Tests for the asyncio micro-batcher."""
+
+import asyncio
+import time
+
+import pytest
+
+from recognition.batching import MicroBatcher
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_concurrent_items_share_a_batch():
+    """Items submitted together are grouped, up to max_batch per call."""
+    calls = []
+
+    def double(items):
+        calls.append(list(items))
+        return [item * 2 for item in items]
+
+    async def main():
+        batcher = MicroBatcher(double, max_batch=4, window=0.05)
+        results = await batcher.submit_many(range(10))
+        await batcher.stop()
+        return results
+
+    assert run(main()) == [item * 2 for item in range(10)]
+    assert [len(call) for call in calls] == [4, 4, 2]
+
+
+def test_lone_item_waits_at_most_the_window():
+    async def main():
+        batcher = MicroBatcher(lambda items: items, max_batch=100, window=0.01)
+        result = await asyncio.wait_for(batcher.submit("x"), timeout=1)
+        await batcher.stop()
+        return result, batcher.stats
+
+    result, stats = run(main())
+    assert result == "x"
+    assert stats == {"batches": 1, "items": 1}
+
+
+def test_batch_errors_reach_every_caller():
+    def fail(items):
+        raise RuntimeError("embedder crashed")
+
+    async def main():
+        batcher = MicroBatcher(fail, window=0.01)
+        results = await asyncio.gather(
+            batcher.submit(1), batcher.submit(2), return_exceptions=True
+        )
+        await batcher.stop()
+        return results
+
+    results = run(main())
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_run_batch_must_not_block_the_loop():
+    """Batches run on the executor, so the loop keeps serving other work."""
+
+    def slow(items):
+        time.sleep(0.2)
+        return items
+
+    async def main():
+        batcher = MicroBatcher(slow, window=0)
+        pending = asyncio.create_task(batcher.submit("slow"))
+        await asyncio.sleep(0.05)
+        assert not pending.done()
+        ticks = 0
+        while not pending.done():
+            ticks += 1
+            await asyncio.sleep(0.01)
+        await batcher.stop()
+        return ticks
+
+    assert run(main()) > 5
+
+
+@pytest.mark.parametrize("max_concurrent", [1, 3])
+def test_max_concurrent_batches(max_concurrent: int):
+    running = 0
+    peak = 0
+
+    def track(items):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        time.sleep(0.05)
+        running -= 1
+        return items
+
+    async def main():
+        batcher = MicroBatcher(
+            track, max_batch=1, window=0, max_concurrent=max_concurrent
+        )
+        await batcher.submit_many(range(6))
+        await batcher.stop()
+
+    run(main())
+    assert peak == max_concurrent
+
+
+def test_item_errors_reach_only_their_caller():
+    """An exception returned for one item fails that item, not its batch."""
+
+    def check(items):
+        return [ValueError(item) if item < 0 else item for item in items]
+
+    async def main():
+        batcher = MicroBatcher(check, window=0.05)
+        results = await batcher.submit_many([1, -2, 3], return_exceptions=True)
+        await batcher.stop()
+        return results, batcher.stats
+
+    results, stats = run(main())
+    assert results[0] == 1 and results[2] == 3
+    assert isinstance(results[1], ValueError)
+    assert stats == {"batches": 1, "items": 3}
+
+
+def test_late_item_joins_the_waiting_batch():
+    """The collector wakes for an item arriving before the deadline."""
+    calls = []
+
+    def record(items):
+        calls.append(list(items))
+        return items
+
+    async def main():
+        batcher = MicroBatcher(record, window=0.5)
+        first = asyncio.create_task(batcher.submit("first"))
+        await asyncio.sleep(0.05)
+        second = asyncio.create_task(batcher.submit("second"))
+        await asyncio.gather(first, second)
+        await batcher.stop()
+
+    run(main())
+    assert calls == [["first", "second"]]
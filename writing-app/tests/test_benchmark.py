@@ -0,0 +1,85 @@
+"""Tests for the benchmark dataset, augmentations and evaluation loop."""
+
+import numpy as np
+
+from recognition.augment import add_noise, rotate, stroke_variant
+from recognition.benchmark import build_dataset, evaluate
+from recognition.matching import Candidate
+
+
+def glyph():
+    image = np.full((100, 100), 255, dtype=np.uint8)
+    image[40:60, 20:80] = 0
+    return image
+
+
+def test_stroke_variant_changes_ink():
+    ink = np.count_nonzero(glyph() == 0)
+    assert np.count_nonzero(stroke_variant(glyph(), 2) == 0) > ink
+    assert np.count_nonzero(stroke_variant(glyph(), -2) == 0) < ink
+    assert np.array_equal(stroke_variant(glyph(), 0), glyph())
+
+
+def test_rotate_fills_with_white():
+    rotated = rotate(glyph(), 45)
+    assert rotated.shape == (100, 100)
+    assert rotated[0, 0] == 255
+    assert np.count_nonzero(rotated == 0) > 0
+
+
+def test_noise_is_clipped():
+    noisy = add_noise(glyph(), 50, np.random.default_rng(0))
+    assert noisy.dtype == np.uint8
+    assert not np.array_equal(noisy, glyph())
+
+
+def test_dataset_is_labeled_and_reproducible(small_templates_dir):
+    first = build_dataset(small_templates_dir, per_template=3, seed=7)
+    second = build_dataset(small_templates_dir, per_template=3, seed=7)
+    names = {path.stem for path in small_templates_dir.glob("*.png")}
+    assert len(first) == 3 * len(names)
+    assert {label for label, _, _ in first} == names
+    for (label_a, image_a, params_a), (label_b, image_b, params_b) in zip(
+        first, second
+    ):
+        assert label_a == label_b and params_a == params_b
+        assert np.array_equal(image_a, image_b)
+    assert first[0][1].shape == (100, 100, 3)
+
+
+def test_dataset_can_be_limited_to_characters(small_templates_dir):
+    dataset = build_dataset(small_templates_dir, 2, characters={"pona"})
+    assert [label for label, _, _ in dataset] == ["pona", "pona"]
+
+
+class LabelEngine:
+    """Answers from a lookup of the sample identity, right for some labels only."""
+
+    def __init__(self, answers):
+        self.answers = answers
+        self.calls = 0
+
+    def recognize_topk(self, image, k=5):
+        self.calls += 1
+        names = self.answers[int(image[0, 0, 0])][:k]
+        return [Candidate(name, 1.0, 0.0) for name in names]
+
+
+def test_evaluate_counts_top1_and_topk():
+    image = np.zeros((4, 4, 3), dtype=np.uint8)
+    dataset = []
+    for i, label in enumerate(["a", "b", "c", "d"]):
+        sample = image.copy()
+        sample[0, 0, 0] = i
+        dataset.append((label, sample, {}))
+    engine = LabelEngine(
+        {0: ["a", "b"], 1: ["a", "b"], 2: ["x", "y", "z"], 3: []},
+    )
+    result = evaluate(engine, dataset, k=2, warm_up=1)
+    assert result["samples"] == 4
+    assert result["top1_accuracy"] == 0.25
+    assert result["top2_accuracy"] == 0.5
+    assert result["latency_ms_p50"] <= result["latency_ms_p95"]
+    assert result["throughput_per_s"] > 0
+    # One untimed warm-up call plus one per sample
+    assert engine.calls == 5
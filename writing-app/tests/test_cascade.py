@@ -0,0 +1,121 @@
+"""Tests for the cascade recognizer."""
+
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import cv2
+import numpy as np
+import pytest
+
+import app
+from recognition.benchmark import build_dataset
+from recognition.cascade import (
+    CascadeRecognizer,
+    evaluate_cascade,
+    shape_index_from_templates,
+)
+
+
+@pytest.fixture
+def recognizer(
+    fake_mediapipe: MagicMock, small_templates_dir: Path
+) -> app.MobileNetSitelenPonaRecognizer:
+    return app.MobileNetSitelenPonaRecognizer(
+        templates_dir=str(small_templates_dir), cache_dir=None
+    )
+
+
+@pytest.fixture
+def shape_index(recognizer):
+    return shape_index_from_templates(
+        {name: images["original"] for name, images in recognizer.templates.items()}
+    )
+
+
+def template(templates_dir: Path, name: str) -> np.ndarray:
+    return cv2.imread(str(templates_dir / f"{name}.png"))
+
+
+def embed_calls(fake_mediapipe):
+    embedder = fake_mediapipe.tasks.vision.ImageEmbedder.create_from_options
+    return embedder.return_value.embed.call_count
+
+
+def test_blank_and_tiny_drawings_skip_the_embedder(
+    recognizer, shape_index, fake_mediapipe
+):
+    cascade = CascadeRecognizer(recognizer, shape_index)
+    calls = embed_calls(fake_mediapipe)
+    blank = np.full((300, 300, 4), 0, dtype=np.uint8)  # transparent canvas
+    assert cascade.run(blank).stage == "blank"
+    speck = np.full((300, 300, 3), 255, dtype=np.uint8)
+    speck[100:106, 100:106] = 0
+    assert cascade.run(speck).stage == "ink_box"
+    assert cascade.recognize(blank) == (None, 0)
+    assert embed_calls(fake_mediapipe) == calls
+
+
+def test_drawings_reach_the_embedder_with_a_shortlist(
+    recognizer, shape_index, small_templates_dir
+):
+    cascade = CascadeRecognizer(recognizer, shape_index, shortlist=3)
+    result = cascade.run(template(small_templates_dir, "moku"), k=2)
+    assert result.stage == "embed"
+    assert len(result.shortlist) == 3 and "moku" in result.shortlist
+    assert result.candidates[0].name == "moku"
+    assert set(result.timings) == {"blank", "ink_box", "shape", "embed"}
+
+
+def test_rerank_only_ranks_the_shortlist(recognizer, shape_index, small_templates_dir):
+    cascade = CascadeRecognizer(recognizer, shape_index, mode="rerank", shortlist=2)
+    result = cascade.run(template(small_templates_dir, "pona"), k=5)
+    assert {c.name for c in result.candidates} == set(result.shortlist)
+    assert len(result.candidates) == 2
+
+
+def test_confident_shape_match_answers_without_embedding(
+    recognizer, shape_index, small_templates_dir, fake_mediapipe
+):
+    cascade = CascadeRecognizer(
+        recognizer, shape_index, accept_distance=0.01, accept_margin=0.0
+    )
+    calls = embed_calls(fake_mediapipe)
+    result = cascade.run(template(small_templates_dir, "toki"))
+    assert result.stage == "shape"
+    assert result.candidates[0].name == "toki"
+    assert embed_calls(fake_mediapipe) == calls
+
+
+def test_score_all_scores_every_template_of_the_answering_stage(
+    recognizer, shape_index, small_templates_dir
+):
+    cascade = CascadeRecognizer(recognizer, shape_index)
+    moku = template(small_templates_dir, "moku")
+    scores = cascade.score_all(moku)
+    assert set(scores) == set(recognizer.bank.names)
+    assert max(scores, key=scores.get) == "moku"
+    assert cascade.recognize(moku, threshold=0.5)[0] == "moku"
+    assert cascade.score_all(np.full((100, 100, 3), 255, np.uint8)) == {}
+
+    rerank = CascadeRecognizer(recognizer, shape_index, mode="rerank", shortlist=2)
+    assert len(rerank.score_all(moku)) == 2
+
+
+def test_stage_report_and_evaluation(recognizer, shape_index, small_templates_dir):
+    cascade = CascadeRecognizer(recognizer, shape_index)
+    dataset = build_dataset(small_templates_dir, per_template=2, seed=3)
+    dataset.append(("blank", np.full((100, 100, 3), 255, np.uint8), {}))
+    report = evaluate_cascade(cascade, dataset)
+    assert report["blank"]["reached"] == len(dataset)
+    assert report["blank"]["exits"] == 1
+    assert report["embed"]["exits"] == len(dataset) - 1
+    assert 0 <= report["embed"]["top1_accuracy"] <= 1
+    assert 0 < report["shape"]["shortlist_recall"] <= 1
+    stats = cascade.stage_report()
+    assert stats["embed"]["calls"] == len(dataset) - 1
+    assert stats["embed"]["mean_ms"] > 0
+
+
+def test_unknown_mode_is_rejected(recognizer, shape_index):
+    with pytest.raises(ValueError):
+        CascadeRecognizer(recognizer, shape_index, mode="fastest")
@@ -0,0 +1,65 @@
+"""Tests for the cached glyph catalog."""
+
+import os
+import shutil
+
+import pytest
+
+from recognition.catalog import CatalogCache, GlyphCatalog
+
+
+@pytest.fixture
+def svg_dirs(tmp_path, sitelen_pona_svgs_dir, project_root):
+    light, dark = tmp_path / "light", tmp_path / "dark"
+    light.mkdir()
+    dark.mkdir()
+    for name in ["a", "moku", "toki"]:
+        shutil.copy(sitelen_pona_svgs_dir / f"{name}.svg", light)
+    for name in ["a", "moku"]:
+        shutil.copy(project_root / "sitelen_pona_svgs_dark" / f"{name}_dark.svg", dark)
+    return light, dark
+
+
+def bump_mtime(directory):
+    mtime = os.stat(directory).st_mtime_ns
+    os.utime(directory, ns=(mtime, mtime + 1_000_000))
+
+
+def test_scan_reads_names_paths_and_markup(svg_dirs):
+    light, dark = svg_dirs
+    catalog = GlyphCatalog.scan(light, dark)
+    assert catalog.names == ["a", "moku", "toki"]
+    assert "moku" in catalog and len(catalog) == 3
+    assert catalog.paths["dark"]["moku"] == dark / "moku_dark.svg"
+    assert catalog.svg("moku") == (light / "moku.svg").read_text()
+    assert catalog.svg("moku", "dark") == (dark / "moku_dark.svg").read_text()
+    # toki has no dark render
+    assert catalog.svg("toki", "dark") == catalog.svg("toki")
+
+
+def test_cache_rescans_only_after_a_directory_changes(svg_dirs):
+    light, dark = svg_dirs
+    cache = CatalogCache(light, dark)
+    first = cache.get()
+    assert cache.get() is first
+    assert cache.scans == 1
+
+    (light / "toki.svg").unlink()
+    bump_mtime(light)  # in case the filesystem's mtime is coarse
+    second = cache.get()
+    assert second is not first
+    assert second.names == ["a", "moku"]
+    assert cache.scans == 2
+
+    shutil.copy(light / "a.svg", dark / "toki_dark.svg")
+    bump_mtime(dark)
+    assert "toki" in cache.get().paths["dark"]
+    assert cache.scans == 3
+
+
+def test_missing_directories_give_an_empty_catalog(tmp_path):
+    cache = CatalogCache(tmp_path / "none", tmp_path / "none_dark")
+    assert len(cache.get()) == 0
+    (tmp_path / "none").mkdir()
+    assert cache.get().names == []
+    assert cache.scans == 2
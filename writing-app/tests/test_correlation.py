@@ -0,0 +1,57 @@
+"""Tests for batched FFT template correlation."""
+
+import cv2
+import numpy as np
+import pytest
+
+from recognition.correlation import TemplateStack
+
+
+@pytest.fixture
+def templates(templates_dir):
+    names = ["a", "ike", "moku", "pona", "toki"]
+    images = [
+        cv2.imread(str(templates_dir / f"{name}.png"), cv2.IMREAD_GRAYSCALE)
+        for name in names
+    ]
+    return names, images
+
+
+def reference(templates, image, shape):
+    patch = image
+    if shape != image.shape:
+        patch = cv2.resize(image, shape[::-1], interpolation=cv2.INTER_AREA)
+    return np.array(
+        [cv2.matchTemplate(t, patch, cv2.TM_CCOEFF_NORMED).max() for t in templates]
+    )
+
+
+@pytest.mark.parametrize("scale", [1.0, 0.9, 0.75])
+def test_scores_match_cv2_match_template(templates, scale):
+    names, images = templates
+    stack = TemplateStack(names, images, scales=(scale,))
+    image = cv2.GaussianBlur(images[3], (5, 5), 0)
+    expected = reference(images, image, stack.patch_shapes[0])
+    assert np.allclose(stack.correlate(image), expected, atol=1e-4)
+    assert names[int(np.argmax(stack.correlate(image)))] == "pona"
+
+
+def test_best_score_over_scales(templates):
+    names, images = templates
+    stack = TemplateStack(names, images, scales=(1.0, 0.8))
+    single = [TemplateStack(names, images, scales=(s,)) for s in (1.0, 0.8)]
+    image = images[1]
+    expected = np.maximum(*(s.correlate(image) for s in single))
+    assert np.allclose(stack.correlate(image), expected)
+
+
+def test_blank_input_scores_zero(templates):
+    names, images = templates
+    stack = TemplateStack(names, images, scales=(1.0, 0.8))
+    assert np.array_equal(stack.correlate(np.zeros((100, 100), np.uint8)), [0] * 5)
+
+
+def test_scales_must_shrink(templates):
+    names, images = templates
+    with pytest.raises(ValueError):
+        TemplateStack(names, images, scales=(1.2,))
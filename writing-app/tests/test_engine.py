@@ -0,0 +1,154 @@
+"""Tests for the headless engine interface and the experiment engines."""
+
+import importlib.util
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+from recognition.engine import Observer, ScoringEngine, rank_scores
+
+EXPERIMENTS_DIR = Path(__file__).resolve().parent.parent / "experiments"
+
+
+class FixedScores(ScoringEngine):
+    def __init__(self, scores, observers=()):
+        super().__init__(observers)
+        self.scores = scores
+
+    def score_all(self, image, scale=1.0):
+        return {name: score * scale for name, score in self.scores.items()}
+
+
+class Recorder(Observer):
+    def __init__(self):
+        self.events = []
+
+    def on_scores(self, scores):
+        self.events.append(("scores", scores))
+
+    def on_input(self, **payload):
+        self.events.append(("input", payload))
+
+
+def test_rank_scores_orders_and_computes_margins():
+    ranked = rank_scores({"a": 0.2, "b": 0.9, "c": 0.5}, k=2)
+    assert [c.name for c in ranked] == ["b", "c"]
+    assert ranked[0].margin == pytest.approx(0.4)
+    assert ranked[1].margin == pytest.approx(0.3)
+    assert rank_scores({}, k=3) == []
+
+
+def test_recognize_applies_threshold_and_options():
+    engine = FixedScores({"a": 0.2, "b": 0.6})
+    assert engine.recognize(None, threshold=0.5) == ("b", 0.6)
+    assert engine.recognize(None, threshold=0.7) == (None, 0.6)
+    assert engine.recognize(None, threshold=0.5, scale=0.5) == (None, 0.3)
+    assert FixedScores({}).recognize(None) == (None, 0)
+
+
+def test_observers_receive_events_they_handle():
+    recorder = Recorder()
+    engine = FixedScores({"a": 1.0}, observers=[recorder])
+    assert engine.observed
+    engine.recognize_topk(None)
+    engine.emit("unhandled", value=1)
+    assert recorder.events == [("scores", {"a": 1.0})]
+    assert not FixedScores({}).observed
+
+
+def load_experiment(filename):
+    path = EXPERIMENTS_DIR / filename
+    spec = importlib.util.spec_from_file_location(path.stem.replace(".", "_"), path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def no_streamlit(monkeypatch):
+    """Fail the test if anything renders with Streamlit"""
+    import streamlit as st
+
+    def render(*args, **kwargs):
+        raise AssertionError("Streamlit was called")
+
+    for name in ("write", "image", "error", "expander", "columns"):
+        monkeypatch.setattr(st, name, render)
+
+
+@pytest.fixture
+def drawing(templates_dir):
+    image = cv2.imread(str(templates_dir / "pona.png"))
+    return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+
+@pytest.mark.parametrize(
+    "filename, cls",
+    [
+        ("cv2_matchtemplate.app.py", "SitelenPonaRecognizer"),
+        ("cv2_orb.app.py", "ORBSitelenPonaRecognizer"),
+        ("cv2_matchshape.app.py", "SitelenPonaTeacher"),
+    ],
+)
+def test_experiment_engines_run_headless(
+    filename, cls, small_templates_dir, drawing, no_streamlit
+):
+    engine = getattr(load_experiment(filename), cls)(str(small_templates_dir))
+    candidates = engine.recognize_topk(drawing, k=3)
+    assert 0 < len(candidates) <= 3
+    assert all(isinstance(c.score, float) for c in candidates)
+    if filename != "cv2_orb.app.py":
+        # ORB keypoints are too unstable on these glyphs to expect a top hit
+        assert candidates[0].name == "pona"
+
+
+def test_matchshape_analysis_runs_headless(small_templates_dir, drawing, no_streamlit):
+    module = load_experiment("cv2_matchshape.app.py")
+    recorder = Recorder()
+    teacher = module.SitelenPonaTeacher(str(small_templates_dir), [recorder])
+    feedback = teacher.analyze_drawing(drawing, "pona")
+    assert set(feedback) == {"shape_similarity", "size_accuracy", "position_accuracy"}
+    assert feedback["shape_similarity"] > 0.8
+    assert recorder.events[0][0] == "input"
+
+
+def test_blank_drawing_is_not_recognized(small_templates_dir, no_streamlit):
+    module = load_experiment("cv2_matchtemplate.app.py")
+    engine = module.SitelenPonaRecognizer(str(small_templates_dir))
+    blank = np.full((300, 300, 3), 255, dtype=np.uint8)
+    assert engine.recognize(blank, threshold=0.5)[0] is None
+
+
+def test_orb_descriptor_bank_is_cached(small_templates_dir, tmp_path, no_streamlit):
+    module = load_experiment("cv2_orb.app.py")
+    first = module.ORBSitelenPonaRecognizer(
+        str(small_templates_dir), cache_dir=tmp_path
+    )
+    assert (tmp_path / "bank.npz").exists()
+    second = module.ORBSitelenPonaRecognizer(
+        str(small_templates_dir), cache_dir=tmp_path, matcher="bruteforce"
+    )
+    assert np.array_equal(first.bank.descriptors, second.bank.descriptors)
+    pona = second.processed_templates["pona"]
+    assert len(pona["keypoints"]) == len(pona["descriptors"])
+
+
+def test_fft_matching_agrees_with_direct(small_templates_dir, drawing, no_streamlit):
+    module = load_experiment("cv2_matchtemplate.app.py")
+    direct = module.SitelenPonaRecognizer(str(small_templates_dir), mode="direct")
+    fft = module.SitelenPonaRecognizer(str(small_templates_dir), mode="fft")
+    expected, actual = direct.score_all(drawing), fft.score_all(drawing)
+    assert expected.keys() == actual.keys()
+    for name in expected:
+        assert actual[name] == pytest.approx(expected[name], abs=1e-5)
+
+
+def test_matchshape_shortlist_limits_scored_templates(
+    small_templates_dir, drawing, no_streamlit
+):
+    module = load_experiment("cv2_matchshape.app.py")
+    teacher = module.SitelenPonaTeacher(str(small_templates_dir), shortlist=2)
+    scores = teacher.score_all(drawing)
+    assert len(scores) == 2 and "pona" in scores
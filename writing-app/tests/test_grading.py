@@ -0,0 +1,178 @@
+"""Tests for the offline grading pipeline."""
+
+import io
+import json
+from pathlib import Path
+import tarfile
+import zipfile
+
+import cv2
+import numpy as np
+import pytest
+
+from recognition.grading import (
+    CsvResultWriter,
+    JsonlResultWriter,
+    decode_image,
+    grade,
+    iter_images,
+    label_for,
+)
+from recognition.matching import EmbeddingBank
+
+
+class FakeRecognizer:
+    """Scores dark images as 'pimeja' and light images as 'walo'."""
+
+    def __init__(self):
+        self.bank = EmbeddingBank.from_dict(
+            {"pimeja": np.array([1.0, 0.0]), "walo": np.array([0.0, 1.0])}
+        )
+
+    def embed_batch(self, images):
+        brightness = np.array([image.mean() / 255 for image in images])
+        return np.stack([1 - brightness, brightness], axis=1).astype(np.float32)
+
+
+def encode_png(value: int) -> bytes:
+    """Encode a flat grayscale image as PNG bytes."""
+    ok, data = cv2.imencode(".png", np.full((20, 20), value, dtype=np.uint8))
+    assert ok
+    return data.tobytes()
+
+
+@pytest.fixture
+def attempts_dir(tmp_path: Path) -> Path:
+    """A directory of attempts grouped by expected character."""
+    root = tmp_path / "attempts"
+    for label, value in [("pimeja", 0), ("walo", 255)]:
+        (root / label).mkdir(parents=True)
+        for i in range(3):
+            (root / label / f"{i}.png").write_bytes(encode_png(value))
+    (root / "notes.txt").write_text("not an image")
+    return root
+
+
+def test_iter_images_directory(attempts_dir: Path):
+    """Only image files are yielded, with paths relative to the source."""
+    names = [name for name, _ in iter_images(attempts_dir)]
+    assert len(names) == 6
+    assert "pimeja/0.png" in names
+
+
+@pytest.mark.parametrize("kind", ["zip", "tar"])
+def test_iter_images_archives(tmp_path: Path, kind: str):
+    """Zip and tar archives are read without extracting them."""
+    data = encode_png(0)
+    archive_path = tmp_path / f"attempts.{kind}"
+    if kind == "zip":
+        with zipfile.ZipFile(archive_path, "w") as archive:
+            archive.writestr("moku/1.png", data)
+            archive.writestr("readme.md", "hi")
+    else:
+        with tarfile.open(archive_path, "w") as archive:
+            info = tarfile.TarInfo("moku/1.png")
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    assert list(iter_images(archive_path)) == [("moku/1.png", data)]
+
+
+def test_label_for():
+    """Expected characters come from the parent directory or the file stem."""
+    assert label_for("moku/attempt-1.png", "parent") == "moku"
+    assert label_for("moku_1.png", "stem") == "moku"
+    assert label_for("moku-1.png", "stem") == "moku"
+    assert label_for("moku_1.png", "parent") is None
+    assert label_for("moku/1.png", "none") is None
+
+
+def test_decode_image_scales_16_bit_images_to_8_bits():
+    """16-bit PNGs keep their brightness instead of wrapping around."""
+    ok, data = cv2.imencode(".png", np.full((20, 20, 3), 65535, dtype=np.uint16))
+    assert ok
+    image = decode_image(data.tobytes())
+    assert image.dtype == np.uint8
+    assert image.min() == 255
+
+
+def test_decode_image_rejects_other_depths():
+    """Images that are neither 8 nor 16 bits per channel are an error."""
+    ok, data = cv2.imencode(".tiff", np.full((20, 20), 0.5, dtype=np.float32))
+    assert ok
+    with pytest.raises(ValueError, match="depth"):
+        decode_image(data.tobytes())
+
+
+class ListWriter:
+    def __init__(self):
+        self.rows = []
+
+    def write(self, row):
+        self.rows.append(row)
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_grade_scores_every_attempt(attempts_dir: Path, workers: int):
+    """Every image is graded against its expected character."""
+    writer = ListWriter()
+    stats = grade(attempts_dir, writer, FakeRecognizer, workers=workers, batch_size=2)
+    assert stats["images"] == 6
+    assert len(writer.rows) == 6
+    for row in writer.rows:
+        assert row["match"] == row["expected"]
+        assert row["passed"] is True
+        assert row["expected_score"] == pytest.approx(1.0)
+
+
+def test_grade_reports_undecodable_images(tmp_path: Path):
+    """Broken files produce an error row instead of stopping the run."""
+    (tmp_path / "walo").mkdir()
+    (tmp_path / "walo" / "broken.png").write_bytes(b"not a png")
+    (tmp_path / "walo" / "ok.png").write_bytes(encode_png(255))
+    writer = ListWriter()
+    grade(tmp_path, writer, FakeRecognizer, workers=0)
+    rows = {row["path"]: row for row in writer.rows}
+    assert "error" in rows["walo/broken.png"]
+    assert rows["walo/ok.png"]["match"] == "walo"
+
+
+class PickyRecognizer(FakeRecognizer):
+    """Fails any batch that holds a mid-grey image."""
+
+    def embed_batch(self, images):
+        if any(image.mean() == 128 for image in images):
+            raise RuntimeError("embedder rejected the image")
+        return super().embed_batch(images)
+
+
+def test_grade_reports_images_the_embedder_rejects(tmp_path: Path):
+    """A failing image only fails its own row, not the rest of its chunk."""
+    (tmp_path / "walo").mkdir()
+    (tmp_path / "walo" / "grey.png").write_bytes(encode_png(128))
+    (tmp_path / "walo" / "ok.png").write_bytes(encode_png(255))
+    writer = ListWriter()
+    stats = grade(tmp_path, writer, PickyRecognizer, workers=0, batch_size=4)
+    assert stats["images"] == 2
+    rows = {row["path"]: row for row in writer.rows}
+    assert "embedder rejected" in rows["walo/grey.png"]["error"]
+    assert "match" not in rows["walo/grey.png"]
+    assert rows["walo/ok.png"]["match"] == "walo"
+
+
+def test_result_writers():
+    """CSV flattens the candidate list and JSONL keeps it structured."""
+    row = {
+        "path": "moku/1.png",
+        "expected": "moku",
+        "match": "moku",
+        "score": 0.9,
+        "margin": 0.1,
+        "candidates": [("moku", 0.9), ("pona", 0.8)],
+    }
+    csv_stream = io.StringIO()
+    CsvResultWriter(csv_stream).write(row)
+    assert "moku:0.9000;pona:0.8000" in csv_stream.getvalue()
+
+    jsonl_stream = io.StringIO()
+    JsonlResultWriter(jsonl_stream).write(row)
+    assert json.loads(jsonl_stream.getvalue())["candidates"][1] == ["pona", 0.8]
@@ -0,0 +1,210 @@
+"""Tests for the nearest-neighbour indexes."""
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from recognition.index import (
+    FlatIndex,
+    IVFIndex,
+    QuantizedIndex,
+    build_index,
+    dequantize,
+    load_index,
+    map_vectors,
+    matrix_fingerprint,
+    quantize,
+    recall_at_k,
+    save_index,
+)
+from recognition.matching import EmbeddingBank, normalize_rows
+
+
+@pytest.fixture
+def vectors() -> np.ndarray:
+    """2000 unit vectors drawn around 40 cluster centres."""
+    rng = np.random.default_rng(0)
+    centres = rng.standard_normal((40, 32))
+    points = centres[rng.integers(0, 40, 2000)] + 0.2 * rng.standard_normal((2000, 32))
+    return normalize_rows(points).astype(np.float32)
+
+
+def test_flat_search_is_exact(vectors: np.ndarray):
+    """The flat index returns the true best-first neighbours."""
+    scores, ids = FlatIndex(vectors).search(vectors[:3], k=5)
+    assert ids[:, 0].tolist() == [0, 1, 2]
+    np.testing.assert_allclose(scores[:, 0], 1.0, rtol=1e-5)
+    assert np.all(np.diff(scores, axis=1) <= 0)
+
+
+def test_flat_search_pads_small_indexes():
+    """Asking for more hits than vectors pads with -1 ids."""
+    scores, ids = FlatIndex(np.eye(2, dtype=np.float32)).search(np.eye(2)[0], k=4)
+    assert ids[0].tolist()[2:] == [-1, -1]
+    assert np.isneginf(scores[0, 2:]).all()
+
+
+def test_ivf_probing_every_list_is_exact(vectors: np.ndarray):
+    """Probing all lists degenerates to exact search."""
+    ivf = IVFIndex(vectors, n_lists=16, n_probe=16)
+    result = recall_at_k(ivf, FlatIndex(vectors), vectors[:50], k=10)
+    assert result["recall"] == 1.0
+
+
+def test_ivf_recall_on_clustered_data(vectors: np.ndarray):
+    """A few probes already find most true neighbours of clustered data."""
+    ivf = IVFIndex(vectors, n_probe=4)
+    assert ivf.n_lists == int(np.sqrt(len(vectors)))
+    result = recall_at_k(ivf, FlatIndex(vectors), vectors[::20], k=10)
+    assert result["recall"] > 0.8
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_ivf_trains_on_duplicated_vectors(seed: int):
+    """Clusters left empty by duplicated vectors are reseeded, not a crash."""
+    points = normalize_rows(np.eye(2, 8, dtype=np.float32))
+    vectors = np.repeat(points, 50, axis=0)
+    ivf = IVFIndex(vectors, n_lists=10, n_probe=10, seed=seed)
+    assert np.isfinite(ivf.centroids).all()
+    scores, ids = ivf.search(points, k=1)
+    np.testing.assert_allclose(scores[:, 0], 1.0, rtol=1e-6)
+    assert ids[0, 0] < 50 <= ids[1, 0]
+
+
+@pytest.mark.parametrize("precision", ["int8", "float16"])
+def test_quantize_round_trip(vectors: np.ndarray, precision: str):
+    """Reduced-precision codes decode close to the original vectors."""
+    codes, scales = quantize(vectors, precision)
+    assert codes.nbytes <= vectors.nbytes // 2
+    restored = dequantize(codes, scales)
+    assert np.abs(restored - vectors).max() < 0.01
+
+
+def test_quantize_int8_scales_each_vector():
+    """Every row uses the full int8 range, whatever its magnitude."""
+    codes, scales = quantize(np.array([[0.5, -0.25], [0.0, 0.0]], dtype=np.float32))
+    assert codes[0].tolist() == [127, -64]
+    assert codes[1].tolist() == [0, 0]
+    assert scales[0] == pytest.approx(0.5 / 127)
+
+
+def test_quantize_rejects_unknown_precision(vectors: np.ndarray):
+    with pytest.raises(ValueError):
+        quantize(vectors, "int4")
+
+
+@pytest.mark.parametrize("precision", ["int8", "float16"])
+def test_quantized_search_reranks_in_float32(vectors: np.ndarray, precision: str):
+    """With a re-rank the best matches and their scores equal exact search."""
+    index = QuantizedIndex(vectors, precision=precision, chunk_size=300)
+    result = recall_at_k(index, FlatIndex(vectors), vectors[::20], k=10)
+    assert result["recall"] > 0.99
+    assert result["top1_agreement"] == 1.0
+    assert result["top1_score_error"] < 1e-6
+
+
+def test_quantized_search_without_rerank_is_approximate(vectors: np.ndarray):
+    """Without the float32 vectors, scores come from the int8 codes alone."""
+    codes, scales = quantize(vectors)
+    index = QuantizedIndex(None, _quantized=(codes, scales))
+    result = recall_at_k(index, FlatIndex(vectors), vectors[::20], k=10)
+    assert result["recall"] > 0.9
+    assert 0 < result["top1_score_error"] < 0.02
+
+
+@pytest.mark.parametrize("kind", ["flat", "ivf", "quantized"])
+def test_save_and_load_round_trip(tmp_path: Path, vectors: np.ndarray, kind: str):
+    """A saved index answers queries exactly like the original."""
+    index = build_index(kind, vectors)
+    fingerprint = matrix_fingerprint(vectors)
+    path = tmp_path / f"index-{kind}.npz"
+    save_index(index, path, fingerprint)
+    # The temporary file was renamed into place
+    assert list(tmp_path.iterdir()) == [path]
+
+    loaded = load_index(path, kind, fingerprint, index.params(), vectors)
+    assert type(loaded) is type(index)
+    np.testing.assert_array_equal(
+        loaded.search(vectors[:5], 3)[1], index.search(vectors[:5], 3)[1]
+    )
+
+
+def test_load_rejects_stale_index(tmp_path: Path, vectors: np.ndarray):
+    """An index built for other vectors or parameters is not reused."""
+    path = tmp_path / "index-ivf.npz"
+    save_index(IVFIndex(vectors, n_probe=4), path, matrix_fingerprint(vectors))
+    assert load_index(path, "ivf", matrix_fingerprint(vectors[1:])) is None
+    assert load_index(path, "ivf", params={"n_probe": 8}) is None
+    assert load_index(path, "flat") is None
+    assert load_index(tmp_path / "missing.npz") is None
+
+
+def test_load_ignores_truncated_index(tmp_path: Path, vectors: np.ndarray):
+    """A partly written index file is treated as missing."""
+    path = tmp_path / "index-flat.npz"
+    save_index(FlatIndex(vectors), path, matrix_fingerprint(vectors))
+    data = path.read_bytes()
+    for size in (0, 10, len(data) // 2, len(data) - 10):
+        path.write_bytes(data[:size])
+        assert load_index(path, "flat") is None
+
+
+def test_unknown_index_kind_raises(vectors: np.ndarray):
+    with pytest.raises(ValueError):
+        build_index("hnsw", vectors)
+
+
+def test_bank_search_matches_exact_ranking(vectors: np.ndarray):
+    """A bank answering through a flat index ranks like exact scoring."""
+    embeddings = {f"row{i:04d}": vector for i, vector in enumerate(vectors[:300])}
+    labels = {name: f"char{i % 60}" for i, name in enumerate(sorted(embeddings))}
+    exact = EmbeddingBank.from_dict(embeddings, labels=labels)
+    indexed = EmbeddingBank.from_dict(embeddings, labels=labels)
+    indexed.attach_index(FlatIndex(indexed.search_vectors()))
+
+    queries = vectors[300:310]
+    for expected, found in zip(
+        exact.top_k_batch(queries, k=5), indexed.top_k_batch(queries, k=5)
+    ):
+        assert [c.name for c in found] == [c.name for c in expected]
+        assert [c.margin for c in found] == pytest.approx([c.margin for c in expected])
+
+
+def test_map_vectors_writes_once_and_maps(tmp_path: Path, vectors: np.ndarray):
+    path = tmp_path / "vectors.npy"
+    mapped = map_vectors(vectors, path)
+    assert isinstance(mapped, np.memmap)
+    np.testing.assert_array_equal(mapped, vectors)
+    mtime = path.stat().st_mtime_ns
+    assert map_vectors(vectors, path).shape == vectors.shape
+    assert path.stat().st_mtime_ns == mtime
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_bank_search_vectors_can_be_mapped(tmp_path: Path, vectors: np.ndarray):
+    """A quantized index over mapped bank rows keeps one float32 copy, on disk."""
+    embeddings = {f"row{i:04d}": vector for i, vector in enumerate(vectors[:300])}
+    labels = {name: f"char{i % 60}" for i, name in enumerate(sorted(embeddings))}
+    bank = EmbeddingBank.from_dict(embeddings, labels=labels)
+    expected = bank.top_k_batch(vectors[300:310], k=5)
+
+    mapped = map_vectors(bank.search_vectors(), tmp_path / "vectors.npy")
+    bank.map_search_vectors(mapped)
+    assert bank.matrix is mapped
+    bank.attach_index(QuantizedIndex(bank.search_vectors()))
+    assert np.shares_memory(bank.search_index.rerank_vectors, mapped)
+    for want, found in zip(expected, bank.top_k_batch(vectors[300:310], k=5)):
+        assert [c.name for c in found] == [c.name for c in want]
+
+    with pytest.raises(ValueError):
+        bank.map_search_vectors(mapped[:10])
+
+
+def test_mean_aggregation_cannot_be_indexed():
+    """Mean scores need every variant, so there is nothing to index."""
+    bank = EmbeddingBank.from_dict(
+        {"a": np.ones(2), "a/2": np.ones(2)}, labels={"a/2": "a"}, aggregation="mean"
+    )
+    with pytest.raises(ValueError):
+        bank.search_vectors()
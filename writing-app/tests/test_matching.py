@@ -0,0 +1,127 @@
+"""Tests for vectorized template matching."""
+
+import numpy as np
+import pytest
+
+from recognition.matching import EmbeddingBank, top_k_indices
+
+
+@pytest.fixture
+def bank() -> EmbeddingBank:
+    """A bank of four orthogonal unit embeddings."""
+    return EmbeddingBank.from_dict(
+        {name: row for name, row in zip(["a", "ike", "moku", "pona"], np.eye(4))}
+    )
+
+
+def test_top_k_indices_are_sorted_best_first():
+    """The top indices come back in descending score order."""
+    scores = np.array([0.1, 0.9, 0.5, 0.7, 0.3])
+    assert top_k_indices(scores, 3).tolist() == [1, 3, 2]
+
+
+def test_top_k_indices_clamps_k():
+    """Asking for more entries than exist returns all of them."""
+    scores = np.array([0.2, 0.8])
+    assert top_k_indices(scores, 10).tolist() == [1, 0]
+    assert top_k_indices(scores, 0).tolist() == []
+
+
+def test_bank_is_contiguous_float32(bank: EmbeddingBank):
+    """Embeddings are stacked into one contiguous float32 matrix."""
+    assert bank.matrix.dtype == np.float32
+    assert bank.matrix.flags["C_CONTIGUOUS"]
+    assert bank.names == ["a", "ike", "moku", "pona"]
+    np.testing.assert_array_equal(bank["moku"], [0, 0, 1, 0])
+
+
+def test_dict_values_are_views(bank: EmbeddingBank):
+    """The per-name dict shares memory with the matrix."""
+    embeddings = bank.as_dict()
+    assert np.shares_memory(embeddings["ike"], bank.matrix)
+
+
+def test_top_k_ranks_with_margins(bank: EmbeddingBank):
+    """Candidates are ranked and carry the gap to the next candidate."""
+    query = np.array([0.1, 0.2, 0.9, 0.5], dtype=np.float32)
+    candidates = bank.top_k(query, k=2)
+    assert [c.name for c in candidates] == ["moku", "pona"]
+    assert candidates[0].score == pytest.approx(0.9)
+    assert candidates[0].margin == pytest.approx(0.4)
+    assert candidates[1].margin == pytest.approx(0.3)
+
+
+def test_empty_bank():
+    """An empty bank scores nothing and returns no candidates."""
+    bank = EmbeddingBank.from_dict({})
+    assert len(bank) == 0
+    assert bank.top_k(np.zeros(0, dtype=np.float32)) == []
+
+
+def test_mismatched_names_raise():
+    """Names and rows must line up."""
+    with pytest.raises(ValueError):
+        EmbeddingBank(["a", "b"], np.zeros((3, 4)))
+
+
+def test_top_k_indices_per_row():
+    """A score matrix is ranked independently per row."""
+    scores = np.array([[0.1, 0.9, 0.5], [0.8, 0.2, 0.6]])
+    assert top_k_indices(scores, 2).tolist() == [[1, 2], [0, 2]]
+
+
+def test_top_k_batch_matches_single(bank: EmbeddingBank):
+    """Batch ranking gives the same candidates as ranking one at a time."""
+    rng = np.random.default_rng(0)
+    queries = rng.random((5, 4), dtype=np.float32)
+    batch = bank.top_k_batch(queries, k=3)
+    assert len(batch) == 5
+    for query, candidates in zip(queries, batch):
+        single = bank.top_k(query, k=3)
+        assert [c.name for c in candidates] == [c.name for c in single]
+        assert [c.score for c in candidates] == pytest.approx([c.score for c in single])
+
+
+@pytest.fixture
+def variant_bank_rows() -> tuple[dict[str, np.ndarray], dict[str, str]]:
+    """Two characters, one with two variants and one with a single variant."""
+    embeddings = {
+        "moku": np.array([1.0, 0.0, 0.0]),
+        "moku/thick": np.array([0.0, 1.0, 0.0]),
+        "pona": np.array([0.0, 0.0, 1.0]),
+    }
+    return embeddings, {"moku/thick": "moku"}
+
+
+def test_variants_are_grouped_per_character(variant_bank_rows):
+    """Variant rows are stored together and scored per character."""
+    embeddings, labels = variant_bank_rows
+    bank = EmbeddingBank.from_dict(embeddings, labels=labels)
+    assert bank.names == ["moku", "pona"]
+    assert bank.variant_count() == 3
+    assert bank.counts.tolist() == [2, 1]
+
+
+@pytest.mark.parametrize(
+    "aggregation, expected",
+    [
+        ("max", [0.8, 0.1]),
+        ("mean", [0.5, 0.1]),
+        ("centroid", [(0.2 + 0.8) / np.sqrt(2), 0.1]),
+    ],
+)
+def test_variant_aggregation(variant_bank_rows, aggregation, expected):
+    """Each aggregation combines variant scores the documented way."""
+    embeddings, labels = variant_bank_rows
+    bank = EmbeddingBank.from_dict(embeddings, labels=labels, aggregation=aggregation)
+    query = np.array([0.2, 0.8, 0.1], dtype=np.float32)
+    assert bank.scores(query) == pytest.approx(expected)
+    assert bank.score_for(query, "moku") == pytest.approx(expected[0])
+    assert bank.scores_batch(np.stack([query, query]))[1] == pytest.approx(expected)
+
+
+def test_unknown_aggregation_raises(variant_bank_rows):
+    """Only the supported aggregations are accepted."""
+    embeddings, labels = variant_bank_rows
+    with pytest.raises(ValueError):
+        EmbeddingBank.from_dict(embeddings, labels=labels, aggregation="median")
@@ -0,0 +1,92 @@
+"""Tests for the stacked ORB descriptor bank."""
+
+import cv2
+import numpy as np
+import pytest
+
+from recognition.orb_bank import (
+    DescriptorBank,
+    hamming_distances,
+    templates_fingerprint,
+)
+
+
+def random_descriptors(rng, n, width=32):
+    return rng.integers(0, 256, (n, width), dtype=np.uint8)
+
+
+def keypoints(n):
+    return [
+        cv2.KeyPoint(float(i), float(2 * i), 31.0, float(i), 0.5, 1) for i in range(n)
+    ]
+
+
+@pytest.fixture
+def features():
+    rng = np.random.default_rng(0)
+    return {name: (keypoints(20), random_descriptors(rng, 20)) for name in "abc"}
+
+
+@pytest.mark.parametrize("width", [32, 5])
+def test_hamming_distances_match_bit_counts(width):
+    rng = np.random.default_rng(1)
+    query, bank = random_descriptors(rng, 7, width), random_descriptors(rng, 11, width)
+    expected = np.unpackbits(query[:, None] ^ bank[None], axis=-1).sum(axis=-1)
+    assert np.array_equal(hamming_distances(query, bank, chunk_size=3), expected)
+
+
+def test_bank_groups_rows_by_glyph(features):
+    bank = DescriptorBank.from_features(features)
+    assert bank.names == ["a", "b", "c"] and len(bank) == 60
+    assert np.array_equal(bank.descriptors_for("b"), features["b"][1])
+    restored = bank.keypoints_for("c")
+    assert [kp.pt for kp in restored] == [kp.pt for kp in features["c"][0]]
+
+
+@pytest.mark.parametrize("matcher", ["hamming", "flann"])
+def test_votes_go_to_the_glyph_the_descriptors_came_from(features, matcher):
+    bank = DescriptorBank.from_features(features, matcher=matcher)
+    rng = np.random.default_rng(2)
+    query = features["b"][1][:10].copy()
+    # Flip a few bits so matches are near, not exact
+    query[:, 0] ^= rng.integers(0, 4, 10, dtype=np.uint8)
+    scores = bank.vote(query)
+    assert max(scores, key=scores.get) == "b"
+    assert scores["b"] >= 0.8
+
+
+def test_distant_descriptors_do_not_vote(features):
+    bank = DescriptorBank.from_features(features, max_distance=0)
+    query = ~features["a"][1][:5]
+    assert sum(bank.vote(query).values()) == 0
+
+
+def test_save_and_load_round_trip(tmp_path, features):
+    bank = DescriptorBank.from_features(features)
+    path = tmp_path / "bank.npz"
+    bank.save(path, "abc123")
+    assert list(tmp_path.iterdir()) == [path]
+    loaded = DescriptorBank.load(path, "abc123", matcher="flann")
+    assert loaded.names == bank.names and loaded.matcher == "flann"
+    assert np.array_equal(loaded.descriptors, bank.descriptors)
+    assert DescriptorBank.load(path, "other") is None
+    assert DescriptorBank.load(tmp_path / "missing.npz", "abc123") is None
+
+
+def test_truncated_bank_is_not_loaded(tmp_path, features):
+    path = tmp_path / "bank.npz"
+    DescriptorBank.from_features(features).save(path, "abc123")
+    data = path.read_bytes()
+    for size in (0, 10, len(data) // 2, len(data) - 10):
+        path.write_bytes(data[:size])
+        assert DescriptorBank.load(path, "abc123") is None
+
+
+def test_fingerprint_tracks_files_and_params(tmp_path):
+    path = tmp_path / "a.png"
+    path.write_bytes(b"one")
+    files = {"a": path}
+    first = templates_fingerprint(files, {"nfeatures": 100})
+    assert templates_fingerprint(files, {"nfeatures": 200}) != first
+    path.write_bytes(b"two")
+    assert templates_fingerprint(files, {"nfeatures": 100}) != first
@@ -0,0 +1,371 @@
+"""Tests for MobileNetSitelenPonaRecognizer with a stand-in embedder."""
+
+import logging
+import os
+from pathlib import Path
+import shutil
+import time
+from unittest.mock import MagicMock
+
+import cv2
+import numpy as np
+import pytest
+
+import app
+
+# The templates copied by the small_templates_dir fixture
+TEMPLATE_NAMES = ["a", "ike", "moku", "pona", "toki"]
+
+
+@pytest.fixture
+def recognizer(
+    fake_mediapipe: MagicMock, small_templates_dir: Path
+) -> app.MobileNetSitelenPonaRecognizer:
+    """A recognizer over the small template set, without a disk cache."""
+    return app.MobileNetSitelenPonaRecognizer(
+        templates_dir=str(small_templates_dir), cache_dir=None
+    )
+
+
+def load_template(templates_dir: Path, name: str) -> np.ndarray:
+    """Load a template as BGR, the way uploads arrive."""
+    return cv2.imread(str(templates_dir / f"{name}.png"))
+
+
+@pytest.mark.parametrize(
+    "shape", [(224, 224, 4), (300, 120, 4), (90, 300, 3), (50, 70), (400, 401)]
+)
+def test_preprocess_into_letterboxes_to_target_size(recognizer, shape):
+    """Any input becomes a 224x224 uint8 RGB canvas with a white background."""
+    image = np.zeros(shape, dtype=np.uint8)
+    processed = recognizer.preprocess_into(image)
+    assert processed.shape == (224, 224, 3)
+    assert processed.dtype == np.uint8
+    # Fully transparent canvas input is treated as blank paper
+    if len(shape) == 3 and shape[2] == 4:
+        assert processed.min() == 255
+
+
+def test_preprocess_into_writes_into_buffer(recognizer):
+    """A provided buffer is filled in place and returned."""
+    out = np.zeros((224, 224, 3), dtype=np.uint8)
+    image = np.full((100, 50, 3), 10, dtype=np.uint8)
+    assert recognizer.preprocess_into(image, out=out) is out
+    assert out[112, 112, 0] == 10
+    assert out[112, 0, 0] == 255
+
+
+def test_preprocess_into_swaps_bgr_channels(recognizer):
+    """BGR input comes out as RGB."""
+    image = np.zeros((10, 10, 3), dtype=np.uint8)
+    image[:, :, 0] = 200  # Blue in BGR
+    processed = recognizer.preprocess_into(image)
+    assert processed[112, 112].tolist() == [0, 0, 200]
+
+
+def test_debug_steps_only_collected_on_request(recognizer, small_templates_dir):
+    """get_embedding skips the intermediate copies unless debug is enabled."""
+    image = load_template(small_templates_dir, "moku")
+    _, debug_steps = recognizer.get_embedding(image, debug=False)
+    assert debug_steps == {}
+    _, debug_steps = recognizer.get_embedding(image)
+    assert list(debug_steps) == [
+        "original",
+        "rgb_converted",
+        "aspect_preserved",
+        "centered",
+    ]
+
+
+def test_preprocess_image_matches_fast_path(recognizer, small_templates_dir):
+    """The float compatibility wrapper is the fast path scaled to [0, 1]."""
+    image = load_template(small_templates_dir, "toki")
+    processed, _ = recognizer.preprocess_image(image)
+    np.testing.assert_array_equal(
+        (processed * 255).astype(np.uint8), recognizer.preprocess_into(image)
+    )
+
+
+def test_recognize_templates(recognizer, small_templates_dir):
+    """Each template is recognized as itself."""
+    for name in TEMPLATE_NAMES:
+        match, score = recognizer.recognize(load_template(small_templates_dir, name))
+        assert match == name
+        assert score == pytest.approx(1.0)
+
+
+def test_recognize_topk(recognizer, small_templates_dir):
+    """Top-k returns ranked candidates with the exact match first."""
+    candidates = recognizer.recognize_topk(
+        load_template(small_templates_dir, "pona"), k=3
+    )
+    assert len(candidates) == 3
+    assert candidates[0].name == "pona"
+    assert candidates[0].margin > 0
+    assert [c.score for c in candidates] == sorted(
+        (c.score for c in candidates), reverse=True
+    )
+
+
+def test_recognize_batch(recognizer, small_templates_dir):
+    """Batch recognition agrees with one-at-a-time recognition."""
+    images = [load_template(small_templates_dir, name) for name in TEMPLATE_NAMES]
+    results = recognizer.recognize_batch(images, k=2)
+    assert [candidates[0].name for candidates in results] == TEMPLATE_NAMES
+
+
+def test_template_variants_are_loaded(fake_mediapipe, small_templates_dir):
+    """Images in templates/<char>/ become extra variants of that character."""
+    variant_dir = small_templates_dir / "moku"
+    variant_dir.mkdir()
+    shutil.copy(small_templates_dir / "toki.png", variant_dir / "odd.png")
+
+    recognizer = app.MobileNetSitelenPonaRecognizer(
+        templates_dir=str(small_templates_dir), cache_dir=None
+    )
+    assert sorted(recognizer.templates) == TEMPLATE_NAMES
+    assert recognizer.bank.variant_count() == len(TEMPLATE_NAMES) + 1
+
+    # With max aggregation the toki-shaped variant also fully matches moku
+    toki = load_template(small_templates_dir, "toki")
+    embedding, _ = recognizer.get_embedding(toki, debug=False)
+    assert recognizer.score_char(embedding, "moku") == pytest.approx(1.0)
+
+
+def test_ivf_index_recognizes_templates(fake_mediapipe, small_templates_dir, tmp_path):
+    """An approximate index is built, cached and used for recognition."""
+    cache_dir = tmp_path / "cache"
+    recognizer = app.MobileNetSitelenPonaRecognizer(
+        templates_dir=str(small_templates_dir),
+        cache_dir=str(cache_dir),
+        index="ivf",
+        index_params={"n_lists": 2, "n_probe": 2},
+    )
+    assert recognizer.bank.search_index is not None
+    assert (cache_dir / "index-ivf.npz").exists()
+
+    match, _ = recognizer.recognize(load_template(small_templates_dir, "ike"))
+    assert match == "ike"
+
+
+def test_quantized_index_recognizes_templates(
+    fake_mediapipe, small_templates_dir, tmp_path
+):
+    """The int8 index gives the same answer and scores as exact search."""
+    recognizer = app.MobileNetSitelenPonaRecognizer(
+        templates_dir=str(small_templates_dir),
+        cache_dir=str(tmp_path / "cache"),
+        index="quantized",
+    )
+    assert recognizer.index_params["precision"] == "int8"
+    assert recognizer.bank.search_index.codes.dtype == np.int8
+
+    image = load_template(small_templates_dir, "ike")
+    embedding, _ = recognizer.get_embedding(image, debug=False)
+    exact = recognizer.bank.rank(recognizer.bank.scores(embedding), k=3)
+    found = recognizer.recognize_topk(image, k=3)
+    assert [c.name for c in found] == [c.name for c in exact]
+    assert [c.score for c in found] == pytest.approx([c.score for c in exact])
+
+    # The float32 rows are read from one mapped file, not held in memory twice
+    assert isinstance(recognizer.bank.matrix, np.memmap)
+    assert np.shares_memory(
+        recognizer.bank.search_index.rerank_vectors, recognizer.bank.matrix
+    )
+    mapped = list((tmp_path / "cache").glob("vectors-*.npy"))
+    assert mapped == [recognizer._mapped_vectors]
+
+    # A reload maps the new bank and removes the old bank's file
+    (small_templates_dir / "ike.png").unlink()
+    recognizer.reload_templates()
+    assert "ike" not in recognizer.bank
+    assert list((tmp_path / "cache").glob("vectors-*.npy")) == [
+        recognizer._mapped_vectors
+    ]
+    assert recognizer._mapped_vectors not in mapped
+
+
+def test_check_image_scores_selected_character(recognizer, small_templates_dir):
+    """The background check returns the same score as scoring in the script."""
+    image = load_template(small_templates_dir, "moku")
+    embedding, debug_steps, confidence = app.check_image(
+        recognizer, image, "moku", debug=True
+    )
+    assert "centered" in debug_steps
+    assert confidence == pytest.approx(recognizer.score_char(embedding, "moku"))
+    assert confidence > recognizer.score_char(embedding, "toki")
+
+
+def test_scheduler_embeds_like_the_shared_embedder(recognizer, small_templates_dir):
+    """Pinned embedders give the same results as the single locked one."""
+    images = [load_template(small_templates_dir, name) for name in TEMPLATE_NAMES]
+    expected = recognizer.embed_batch(images)
+
+    scheduler = recognizer.start_scheduler(workers=2, window_ms=1)
+    try:
+        np.testing.assert_allclose(recognizer.embed_batch(images), expected)
+        match, _ = recognizer.recognize(images[2])
+        assert match == TEMPLATE_NAMES[2]
+        assert scheduler.metrics()["requests"] == len(images) + 1
+    finally:
+        recognizer.stop_scheduler()
+    assert recognizer.scheduler is None
+    np.testing.assert_allclose(recognizer.embed_batch(images), expected)
+
+
+def test_repeated_recognition_skips_embedding(
+    recognizer, fake_mediapipe, small_templates_dir
+):
+    """The same drawing is embedded once; the threshold is part of the key."""
+    embedder = fake_mediapipe.tasks.vision.ImageEmbedder.create_from_options()
+    image = load_template(small_templates_dir, "pona")
+    calls = embedder.embed.call_count
+
+    first = recognizer.recognize(image)
+    assert recognizer.recognize(image.copy()) == first
+    assert embedder.embed.call_count == calls + 1
+    assert recognizer.result_cache.hits == 1
+
+    recognizer.recognize(image, threshold=0.9)
+    assert embedder.embed.call_count == calls + 2
+
+    embedding, score = recognizer.score_image(image, "pona")
+    assert recognizer.score_image(image, "pona")[1] == score
+    assert embedder.embed.call_count == calls + 3
+
+
+def test_changed_drawing_is_not_answered_from_the_cache(
+    recognizer, fake_mediapipe, small_templates_dir, monkeypatch
+):
+    """Cached results match exact pixels unless perceptual matching is chosen."""
+    embedder = fake_mediapipe.tasks.vision.ImageEmbedder.create_from_options()
+    image = load_template(small_templates_dir, "pona")
+    speck = image.copy()
+    speck[5, 5] = 200  # faint enough for the perceptual hash to ignore
+    calls = embedder.embed.call_count
+
+    recognizer.score_image(image, "pona")
+    recognizer.score_image(speck, "pona")
+    assert embedder.embed.call_count == calls + 2
+
+    monkeypatch.setattr(recognizer, "result_cache_match", "perceptual")
+    recognizer.score_image(image, "moku")
+    recognizer.score_image(speck, "moku")
+    assert embedder.embed.call_count == calls + 3
+
+
+def test_reloading_templates_invalidates_results(recognizer, small_templates_dir):
+    image = load_template(small_templates_dir, "toki")
+    recognizer.recognize(image)
+    version = recognizer.model_version
+
+    (small_templates_dir / "toki.png").unlink()
+    recognizer.templates = {}
+    recognizer.load_templates()
+    assert recognizer.model_version != version
+    assert len(recognizer.result_cache) == 0
+    assert recognizer.recognize(image)[0] != "toki"
+
+
+def embed_count(fake_mediapipe: MagicMock) -> int:
+    embedder = fake_mediapipe.tasks.vision.ImageEmbedder.create_from_options()
+    return embedder.embed.call_count
+
+
+def test_reload_without_changes_does_nothing(recognizer, fake_mediapipe):
+    bank = recognizer.bank
+    calls = embed_count(fake_mediapipe)
+    assert not recognizer.reload_templates()
+    assert recognizer.bank is bank
+    assert recognizer.reload_count == 0
+    assert embed_count(fake_mediapipe) == calls
+
+
+def test_reload_embeds_only_changed_templates(
+    recognizer, small_templates_dir, fake_mediapipe
+):
+    old_bank, version = recognizer.bank, recognizer.model_version
+    calls = embed_count(fake_mediapipe)
+
+    shutil.copy(small_templates_dir / "pona.png", small_templates_dir / "pona2.png")
+    (small_templates_dir / "ike.png").unlink()
+    toki = small_templates_dir / "toki.png"
+    shutil.copy(small_templates_dir / "moku.png", toki)
+    stat = toki.stat()
+    os.utime(toki, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    changes = recognizer.reload_templates()
+    assert changes == (["pona2"], ["toki"], ["ike"])
+    assert embed_count(fake_mediapipe) == calls + 2
+    assert recognizer.reload_count == 1
+    assert recognizer.last_reload["added"] == ["pona2"]
+    assert recognizer.model_version != version
+
+    assert sorted(recognizer.bank.names) == ["a", "moku", "pona", "pona2", "toki"]
+    assert "ike" not in recognizer.templates
+    np.testing.assert_array_equal(
+        recognizer.templates["toki"]["original"],
+        recognizer.templates["moku"]["original"],
+    )
+    np.testing.assert_allclose(
+        recognizer.embeddings["toki"], recognizer.embeddings["moku"]
+    )
+    # Requests that took the old bank keep a complete, unchanged one
+    assert "ike" in old_bank.names and "pona2" not in old_bank.names
+
+
+def test_reload_shows_a_new_canonical_template(
+    recognizer, small_templates_dir, fake_mediapipe
+):
+    variants = small_templates_dir / "jan"
+    variants.mkdir()
+    shutil.copy(small_templates_dir / "pona.png", variants / "drawn.png")
+    recognizer.reload_templates()
+    np.testing.assert_array_equal(
+        recognizer.templates["jan"]["original"],
+        recognizer.templates["pona"]["original"],
+    )
+
+    shutil.copy(small_templates_dir / "toki.png", small_templates_dir / "jan.png")
+    calls = embed_count(fake_mediapipe)
+    assert recognizer.reload_templates().added == ["jan"]
+    assert embed_count(fake_mediapipe) == calls + 1
+    np.testing.assert_array_equal(
+        recognizer.templates["jan"]["original"],
+        recognizer.templates["toki"]["original"],
+    )
+
+
+def test_unreadable_template_keeps_the_current_bank(recognizer, small_templates_dir):
+    bank = recognizer.bank
+    (small_templates_dir / "jan.png").write_bytes(b"half-written")
+    with pytest.raises(ValueError):
+        recognizer.reload_templates()
+    assert recognizer.bank is bank
+    assert recognizer.reload_count == 0
+
+    shutil.copy(small_templates_dir / "toki.png", small_templates_dir / "jan.png")
+    assert recognizer.reload_templates().added == ["jan"]
+    assert "jan" in recognizer.bank
+
+
+def test_watcher_reloads_templates(recognizer, small_templates_dir):
+    recognizer.start_watching(interval=0.01)
+    try:
+        shutil.copy(small_templates_dir / "a.png", small_templates_dir / "jan.png")
+        deadline = time.monotonic() + 5
+        while recognizer.reload_count == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        recognizer.stop_watching()
+    assert "jan" in recognizer.bank
+    assert recognizer.watcher is None
+
+
+def test_cache_write_failure_is_logged(recognizer, caplog):
+    """A read-only cache directory is reported to the log, not to stdout."""
+    cache = MagicMock()
+    cache.save.side_effect = PermissionError("read-only file system")
+    with caplog.at_level(logging.WARNING, logger="app"):
+        recognizer.save_embedding_cache(cache, {}, {})
+    assert "Could not write template embedding cache" in caplog.text
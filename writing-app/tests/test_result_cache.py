@@ -0,0 +1,86 @@
+"""Tests for the recognition result cache."""
+
+import cv2
+import numpy as np
+
+from recognition.result_cache import ResultCache, image_digest, perceptual_hash
+
+
+def drawing() -> np.ndarray:
+    image = np.full((224, 224, 3), 255, dtype=np.uint8)
+    cv2.circle(image, (112, 112), 60, (0, 0, 0), 8)
+    return image
+
+
+def test_hash_ignores_tiny_differences():
+    """A stray pixel or faint noise hashes the same; another shape does not."""
+    image = drawing()
+    speck = image.copy()
+    speck[10, 10] = 0
+    line = np.full((224, 224, 3), 255, dtype=np.uint8)
+    cv2.line(line, (20, 112), (204, 112), (0, 0, 0), 8)
+
+    assert perceptual_hash(image) == perceptual_hash(speck)
+    noise = np.random.default_rng(0).integers(-2, 3, image.shape)
+    noisy = np.clip(image + noise, 0, 255).astype(np.uint8)
+    assert perceptual_hash(image) == perceptual_hash(noisy)
+    assert perceptual_hash(image) != perceptual_hash(line)
+    assert len(perceptual_hash(image)) == 16 * 16 // 4
+
+
+def test_digest_tells_every_change_apart():
+    """A small deliberate mark gets its own key, unlike with the perceptual hash."""
+    image = drawing()
+    dotted = image.copy()
+    cv2.circle(dotted, (190, 40), 6, (0, 0, 0), -1)
+    speck = image.copy()
+    speck[10, 10] = 0
+
+    assert image_digest(image) == image_digest(image.copy())
+    assert image_digest(image) != image_digest(dotted)
+    assert image_digest(image) != image_digest(speck)
+    assert image_digest(image) != image_digest(image[:, :, 0])
+
+
+def test_hash_accepts_grayscale():
+    image = drawing()
+    gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+    assert perceptual_hash(gray) == perceptual_hash(image)
+
+
+def test_lru_eviction_and_counters():
+    cache = ResultCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "b" is now least recently used
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    assert cache.stats() == {"entries": 2, "hits": 2, "misses": 1, "hit_rate": 2 / 3}
+
+
+def test_entries_expire():
+    now = [0.0]
+    cache = ResultCache(ttl=10, clock=lambda: now[0])
+    cache.put("a", 1)
+    now[0] = 9.9
+    assert cache.get("a") == 1
+    now[0] = 10.0
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_get_or_compute_only_computes_on_miss():
+    cache = ResultCache()
+    calls = []
+    for _ in range(3):
+        assert (
+            cache.get_or_compute("key", lambda: calls.append(1) or "value") == "value"
+        )
+    assert len(calls) == 1
+
+
+def test_zero_size_disables_caching():
+    cache = ResultCache(max_entries=0)
+    cache.put("a", 1)
+    assert cache.get("a") is None
@@ -0,0 +1,120 @@
+"""Tests for the embedding micro-batching scheduler."""
+
+import threading
+import time
+
+import pytest
+
+from recognition.scheduler import EmbeddingScheduler
+
+
+class RecordingEmbedder:
+    """Stand-in embedder that remembers which thread built and used it."""
+
+    def __init__(self):
+        self.built_on = threading.get_ident()
+        self.used_on = set()
+
+
+def run(embedder: RecordingEmbedder, item):
+    embedder.used_on.add(threading.get_ident())
+    time.sleep(0.001)
+    return item * 10, embedder
+
+
+def test_results_come_back_in_order():
+    scheduler = EmbeddingScheduler(RecordingEmbedder, run, workers=3, window=0.001)
+    try:
+        results = scheduler.embed_many(range(50))
+    finally:
+        scheduler.close()
+    assert [value for value, _ in results] == [i * 10 for i in range(50)]
+
+
+def test_each_worker_uses_its_own_embedder():
+    scheduler = EmbeddingScheduler(RecordingEmbedder, run, workers=3, window=0.001)
+    try:
+        embedders = {id(e): e for _, e in scheduler.embed_many(range(60))}.values()
+    finally:
+        scheduler.close()
+    for embedder in embedders:
+        assert embedder.used_on == {embedder.built_on}
+
+
+def test_burst_is_batched_and_measured():
+    """Requests queued during a burst are taken in batches of up to max_batch."""
+    scheduler = EmbeddingScheduler(
+        RecordingEmbedder, run, workers=1, window=0.005, max_batch=8
+    )
+    try:
+        scheduler.embed_many(range(40))
+        metrics = scheduler.metrics()
+    finally:
+        scheduler.close()
+    assert metrics["requests"] == 40
+    assert metrics["batch_size_max"] == 8
+    assert metrics["batches"] < 40
+    assert metrics["peak_queue_depth"] > 1
+    assert metrics["queue_depth"] == 0
+    assert (
+        0 <= metrics["wait_ms_p50"] <= metrics["wait_ms_p95"] <= metrics["wait_ms_max"]
+    )
+
+
+def test_lone_request_waits_for_the_window_at_most():
+    scheduler = EmbeddingScheduler(RecordingEmbedder, run, workers=1, window=0.01)
+    try:
+        start = time.perf_counter()
+        assert scheduler.embed(1, timeout=1)[0] == 10
+        assert time.perf_counter() - start < 0.5
+    finally:
+        scheduler.close()
+
+
+def test_errors_reach_the_caller():
+    def fail(embedder, item):
+        raise ValueError(f"bad item {item}")
+
+    scheduler = EmbeddingScheduler(RecordingEmbedder, fail, workers=1)
+    try:
+        with pytest.raises(ValueError, match="bad item 3"):
+            scheduler.embed(3, timeout=1)
+    finally:
+        scheduler.close()
+
+
+def test_factory_errors_raise_on_start():
+    def broken_factory():
+        raise FileNotFoundError("model missing")
+
+    with pytest.raises(FileNotFoundError):
+        EmbeddingScheduler(broken_factory, run, workers=2)
+
+
+def test_closed_scheduler_rejects_requests():
+    scheduler = EmbeddingScheduler(RecordingEmbedder, run, workers=1)
+    pending = [scheduler.submit(i) for i in range(5)]
+    scheduler.close()
+    # Requests queued before closing still finish
+    assert [f.result(timeout=1)[0] for f in pending] == [0, 10, 20, 30, 40]
+    with pytest.raises(RuntimeError):
+        scheduler.submit(1)
+
+
+def test_request_racing_close_is_not_stranded():
+    """``close`` arriving while a request is being queued cannot put the stop
+    signals ahead of it."""
+    scheduler = EmbeddingScheduler(RecordingEmbedder, run, workers=1)
+    put = scheduler._queue.put
+    closer = threading.Thread(target=scheduler.close)
+
+    def put_after_close_started(request):
+        if isinstance(request, tuple) and request[0] == "racer":
+            closer.start()
+            time.sleep(0.05)  # let close() run as far as it can
+        put(request)
+
+    scheduler._queue.put = put_after_close_started
+    future = scheduler.submit("racer")
+    closer.join(5)
+    assert future.result(timeout=1)[0] == "racer" * 10
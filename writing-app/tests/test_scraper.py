@@ -0,0 +1,164 @@
+"""Tests for the glyph scraper against a local HTTP stand-in for the wiki."""
+
+from collections import Counter
+import hashlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import importlib.util
+import json
+from pathlib import Path
+import threading
+import time
+
+import pytest
+
+SCRIPT = Path(__file__).parent.parent / "scripts" / "scraper.py"
+
+
+def load_scraper():
+    spec = importlib.util.spec_from_file_location("scraper", SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+scraper = load_scraper()
+
+
+class Wiki:
+    """Images served with ETags, counting requests and concurrent downloads."""
+
+    def __init__(self):
+        self.images = {
+            f"/img/{name}.svg": f"<svg>{name}</svg>".encode() for name in "abcdef"
+        }
+        self.missing = set()
+        self.delay = 0.0
+        self.requests = Counter()
+        self.not_modified = Counter()
+        self.active = self.peak = 0
+        self.lock = threading.Lock()
+
+    def page(self):
+        tags = "".join(f'<img src="{path}">' for path in self.images)
+        return f"<html><body>{tags}<img></body></html>".encode()
+
+
+def make_handler(wiki):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            with wiki.lock:
+                wiki.requests[self.path] += 1
+                wiki.active += 1
+                wiki.peak = max(wiki.peak, wiki.active)
+            try:
+                time.sleep(wiki.delay)
+                self.respond()
+            finally:
+                with wiki.lock:
+                    wiki.active -= 1
+
+        def respond(self):
+            if self.path == "/wiki":
+                return self.send(200, wiki.page())
+            body = wiki.images.get(self.path)
+            if body is None or self.path in wiki.missing:
+                return self.send(404, b"")
+            etag = '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+            if self.headers.get("If-None-Match") == etag:
+                wiki.not_modified[self.path] += 1
+                return self.send(304, None, etag)
+            self.send(200, body, etag)
+
+        def send(self, status, body, etag=None):
+            self.send_response(status)
+            if etag:
+                self.send_header("ETag", etag)
+            self.send_header("Content-Length", str(len(body or b"")))
+            self.end_headers()
+            if body:
+                self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+@pytest.fixture
+def wiki():
+    wiki = Wiki()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(wiki))
+    thread = threading.Thread(
+        target=server.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True
+    )
+    thread.start()
+    wiki.url = f"http://127.0.0.1:{server.server_port}"
+    yield wiki
+    server.shutdown()
+    server.server_close()
+
+
+def image_urls(wiki):
+    return {wiki.url + path: Path(path).name for path in wiki.images}
+
+
+def download(wiki, image_dir, workers=4):
+    session = scraper.make_session(workers, retries=0)
+    return scraper.download_all(
+        session, image_urls(wiki), str(image_dir), workers=workers, log=lambda _: None
+    )
+
+
+def test_second_run_only_revalidates(wiki, tmp_path):
+    stats = download(wiki, tmp_path)
+    assert (stats["downloaded"], stats["failed"]) == (6, 0)
+    assert (tmp_path / "c.svg").read_bytes() == b"<svg>c</svg>"
+    manifest = json.loads((tmp_path / scraper.MANIFEST_FILE).read_text())
+    assert manifest[wiki.url + "/img/c.svg"]["etag"]
+
+    stats = download(wiki, tmp_path)
+    assert (stats["downloaded"], stats["unchanged"]) == (0, 6)
+    assert sum(wiki.not_modified.values()) == 6
+
+    # A changed image and a deleted local copy are downloaded again
+    wiki.images["/img/a.svg"] = b"<svg>new a</svg>"
+    (tmp_path / "b.svg").unlink()
+    stats = download(wiki, tmp_path)
+    assert (stats["downloaded"], stats["unchanged"]) == (2, 4)
+    assert (tmp_path / "a.svg").read_bytes() == b"<svg>new a</svg>"
+
+
+def test_failed_downloads_resume_on_the_next_run(wiki, tmp_path):
+    wiki.missing = {"/img/d.svg", "/img/e.svg"}
+    stats = download(wiki, tmp_path)
+    assert (stats["downloaded"], stats["failed"]) == (4, 2)
+    assert set(stats["errors"]) == {wiki.url + "/img/d.svg", wiki.url + "/img/e.svg"}
+    assert not (tmp_path / "d.svg").exists()
+
+    wiki.missing = set()
+    stats = download(wiki, tmp_path)
+    assert (stats["downloaded"], stats["unchanged"], stats["failed"]) == (2, 4, 0)
+
+
+def test_concurrency_is_bounded(wiki, tmp_path):
+    wiki.delay = 0.05
+    download(wiki, tmp_path, workers=2)
+    assert wiki.peak == 2
+
+
+def test_force_downloads_everything(wiki, tmp_path):
+    download(wiki, tmp_path)
+    session = scraper.make_session(2, retries=0)
+    stats = scraper.download_all(
+        session, image_urls(wiki), str(tmp_path), force=True, log=lambda _: None
+    )
+    assert stats["downloaded"] == 6
+
+
+def test_fetch_glyph_images_scrapes_the_page(wiki, tmp_path):
+    pytest.importorskip("bs4")
+    stats = scraper.fetch_glyph_images(wiki.url + "/wiki", str(tmp_path), workers=3)
+    assert stats["downloaded"] == 6
+    assert sorted(p.name for p in tmp_path.glob("*.svg")) == [
+        f"{name}.svg" for name in "abcdef"
+    ]
@@ -0,0 +1,158 @@
+"""Tests for the HTTP inference service."""
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import threading
+
+import cv2
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("multipart")
+from fastapi.testclient import TestClient  # noqa: E402
+
+import app  # noqa: E402
+import server  # noqa: E402
+
+
+def png_bytes(templates_dir: Path, name: str) -> bytes:
+    image = cv2.imread(str(templates_dir / f"{name}.png"))
+    return cv2.imencode(".png", image)[1].tobytes()
+
+
+@pytest.fixture
+def client(fake_mediapipe, small_templates_dir: Path):
+    """A running service over the small template set."""
+
+    def factory():
+        return app.MobileNetSitelenPonaRecognizer(
+            templates_dir=str(small_templates_dir), cache_dir=None
+        )
+
+    api = server.create_app(factory, workers=2, window_ms=20)
+    with TestClient(api) as client:
+        assert client.get("/ready", params={"timeout": 10}).status_code == 200
+        yield client
+
+
+def test_health_and_readiness(client: TestClient):
+    assert client.get("/health").json() == {"status": "ok"}
+    assert client.get("/ready").json() == {
+        "status": "ready",
+        "characters": 5,
+        "templates": 5,
+    }
+
+
+def test_not_ready_until_templates_load():
+    """Readiness and recognition answer 503 while the recognizer is built."""
+    release = threading.Event()
+
+    def slow_factory():
+        release.wait(timeout=5)
+        raise RuntimeError("model missing")
+
+    with TestClient(server.create_app(slow_factory)) as client:
+        assert client.get("/ready").json() == {"status": "loading"}
+        assert client.get("/health").status_code == 200
+        response = client.post("/recognize", files={"image": b"x"})
+        assert response.status_code == 503
+
+        release.set()
+        response = client.get("/ready", params={"timeout": 5})
+        assert response.status_code == 503
+        assert response.json() == {"status": "failed", "error": "model missing"}
+
+
+def test_recognize_single_image(client: TestClient, small_templates_dir: Path):
+    response = client.post(
+        "/recognize",
+        files={"image": ("moku.png", png_bytes(small_templates_dir, "moku"))},
+        params={"k": 3, "character": "moku"},
+    )
+    assert response.status_code == 200
+    result = response.json()
+    assert result["match"] == "moku"
+    assert [c["name"] for c in result["candidates"]][0] == "moku"
+    assert len(result["candidates"]) == 3
+    assert result["passed"] is True
+    assert result["character_score"] == pytest.approx(result["score"])
+
+
+def test_recognize_batch(client: TestClient, small_templates_dir: Path):
+    names = ["toki", "a", "pona"]
+    files = [
+        ("images", (f"{name}.png", png_bytes(small_templates_dir, name)))
+        for name in names
+    ]
+    response = client.post("/recognize/batch", files=files)
+    assert response.status_code == 200
+    assert [r["match"] for r in response.json()["results"]] == names
+
+
+def test_concurrent_requests_share_batches(
+    client: TestClient, small_templates_dir: Path
+):
+    """Requests arriving within the batching window are embedded together."""
+    names = ["a", "ike", "moku", "pona", "toki"] * 2
+
+    def post(name):
+        files = {"image": (f"{name}.png", png_bytes(small_templates_dir, name))}
+        return client.post("/recognize", files=files).json()["match"]
+
+    with ThreadPoolExecutor(len(names)) as pool:
+        assert list(pool.map(post, names)) == names
+    stats = client.get("/metrics").json()["batcher"]
+    assert stats["items"] == len(names)
+    assert stats["batches"] < len(names)
+
+
+def test_bad_requests(client: TestClient, small_templates_dir: Path):
+    image = png_bytes(small_templates_dir, "a")
+    response = client.post("/recognize", files={"image": ("x.png", b"not a png")})
+    assert response.status_code == 400
+    response = client.post(
+        "/recognize", files={"image": image}, params={"character": "nope"}
+    )
+    assert response.status_code == 404
+    response = client.post("/recognize", files={"image": image}, params={"k": 0})
+    assert response.status_code == 422
+
+
+def test_removed_character_fails_only_its_items(
+    fake_mediapipe, small_templates_dir: Path
+):
+    """A character dropped by a reload after the request was checked does not
+    fail other clients' items in the same batch."""
+    recognizer = app.MobileNetSitelenPonaRecognizer(
+        templates_dir=str(small_templates_dir), cache_dir=None
+    )
+    moku = cv2.imread(str(small_templates_dir / "moku.png"))
+    results = server.recognize_items(
+        recognizer, [(moku, 3, 0.7, "moku"), (moku, 3, 0.7, "removed")]
+    )
+    assert results[0]["passed"] is True
+    assert isinstance(results[1], server.UnknownCharacter)
+    assert str(results[1]) == "Unknown character 'removed'"
+
+
+def test_character_removed_mid_request(client: TestClient, small_templates_dir: Path):
+    """The endpoints answer 404 or a per-item error, not a server error."""
+    api = client.app
+    batcher = api.state.batcher
+    run_batch = batcher.run_batch
+    # Drop the character between the endpoint's check and the batch
+    batcher.run_batch = lambda items: run_batch(
+        [(image, k, threshold, "removed") for image, k, threshold, _ in items]
+    )
+    image = png_bytes(small_templates_dir, "a")
+    response = client.post(
+        "/recognize", files={"image": image}, params={"character": "a"}
+    )
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Unknown character 'removed'"
+
+    files = [("images", ("a.png", image)), ("images", ("b.png", image))]
+    response = client.post("/recognize/batch", files=files, params={"character": "a"})
+    assert response.status_code == 200
+    assert response.json()["results"] == [{"error": "Unknown character 'removed'"}] * 2
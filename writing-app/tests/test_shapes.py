@@ -0,0 +1,59 @@
+"""Tests for the precomputed contour shape index."""
+
+import cv2
+import numpy as np
+import pytest
+
+from recognition.shapes import ShapeIndex, main_contour
+
+
+@pytest.fixture
+def binaries(templates_dir):
+    images = {}
+    for name in ["a", "ike", "moku", "pona", "toki", "sitelen", "tomo", "lukin"]:
+        image = cv2.imread(str(templates_dir / f"{name}.png"), cv2.IMREAD_GRAYSCALE)
+        _, images[name] = cv2.threshold(image, 127, 255, cv2.THRESH_BINARY_INV)
+    return images
+
+
+@pytest.fixture
+def query(binaries):
+    rotated = cv2.warpAffine(
+        binaries["moku"], cv2.getRotationMatrix2D((50, 50), 10, 0.9), (100, 100)
+    )
+    return main_contour(rotated)
+
+
+def test_distances_match_cv2_match_shapes(binaries, query):
+    index = ShapeIndex.from_images(binaries)
+    expected = [
+        cv2.matchShapes(query, contour, cv2.CONTOURS_MATCH_I2, 0)
+        for contour in index.contours
+    ]
+    assert np.allclose(index.distances(query), expected)
+
+
+def test_search_ranks_nearest_first(binaries, query):
+    index = ShapeIndex.from_images(binaries)
+    indices, distances = index.search(query)
+    assert len(indices) == len(index)
+    assert np.all(np.diff(distances) >= 0)
+    assert index.names[indices[0]] == "moku"
+
+
+def test_shortlist_scores_only_the_coarse_candidates(binaries, query):
+    index = ShapeIndex.from_images(binaries)
+    indices, distances = index.search(query, shortlist=3)
+    assert len(indices) == 3
+    full = index.distances(query)
+    assert np.allclose(distances, full[indices])
+
+
+def test_blank_templates_are_skipped_and_entries_exposed(binaries):
+    binaries["blank"] = np.zeros((100, 100), np.uint8)
+    index = ShapeIndex.from_images(binaries)
+    assert "blank" not in index and "pona" in index
+    contour, count, area, centroid = index.entry("pona")
+    assert count >= 1
+    assert area == pytest.approx(cv2.contourArea(contour))
+    assert 0 < centroid[0] < 100 and 0 < centroid[1] < 100
@@ -0,0 +1,208 @@
+"""Tests for live stream recognition."""
+
+import threading
+from unittest.mock import MagicMock
+
+import cv2
+import numpy as np
+import pytest
+
+import app
+from recognition.streaming import (
+    ChangeDetector,
+    FrameRateGovernor,
+    SlidingWindow,
+    StreamRecognizer,
+    frame_signature,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+def blank_frame(value=255):
+    return np.full((120, 160, 3), value, dtype=np.uint8)
+
+
+def frame_with_box(x):
+    frame = blank_frame()
+    cv2.rectangle(frame, (x, 30), (x + 40, 90), (0, 0, 0), -1)
+    return frame
+
+
+NAMES = ["a", "moku", "toki"]
+
+
+def fake_score(names=NAMES):
+    """``score`` stand-in whose score for a rises by 0.1 per call"""
+    calls = iter(range(1000))
+
+    def score(frame):
+        i = next(calls)
+        return names, np.array([0.1 * i, 0.2, 0.5], dtype=np.float32)
+
+    return MagicMock(side_effect=score)
+
+
+def test_frame_signature_accepts_bgr_bgra_and_grey():
+    frame = frame_with_box(40)
+    signature = frame_signature(frame, size=16)
+    assert signature.shape == (16, 16) and signature.dtype == np.float32
+    np.testing.assert_allclose(
+        frame_signature(cv2.cvtColor(frame, cv2.COLOR_BGR2BGRA), size=16), signature
+    )
+    np.testing.assert_allclose(
+        frame_signature(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), size=16),
+        signature,
+        atol=1,
+    )
+
+
+def test_change_detector_ignores_noise_but_not_motion():
+    detector = ChangeDetector(threshold=4.0)
+    first = frame_signature(frame_with_box(40))
+    assert detector.changed(first)
+    detector.update(first)
+
+    rng = np.random.default_rng(0)
+    noisy = frame_with_box(40).astype(np.int16) + rng.integers(-6, 7, (120, 160, 3))
+    assert not detector.changed(
+        frame_signature(np.clip(noisy, 0, 255).astype(np.uint8))
+    )
+    assert detector.changed(frame_signature(frame_with_box(100)))
+
+
+def test_governor_spaces_frames_by_the_target_rate():
+    clock = FakeClock()
+    governor = FrameRateGovernor(target_fps=4, clock=clock)
+    assert governor.ready()
+    governor.mark()
+    clock.advance(0.2)
+    assert not governor.ready()
+    clock.advance(0.05)
+    assert governor.ready()
+
+    unlimited = FrameRateGovernor(target_fps=0, clock=clock)
+    unlimited.mark()
+    assert unlimited.ready()
+
+
+def test_sliding_window_averages_the_last_scores():
+    window = SlidingWindow(size=2)
+    assert window.mean() == {}
+    window.push(NAMES, [0.0, 0.0, 0.3])
+    window.push(NAMES, [0.2, 0.0, 0.5])
+    window.push(NAMES, [0.4, 0.0, 0.7])
+    assert len(window) == 2
+    assert window.mean() == pytest.approx({"a": 0.3, "moku": 0.0, "toki": 0.6})
+
+    # New names (reloaded templates) start the window over
+    window.push(["a", "toki"], [1.0, 1.0])
+    assert window.mean() == {"a": 1.0, "toki": 1.0}
+
+
+def test_stream_skips_fast_and_unchanged_frames():
+    clock = FakeClock()
+    score = fake_score()
+    stream = StreamRecognizer(score, target_fps=5, window=3, clock=clock)
+
+    assert stream.process(frame_with_box(20))
+    # Too soon, even though the frame changed
+    clock.advance(0.1)
+    assert not stream.process(frame_with_box(100))
+    # Late enough, but the same picture
+    clock.advance(0.2)
+    assert not stream.process(frame_with_box(20))
+    clock.advance(0.2)
+    assert stream.process(frame_with_box(100))
+
+    assert score.call_count == 2
+    assert stream.stats() == {
+        "frames": 4,
+        "processed": 2,
+        "rate_limited": 1,
+        "unchanged": 1,
+        "window": 2,
+        "latency": pytest.approx(stream.last_latency),
+    }
+
+
+def test_stream_smooths_scores_over_the_window():
+    clock = FakeClock()
+    stream = StreamRecognizer(fake_score(), target_fps=0, window=3, clock=clock)
+    assert stream.candidates() == [] and stream.score_for("a") is None
+
+    for x in range(0, 100, 20):
+        assert stream.process(frame_with_box(x))
+    # The last three frames scored a at 0.2, 0.3 and 0.4
+    assert stream.score_for("a") == pytest.approx(0.3)
+    best = stream.candidates(k=2)
+    assert [c.name for c in best] == ["toki", "a"]
+    assert best[0].margin == pytest.approx(0.2)
+
+    stream.reset()
+    assert stream.candidates() == []
+    assert stream.process(frame_with_box(0))
+
+
+def test_stream_retries_after_a_scoring_error():
+    clock = FakeClock()
+    score = MagicMock(side_effect=[RuntimeError("camera hiccup"), (NAMES, [0, 0, 1])])
+    stream = StreamRecognizer(score, target_fps=0, clock=clock)
+    frame = frame_with_box(40)
+    assert not stream.process(frame)
+    assert isinstance(stream.last_error, RuntimeError)
+    # The same frame is tried again rather than skipped as unchanged
+    assert stream.process(frame)
+    assert stream.last_error is None
+    assert stream.candidates(k=1)[0].name == "toki"
+
+
+def test_concurrent_frames_are_scored_once_per_slot():
+    clock = FakeClock()
+    started, release = threading.Event(), threading.Event()
+
+    def slow_score(frame):
+        started.set()
+        release.wait(5)
+        return NAMES, [0.0, 0.0, 1.0]
+
+    stream = StreamRecognizer(slow_score, target_fps=5, clock=clock)
+    worker = threading.Thread(target=stream.process, args=(frame_with_box(20),))
+    worker.start()
+    assert started.wait(5)
+    # A frame arriving while the first is scored falls in the same slot
+    assert not stream.process(frame_with_box(100))
+    release.set()
+    worker.join(5)
+    assert stream.stats()["processed"] == 1
+
+
+def test_stream_over_the_recognizer(fake_mediapipe, small_templates_dir):
+    recognizer = app.MobileNetSitelenPonaRecognizer(
+        templates_dir=str(small_templates_dir), cache_dir=None
+    )
+    embed = fake_mediapipe.tasks.vision.ImageEmbedder.create_from_options().embed
+    moku = cv2.imread(str(small_templates_dir / "moku.png"))
+
+    names, scores = recognizer.score_frame(moku)
+    assert names == recognizer.bank.names
+    assert scores[names.index("moku")] == pytest.approx(1.0, abs=1e-5)
+
+    clock = FakeClock()
+    stream = StreamRecognizer(recognizer.score_frame, target_fps=5, clock=clock)
+    calls = embed.call_count
+    for _ in range(10):
+        stream.process(moku)
+        clock.advance(0.25)
+    # A still picture is embedded once however many frames show it
+    assert embed.call_count == calls + 1
+    assert stream.candidates(k=1)[0].name == "moku"
@@ -0,0 +1,146 @@
+"""Tests for the incremental SVG-to-template build."""
+
+import hashlib
+import json
+from pathlib import Path
+import shutil
+
+import cv2
+import numpy as np
+import pytest
+
+from recognition.template_build import (
+    MANIFEST_FILE,
+    RenderSpec,
+    build,
+    output_dirs,
+    render,
+)
+
+SVG_NAMES = ["a", "moku", "toki"]
+
+
+def cairo_available():
+    try:
+        import cairosvg  # noqa: F401
+    except (ImportError, OSError):
+        return False
+    return True
+
+
+def write_png(job):
+    """Stand-in renderer: one grey level per SVG size, so edits show up"""
+    level = len(job.source.read_bytes()) % 256
+    image = np.full((job.spec.height, job.spec.width), level, dtype=np.uint8)
+    cv2.imwrite(str(job.output), image)
+    return hashlib.sha256(job.output.read_bytes()).hexdigest()
+
+
+def fail_on_toki(job):
+    if job.name == "toki":
+        raise ValueError("broken SVG")
+    return write_png(job)
+
+
+@pytest.fixture
+def svg_dir(tmp_path, sitelen_pona_svgs_dir):
+    target = tmp_path / "svgs"
+    target.mkdir()
+    for name in SVG_NAMES:
+        shutil.copy(sitelen_pona_svgs_dir / f"{name}.svg", target / f"{name}.svg")
+    return target
+
+
+def test_parse_specs():
+    assert RenderSpec.parse("64") == RenderSpec(64, 64, 0, "light")
+    assert RenderSpec.parse("128x96:+1") == RenderSpec(128, 96, 1, "light")
+    assert RenderSpec.parse("100:0:dark") == RenderSpec(100, 100, 0, "dark")
+    for bad in ["0", "64:0:sepia", "big"]:
+        with pytest.raises(ValueError):
+            RenderSpec.parse(bad)
+
+
+def test_specs_need_their_own_directories(tmp_path):
+    specs = [RenderSpec(64, 64), RenderSpec(100, 100)]
+    with pytest.raises(ValueError):
+        output_dirs(str(tmp_path / "out"), specs)
+    dirs = output_dirs(str(tmp_path / "out-{size}"), specs)
+    assert dirs[specs[0]].name == "out-64x64"
+
+
+def test_rebuild_only_renders_what_changed(svg_dir, tmp_path):
+    out = str(tmp_path / "out-{size}-s{stroke}-{theme}")
+    specs = [RenderSpec(32, 32), RenderSpec(16, 16, 0, "dark")]
+    first = build(svg_dir, out, specs, workers=0, renderer=write_png)
+    assert (first["rendered"], first["skipped"]) == (6, 0)
+
+    again = build(svg_dir, out, specs, workers=0, renderer=write_png)
+    assert (again["rendered"], again["skipped"]) == (0, 6)
+
+    light = tmp_path / "out-32x32-s0-light"
+    manifest = json.loads((light / MANIFEST_FILE).read_text())
+    assert manifest["spec"]["width"] == 32
+    assert sorted(manifest["outputs"]) == ["a.png", "moku.png", "toki.png"]
+
+    # A new stroke width only renders its own directory
+    specs.append(RenderSpec(32, 32, 1))
+    stats = build(svg_dir, out, specs, workers=0, renderer=write_png)
+    assert (stats["rendered"], stats["skipped"]) == (3, 6)
+
+    (svg_dir / "toki.svg").unlink()
+    stats = build(svg_dir, out, specs, workers=0, renderer=write_png)
+    assert stats["removed"] == 3
+    assert not (light / "toki.png").exists()
+
+
+def test_edits_and_missing_outputs_are_rebuilt(svg_dir, tmp_path):
+    out = tmp_path / "templates"
+    build(svg_dir, str(out), [RenderSpec(32, 32)], workers=0, renderer=write_png)
+    with open(svg_dir / "moku.svg", "a") as f:
+        f.write("<!-- edited -->")
+    (out / "a.png").unlink()
+    stats = build(
+        svg_dir, str(out), [RenderSpec(32, 32)], workers=0, renderer=write_png
+    )
+    assert (stats["rendered"], stats["skipped"]) == (2, 1)
+
+
+def test_hand_made_templates_are_left_alone(svg_dir, tmp_path):
+    out = tmp_path / "templates"
+    out.mkdir()
+    (out / "extra.png").write_bytes(b"not ours")
+    build(svg_dir, str(out), [RenderSpec(32, 32)], workers=0, renderer=write_png)
+    (svg_dir / "a.svg").unlink()
+    stats = build(
+        svg_dir, str(out), [RenderSpec(32, 32)], workers=0, renderer=write_png
+    )
+    assert stats["removed"] == 1
+    assert (out / "extra.png").exists()
+
+
+def test_failures_are_retried(svg_dir, tmp_path):
+    out = str(tmp_path / "templates")
+    stats = build(svg_dir, out, [RenderSpec(32, 32)], workers=0, renderer=fail_on_toki)
+    assert stats["failed"] == 1
+    assert "broken SVG" in next(iter(stats["errors"].values()))
+    stats = build(svg_dir, out, [RenderSpec(32, 32)], workers=0, renderer=write_png)
+    assert (stats["rendered"], stats["skipped"]) == (1, 2)
+
+
+def test_process_pool_build(svg_dir, tmp_path):
+    out = str(tmp_path / "out-{size}")
+    specs = [RenderSpec(16, 16), RenderSpec(24, 24)]
+    stats = build(svg_dir, out, specs, workers=2, renderer=write_png)
+    assert stats["rendered"] == 6
+    assert cv2.imread(str(Path(tmp_path / "out-24x24" / "a.png"))).shape[:2] == (24, 24)
+
+
+@pytest.mark.skipif(not cairo_available(), reason="needs cairosvg and Cairo")
+def test_render_themes_and_strokes(svg_dir):
+    light = render(svg_dir / "moku.svg", RenderSpec(100, 100))
+    assert set(np.unique(light)) <= {0, 255}
+    assert light[0, 0] == 255
+    dark = render(svg_dir / "moku.svg", RenderSpec(100, 100, 0, "dark"))
+    np.testing.assert_array_equal(dark, 255 - light)
+    thick = render(svg_dir / "moku.svg", RenderSpec(100, 100, 2))
+    assert np.count_nonzero(thick == 0) > np.count_nonzero(light == 0)
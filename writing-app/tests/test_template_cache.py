@@ -0,0 +1,138 @@
+"""Tests for the on-disk template embedding cache."""
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from recognition.template_cache import TemplateEmbeddingCache
+
+PREPROCESSING = {"version": 1, "target_size": [224, 224], "l2_normalize": True}
+
+
+@pytest.fixture
+def model_file(tmp_path: Path) -> Path:
+    """Create a stand-in model file to key the cache on."""
+    path = tmp_path / "model.tflite"
+    path.write_bytes(b"model-v1")
+    return path
+
+
+@pytest.fixture
+def template_files(tmp_path: Path) -> dict[str, Path]:
+    """Create three small template files."""
+    templates_dir = tmp_path / "templates"
+    templates_dir.mkdir()
+    files = {}
+    for name in ["a", "moku", "toki"]:
+        path = templates_dir / f"{name}.png"
+        path.write_bytes(name.encode())
+        files[name] = path
+    return files
+
+
+def make_embeddings(names) -> dict[str, np.ndarray]:
+    """Return a distinct embedding per template name."""
+    return {
+        name: np.full(4, i, dtype=np.float32) for i, name in enumerate(sorted(names))
+    }
+
+
+def test_empty_cache_is_stale(tmp_path, model_file, template_files):
+    """A missing cache returns nothing and asks to be written."""
+    cache = TemplateEmbeddingCache(tmp_path / "cache", model_file, PREPROCESSING)
+    assert cache.load(template_files) == {}
+    assert cache.stale
+
+
+def test_round_trip_is_memory_mapped(tmp_path, model_file, template_files):
+    """Saved embeddings are returned as memory-mapped rows by a new cache."""
+    embeddings = make_embeddings(template_files)
+    cache = TemplateEmbeddingCache(tmp_path / "cache", model_file, PREPROCESSING)
+    cache.load(template_files)
+    cache.save(template_files, embeddings)
+
+    reloaded = TemplateEmbeddingCache(tmp_path / "cache", model_file, PREPROCESSING)
+    cached = reloaded.load(template_files)
+    assert not reloaded.stale
+    assert set(cached) == set(template_files)
+    for name, embedding in embeddings.items():
+        np.testing.assert_array_equal(cached[name], embedding)
+    assert isinstance(cached["moku"].base, np.memmap)
+
+
+def test_changed_template_only_invalidates_its_row(
+    tmp_path, model_file, template_files
+):
+    """Editing one template drops only that template from the cache."""
+    cache = TemplateEmbeddingCache(tmp_path / "cache", model_file, PREPROCESSING)
+    cache.load(template_files)
+    cache.save(template_files, make_embeddings(template_files))
+
+    template_files["moku"].write_bytes(b"redrawn moku")
+    reloaded = TemplateEmbeddingCache(tmp_path / "cache", model_file, PREPROCESSING)
+    cached = reloaded.load(template_files)
+    assert set(cached) == {"a", "toki"}
+    assert reloaded.stale
+
+
+def test_removed_template_marks_cache_stale(tmp_path, model_file, template_files):
+    """Dropping a template keeps the others but rewrites the cache."""
+    cache = TemplateEmbeddingCache(tmp_path / "cache", model_file, PREPROCESSING)
+    cache.load(template_files)
+    cache.save(template_files, make_embeddings(template_files))
+
+    del template_files["toki"]
+    reloaded = TemplateEmbeddingCache(tmp_path / "cache", model_file, PREPROCESSING)
+    assert set(reloaded.load(template_files)) == {"a", "moku"}
+    assert reloaded.stale
+
+
+@pytest.mark.parametrize("change", ["model", "preprocessing"])
+def test_model_or_preprocessing_change_invalidates_everything(
+    tmp_path, model_file, template_files, change
+):
+    """A different model file or preprocessing config ignores the whole cache."""
+    cache = TemplateEmbeddingCache(tmp_path / "cache", model_file, PREPROCESSING)
+    cache.load(template_files)
+    cache.save(template_files, make_embeddings(template_files))
+
+    preprocessing = PREPROCESSING
+    if change == "model":
+        model_file.write_bytes(b"model-v2")
+    else:
+        preprocessing = {**PREPROCESSING, "target_size": [192, 192]}
+
+    reloaded = TemplateEmbeddingCache(tmp_path / "cache", model_file, preprocessing)
+    assert reloaded.load(template_files) == {}
+    assert reloaded.stale
+
+
+def test_save_replaces_previous_matrix(tmp_path, model_file, template_files):
+    """Only the current embeddings file is kept after a rewrite."""
+    cache_dir = tmp_path / "cache"
+    cache = TemplateEmbeddingCache(cache_dir, model_file, PREPROCESSING)
+    cache.load(template_files)
+    cache.save(template_files, make_embeddings(template_files))
+    cache.save(template_files, make_embeddings(template_files))
+    assert len(list(cache_dir.glob("embeddings-*.npy"))) == 1
+
+
+def test_concurrent_savers_keep_each_others_matrix(
+    tmp_path, model_file, template_files
+):
+    """A saver only removes the matrix of the manifest it replaced."""
+    cache_dir = tmp_path / "cache"
+    first = TemplateEmbeddingCache(cache_dir, model_file, PREPROCESSING)
+    second = TemplateEmbeddingCache(cache_dir, model_file, PREPROCESSING)
+    first.load(template_files)
+    second.load(template_files)
+
+    first.save(template_files, make_embeddings(template_files))
+    stray = cache_dir / "embeddings-stray.npy"  # another process's fresh matrix
+    np.save(stray, np.zeros((3, 4), dtype=np.float32))
+    second.save(template_files, make_embeddings(template_files))
+
+    assert stray.exists()
+    assert len(list(cache_dir.glob("embeddings-*.npy"))) == 2
+    assert set(second.load(template_files)) == set(template_files)
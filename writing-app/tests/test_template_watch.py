@@ -0,0 +1,61 @@
+"""Tests for template change detection."""
+
+import logging
+import threading
+
+import pytest
+
+from recognition.template_watch import (
+    TemplateChanges,
+    TemplateWatcher,
+    diff_snapshots,
+    stat_snapshot,
+)
+
+
+def test_snapshot_skips_vanished_files(tmp_path):
+    present = tmp_path / "a.png"
+    present.write_bytes(b"abc")
+    snapshot = stat_snapshot({"a": present, "b": tmp_path / "b.png"})
+    assert list(snapshot) == ["a"]
+    assert snapshot["a"][1] == 3
+
+
+def test_diff_snapshots():
+    old = {"a": (1, 10), "b": (1, 10), "c": (1, 10)}
+    new = {"a": (1, 10), "b": (2, 10), "d": (1, 5)}
+    changes = diff_snapshots(old, new)
+    assert changes == TemplateChanges(["d"], ["b"], ["c"])
+    assert changes.affected() == ["d", "b"]
+    assert changes
+    assert not diff_snapshots(old, dict(old))
+
+
+def test_watcher_keeps_polling_after_errors(caplog):
+    calls = []
+    done = threading.Event()
+
+    def check():
+        calls.append(1)
+        if len(calls) == 1:
+            raise ValueError("half-written")
+        done.set()
+
+    with caplog.at_level(logging.ERROR, logger="recognition.template_watch"):
+        watcher = TemplateWatcher(check, interval=0.01)
+        try:
+            assert done.wait(5)
+        finally:
+            watcher.close()
+    assert watcher.errors == 1
+    assert "half-written" in watcher.last_error
+    assert not watcher.running
+    # The failure and its traceback reach the service log
+    [record] = caplog.records
+    assert record.message == "Template reload failed"
+    assert record.exc_info[0] is ValueError
+
+
+def test_watcher_rejects_bad_interval():
+    with pytest.raises(ValueError):
+        TemplateWatcher(lambda: None, interval=0)
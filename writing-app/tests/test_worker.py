@@ -0,0 +1,97 @@
+"""Tests for the background inference service."""
+
+import threading
+
+import numpy as np
+import pytest
+
+from recognition.worker import InferenceService, QueueFull, input_key
+
+
+@pytest.fixture
+def service():
+    service = InferenceService(workers=1, max_pending=2)
+    yield service
+    service.shutdown()
+
+
+def blocking_job(gate: threading.Event, value):
+    gate.wait(timeout=5)
+    return value
+
+
+def test_input_key_depends_on_contents():
+    image = np.zeros((4, 4, 3), dtype=np.uint8)
+    changed = image.copy()
+    changed[0, 0] = 255
+    assert input_key(image, "moku") == input_key(image.copy(), "moku")
+    assert input_key(image, "moku") != input_key(changed, "moku")
+    assert input_key(image, "moku") != input_key(image, "toki")
+    assert input_key(image, True) != input_key(image.astype(np.float32), True)
+
+
+def test_submit_runs_job(service: InferenceService):
+    ticket = service.submit("key", sum, [1, 2, 3])
+    assert ticket.wait(timeout=5)
+    assert ticket.result() == 6
+    assert service.stats["finished"] == 1
+
+
+def test_repeated_submission_is_coalesced(service: InferenceService):
+    """Clicking again on the same input reuses the job already in flight."""
+    gate = threading.Event()
+    first = service.submit("same", blocking_job, gate, 1)
+    again = service.submit("same", blocking_job, gate, 2, previous=first)
+    assert again is first
+    assert service.stats["coalesced"] == 1
+    gate.set()
+    assert again.result(timeout=5) == 1
+    assert service.stats["submitted"] == 1
+
+
+def test_new_input_cancels_queued_job(service: InferenceService):
+    """A queued job whose input has changed is dropped before it runs."""
+    gate = threading.Event()
+    running = service.submit("a", blocking_job, gate, "a")
+    stale = service.submit("b", blocking_job, gate, "b")
+    latest = service.submit("c", blocking_job, gate, "c", previous=stale)
+    assert stale.cancelled()
+    assert service.stats["cancelled"] == 1
+    gate.set()
+    assert running.result(timeout=5) == "a"
+    assert latest.result(timeout=5) == "c"
+
+
+def test_queue_is_bounded(service: InferenceService):
+    """Submissions beyond max_pending are rejected, and accepted once work drains."""
+    gate = threading.Event()
+    first = service.submit("a", blocking_job, gate, "a")
+    service.submit("b", blocking_job, gate, "b")
+    with pytest.raises(QueueFull):
+        service.submit("c", blocking_job, gate, "c")
+    assert service.stats["rejected"] == 1
+
+    gate.set()
+    first.result(timeout=5)
+    service.submit("d", blocking_job, gate, "d").result(timeout=5)
+    assert service.pending == 0
+
+
+def test_job_errors_reach_the_caller(service: InferenceService):
+    ticket = service.submit("bad", int, "not a number")
+    with pytest.raises(ValueError):
+        ticket.result(timeout=5)
+    assert service.pending == 0
+
+
+def test_failed_job_is_retried_not_replayed(service: InferenceService):
+    """Resubmitting after an error runs the job again; a success is reused."""
+    failed = service.submit("same", int, "not a number")
+    with pytest.raises(ValueError):
+        failed.result(timeout=5)
+    retried = service.submit("same", int, "42", previous=failed)
+    assert retried is not failed
+    assert retried.result(timeout=5) == 42
+    assert service.submit("same", int, "7", previous=retried) is retried
+    assert service.stats["submitted"] == 2
+    assert service.stats["coalesced"] == 1